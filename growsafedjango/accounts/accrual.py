@@ -0,0 +1,129 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, Exists, F, Max, OuterRef, Q, Sum, Value, When
+from django.utils import timezone
+
+from . import ledger
+from .models import EarningsAccrual, Investment, UserProfile
+
+ACCRUAL_CHUNK_SIZE = 1000
+CENT = Decimal('0.01')
+
+
+class AccrualError(Exception):
+    """The requested day cannot be accrued (it is in the future, or later days already were)."""
+
+
+def earnings_by_user():
+    # One grouped aggregate over every investment: (user_id, amount x daily_return_rate)
+    return (
+        Investment.objects
+        .values('user_id')
+        .annotate(earnings=Sum(
+            F('amount') * F('daily_return_rate'),
+            output_field=DecimalField(max_digits=20, decimal_places=6),
+        ))
+        .order_by('user_id')
+    )
+
+
+def _not_accrued(day):
+    return Q(earnings_accrued_on__isnull=True) | Q(earnings_accrued_on__lt=day)
+
+
+def _apply_chunk(day, rows):
+    earnings = {user_id: amount.quantize(CENT) for user_id, amount in rows}
+    with transaction.atomic():
+        # Profiles already credited for this day are skipped, which makes re-runs safe
+        pending = list(
+            UserProfile.objects.select_for_update()
+            .filter(_not_accrued(day), user_id__in=earnings)
+            .values_list('user_id', flat=True)
+        )
+        if not pending:
+            return 0, Decimal('0.00')
+        daily = Case(
+            *[When(user_id=user_id, then=Value(earnings[user_id])) for user_id in pending],
+            output_field=DecimalField(max_digits=15, decimal_places=2),
+        )
+        UserProfile.objects.filter(user_id__in=pending).update(
+            daily_earnings=daily,
+            total=F('total') + daily,
+            earnings_accrued_on=day,
+        )
+        # Dated on the accrued day rather than when the job ran, so a late run
+        # still lands in that day's closing balance
+        ledger.record_many(
+            ((user_id, 'ACCRUAL', earnings[user_id], day.isoformat()) for user_id in pending if earnings[user_id]),
+            created_at=timezone.make_aware(datetime.combine(day, time.min)),
+        )
+    return len(pending), sum((earnings[user_id] for user_id in pending), Decimal('0.00'))
+
+
+def accrue_daily_earnings(day=None, chunk_size=ACCRUAL_CHUNK_SIZE, force=False):
+    """Credit every profile with investment earnings up to and including ``day``.
+
+    Days missed since the last completed run (a cron night that did not
+    happen) are accrued first, one at a time and in order, so no day's
+    earnings are lost. Returns the ``EarningsAccrual`` marker for ``day``.
+    A day that has already completed is left untouched unless ``force`` is
+    set; even then profiles whose ``earnings_accrued_on`` is ``day`` are
+    never credited twice.
+
+    Profiles only remember the last day they were credited, so days must be
+    accrued in order: a day in the future, or one before a day some profile
+    was already credited for, raises ``AccrualError`` rather than silently
+    skipping those profiles.
+    """
+    today = timezone.localdate()
+    day = day or today
+    if day > today:
+        raise AccrualError(f'Cannot accrue {day}: it is after today ({today})')
+    last = (
+        EarningsAccrual.objects.filter(day__lt=day, completed_at__isnull=False)
+        .aggregate(last=Max('day'))['last']
+    )
+    if last is not None:
+        missed = last + timedelta(days=1)
+        while missed < day:
+            _accrue_day(missed, chunk_size)
+            missed += timedelta(days=1)
+    return _accrue_day(day, chunk_size, force)
+
+
+def _accrue_day(day, chunk_size, force=False):
+    # Idempotent per day: the marker and earnings_accrued_on make re-runs safe
+    marker = EarningsAccrual.objects.filter(day=day).first()
+    if marker and marker.completed_at and not force:
+        return marker
+    latest = UserProfile.objects.aggregate(latest=Max('earnings_accrued_on'))['latest']
+    if latest and latest > day:
+        raise AccrualError(f'Cannot accrue {day}: profiles were already credited for {latest}')
+    marker, _ = EarningsAccrual.objects.get_or_create(day=day)
+
+    credited, amount = 0, Decimal('0.00')
+    chunk = []
+    for row in earnings_by_user().iterator(chunk_size=chunk_size):
+        chunk.append((row['user_id'], row['earnings'] or Decimal('0')))
+        if len(chunk) >= chunk_size:
+            count, total = _apply_chunk(day, chunk)
+            credited, amount = credited + count, amount + total
+            chunk = []
+    if chunk:
+        count, total = _apply_chunk(day, chunk)
+        credited, amount = credited + count, amount + total
+
+    # Profiles without investments earn nothing today
+    UserProfile.objects.filter(_not_accrued(day)).filter(
+        ~Exists(Investment.objects.filter(user_id=OuterRef('user_id')))
+    ).update(daily_earnings=Decimal('0.00'), earnings_accrued_on=day)
+
+    EarningsAccrual.objects.filter(pk=marker.pk).update(
+        profiles_credited=F('profiles_credited') + credited,
+        total_credited=F('total_credited') + amount,
+        completed_at=timezone.now(),
+    )
+    marker.refresh_from_db()
+    return marker
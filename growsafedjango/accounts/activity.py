@@ -0,0 +1,120 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import AccountActivity
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SIZE = 200
+FLUSH_INTERVAL = 1.0  # seconds
+MAX_QUEUED = 10000
+
+
+class ActivityBuffer:
+    """Collects AccountActivity rows in-process and writes them with bulk_create.
+
+    A daemon thread flushes whenever ``flush_size`` rows are waiting or
+    ``flush_interval`` seconds have passed. The queue is bounded: when it is
+    full the caller writes its row synchronously instead of dropping it.
+    Whatever is still queued is flushed at interpreter exit.
+    """
+
+    def __init__(self, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL, max_queued=MAX_QUEUED):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='activity-buffer', daemon=True)
+        self._thread.start()
+
+    def add(self, activity):
+        try:
+            self._queue.put_nowait(activity)
+        except queue.Full:
+            activity.save()
+
+    def _collect(self, block=True):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.flush_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if block and remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            AccountActivity.objects.bulk_create(batch, batch_size=self.flush_size)
+        except Exception:
+            logger.exception('Failed to write %d account activity rows', len(batch))
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._write(self._collect())
+            connection.close_if_unusable_or_obsolete()
+        connection.close()
+
+    def flush(self):
+        """Write everything queued so far and wait for any batch already in flight."""
+        while True:
+            batch = self._collect(block=False)
+            if not batch:
+                break
+            self._write(batch)
+        self._queue.join()
+
+    def stop(self):
+        self._stopping.set()
+        self._thread.join(timeout=self.flush_interval * 2)
+        self.flush()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = ActivityBuffer()
+            atexit.register(_buffer.stop)
+        return _buffer
+
+
+def flush():
+    """Write any buffered rows now; a no-op if nothing was ever buffered."""
+    if _buffer is not None:
+        _buffer.flush()
+
+
+def log_activity(request, user, action):
+    """Record ``action`` for ``user``; buffered unless ACTIVITY_LOG_BUFFERED is off."""
+    activity = AccountActivity(
+        user=user,
+        action=action,
+        ip_address=request.META.get('REMOTE_ADDR', 'Unknown'),
+        device=request.META.get('HTTP_USER_AGENT', 'Unknown')[:200],
+        timestamp=timezone.now(),
+    )
+    if getattr(settings, 'ACTIVITY_LOG_BUFFERED', False):
+        get_buffer().add(activity)
+    else:
+        activity.save()
@@ -1,26 +1,38 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
+from django.forms.models import BaseInlineFormSet
 from rest_framework.authtoken.models import Token
-from .models import UserProfile, Investment, Transaction, InvestmentOption, TransactionStatusHistory, AccountActivity
+from .models import UserProfile, Investment, Transaction, InvestmentOption, TransactionStatusHistory, AccountActivity, EarningsAccrual, LedgerEntry
 from django.contrib import messages
+from . import approvals, counters
 
 # Custom Admin Site for Dashboard Metrics
 class CustomAdminSite(admin.AdminSite):
     def each_context(self, request):
         context = super().each_context(request)
-        context['total_users'] = User.objects.count()
-        context['pending_transactions'] = Transaction.objects.filter(status='PENDING').count()
-        context['total_investments'] = Investment.objects.count()
-        context['active_options'] = InvestmentOption.objects.count()
+        # total_users, pending_transactions, total_investments, active_options
+        context.update(counters.get_counters())
         return context
 
 # Replace the default admin site
 admin.site = CustomAdminSite(name='custom_admin')
 
+class UserProfileFormSet(BaseInlineFormSet):
+    def save_new(self, form, commit=True):
+        # Saving the new user already created its profile (signals.create_user_profile),
+        # so the inline fills that row in rather than inserting a second one
+        existing = UserProfile.objects.filter(user=self.instance).values_list('pk', flat=True).first()
+        if existing is not None:
+            form.instance.pk = existing
+            form.instance._state.adding = False
+        return super().save_new(form, commit=commit)
+
+
 # Inline UserProfile for User admin
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
+    formset = UserProfileFormSet
     can_delete = False
     verbose_name_plural = 'Profile'
     fields = ('total', 'total_deposit', 'total_withdraw', 'daily_earnings', 'mobile_number', 'address')
@@ -103,38 +115,43 @@ class TransactionAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('user', 'processed_by')
 
+    def _report_outcomes(self, request, outcomes, done):
+        processed = sum(1 for outcome in outcomes.values() if outcome == done)
+        self.message_user(request, f"{processed} transaction(s) {done}.", level=messages.SUCCESS)
+        skipped = {pk: outcome for pk, outcome in outcomes.items() if outcome != done}
+        if skipped:
+            details = ', '.join(f"{pk}: {outcome}" for pk, outcome in sorted(skipped.items())[:20])
+            self.message_user(request, f"Skipped {len(skipped)} transaction(s) ({details}).", level='error')
+
     @admin.action(description='Approve selected transactions')
     def approve_transactions(self, request, queryset):
         if not request.user.is_superuser:
             self.message_user(request, "Only superusers can approve transactions.", level='error')
             return
-        for transaction in queryset.filter(status='PENDING'):
-            profile = transaction.user.profile
-            if transaction.transaction_type == 'WITHDRAWAL' and profile.total < transaction.amount:
-                self.message_user(request, f"Skipped {transaction.transaction_id}: Insufficient balance.", level='error')
-                continue
-            transaction.status = 'APPROVED'
-            transaction.processed_by = request.user
-            if transaction.transaction_type == 'DEPOSIT':
-                profile.total += transaction.amount
-                profile.total_deposit += transaction.amount
-            elif transaction.transaction_type == 'WITHDRAWAL':
-                profile.total -= transaction.amount
-                profile.total_withdraw += transaction.amount
-            transaction.save()
-            profile.save()
-        self.message_user(request, "Selected transactions approved.", level=messages.SUCCESS)
+        try:
+            outcomes = approvals.approve_transactions(
+                queryset.filter(status='PENDING').values_list('id', flat=True), request.user
+            )
+        except approvals.ApprovalConflict as e:
+            # The whole batch was rolled back, so nothing was approved
+            self.message_user(request, f"Nothing was approved: {e}. Please try again.", level=messages.ERROR)
+            return
+        self._report_outcomes(request, outcomes, approvals.APPROVED)
 
     @admin.action(description='Decline selected transactions')
     def decline_transactions(self, request, queryset):
         if not request.user.is_superuser:
             self.message_user(request, "Only superusers can decline transactions.", level='error')
             return
-        for transaction in queryset.filter(status='PENDING'):
-            transaction.status = 'DECLINED'
-            transaction.processed_by = request.user
-            transaction.save()
-        self.message_user(request, "Selected transactions declined.", level=messages.SUCCESS)
+        try:
+            outcomes = approvals.decline_transactions(
+                queryset.filter(status='PENDING').values_list('id', flat=True), request.user
+            )
+        except approvals.ApprovalConflict as e:
+            # The whole batch was rolled back, so nothing was declined
+            self.message_user(request, f"Nothing was declined: {e}. Please try again.", level=messages.ERROR)
+            return
+        self._report_outcomes(request, outcomes, approvals.DECLINED)
 
     @admin.action(description='Set selected transactions to PENDING')
     def set_pending_transactions(self, request, queryset):
@@ -177,5 +194,26 @@ class AccountActivityAdmin(admin.ModelAdmin):
     raw_id_fields = ('user',)
     ordering = ('-timestamp',)
 
+# Register EarningsAccrual
+@admin.register(EarningsAccrual)
+class EarningsAccrualAdmin(admin.ModelAdmin):
+    list_display = ('day', 'profiles_credited', 'total_credited', 'started_at', 'completed_at')
+    readonly_fields = ('day', 'profiles_credited', 'total_credited', 'started_at', 'completed_at')
+    ordering = ('-day',)
+
+# Register LedgerEntry (append-only)
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'entry_type', 'amount', 'reference', 'created_at')
+    list_filter = ('entry_type',)
+    search_fields = ('user__username', 'reference')
+    readonly_fields = ('user', 'entry_type', 'amount', 'reference', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 # Register User with custom UserAdmin
 admin.site.register(User, UserAdmin)
@@ -0,0 +1,137 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Value, When
+from django.utils import timezone
+
+from . import counters, ledger, rollups
+from .models import Transaction, UserProfile
+
+# Keep IN (...) lists and per-user CASE expressions under the bound-parameter limit
+APPROVAL_CHUNK_SIZE = 400
+PROFILE_CHUNK_SIZE = 100
+
+APPROVED = 'approved'
+DECLINED = 'declined'
+INSUFFICIENT_BALANCE = 'insufficient_balance'
+NO_PROFILE = 'no_profile'
+NOT_PENDING = 'not_found_or_processed'
+
+
+class ApprovalConflict(Exception):
+    """A selected transaction stopped being PENDING while the batch was being applied."""
+
+
+def _chunks(items, size=APPROVAL_CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _lock_pending(ids):
+    rows = []
+    for chunk in _chunks(sorted(ids)):
+        rows.extend(
+            Transaction.objects.select_for_update()
+            .filter(id__in=chunk, status='PENDING')
+            .order_by('id')
+            .values('id', 'user_id', 'transaction_type', 'amount', 'transaction_id', 'created_at')
+        )
+    return rows
+
+
+def _set_status(rows, new_status, processed_by, notes=None):
+    # Bulk updates skip the post_save signals, so counters and rollups are adjusted here
+    fields = {'status': new_status, 'processed_by': processed_by, 'updated_at': timezone.now()}
+    if notes is not None:
+        fields['notes'] = notes
+    updated = 0
+    for chunk in _chunks(row['id'] for row in rows):
+        updated += Transaction.objects.filter(id__in=chunk, status='PENDING').update(**fields)
+    if updated != len(rows):
+        raise ApprovalConflict(f'{len(rows) - updated} transactions were processed concurrently')
+    counters.increment('pending_transactions', -updated)
+    rollups.move(rows, 'PENDING', new_status)
+
+
+def _per_user(deltas, field):
+    return Case(
+        *[When(user_id=user_id, then=Value(delta[field])) for user_id, delta in deltas],
+        default=Value(Decimal('0.00')),
+        output_field=DecimalField(max_digits=15, decimal_places=2),
+    )
+
+
+def approve_transactions(ids, processed_by):
+    """Approve the PENDING transactions in ``ids`` as one database transaction.
+
+    Rows and the affected profiles are locked, balance changes are summed per
+    user and applied with one UPDATE per chunk of users. Withdrawals that would
+    overdraw the balance left by earlier rows in the batch are rejected.
+    Returns ``{transaction id: outcome}``.
+    """
+    ids = {int(pk) for pk in ids}
+    outcomes = dict.fromkeys(ids, NOT_PENDING)
+    with transaction.atomic():
+        rows = _lock_pending(ids)
+        balances = {}
+        for chunk in _chunks({row['user_id'] for row in rows}):
+            balances.update(
+                UserProfile.objects.select_for_update()
+                .filter(user_id__in=chunk)
+                .values_list('user_id', 'total')
+            )
+
+        deltas = defaultdict(lambda: {'total': Decimal('0.00'), 'deposit': Decimal('0.00'), 'withdraw': Decimal('0.00')})
+        approved, entries = [], []
+        for row in rows:
+            user_id, amount = row['user_id'], row['amount']
+            if user_id not in balances:
+                outcomes[row['id']] = NO_PROFILE
+                continue
+            if row['transaction_type'] == 'WITHDRAWAL':
+                if balances[user_id] < amount:
+                    outcomes[row['id']] = INSUFFICIENT_BALANCE
+                    continue
+                balances[user_id] -= amount
+                deltas[user_id]['total'] -= amount
+                deltas[user_id]['withdraw'] += amount
+            else:
+                balances[user_id] += amount
+                deltas[user_id]['total'] += amount
+                deltas[user_id]['deposit'] += amount
+            approved.append(row)
+            entries.append((
+                user_id, row['transaction_type'],
+                -amount if row['transaction_type'] == 'WITHDRAWAL' else amount,
+                str(row['transaction_id']),
+            ))
+            outcomes[row['id']] = APPROVED
+
+        for chunk in _chunks(deltas.items(), PROFILE_CHUNK_SIZE):
+            user_ids = [user_id for user_id, _ in chunk]
+            UserProfile.objects.filter(user_id__in=user_ids).update(
+                total=F('total') + _per_user(chunk, 'total'),
+                total_deposit=F('total_deposit') + _per_user(chunk, 'deposit'),
+                total_withdraw=F('total_withdraw') + _per_user(chunk, 'withdraw'),
+            )
+            # Deltas are applied with F() so nothing is lost, but where row locks are
+            # unavailable (SQLite) a concurrent debit could still have raced the balance check
+            debited = [user_id for user_id, delta in chunk if delta['total'] < 0]
+            if debited and UserProfile.objects.filter(user_id__in=debited, total__lt=0).exists():
+                raise ApprovalConflict('A balance changed while withdrawals were being approved')
+        _set_status(approved, 'APPROVED', processed_by)
+        ledger.record_many(entries)
+    return outcomes
+
+
+def decline_transactions(ids, processed_by, notes=None):
+    """Decline the PENDING transactions in ``ids``; returns ``{transaction id: outcome}``."""
+    ids = {int(pk) for pk in ids}
+    outcomes = dict.fromkeys(ids, NOT_PENDING)
+    with transaction.atomic():
+        declined = _lock_pending(ids)
+        _set_status(declined, 'DECLINED', processed_by, notes)
+    outcomes.update(dict.fromkeys((row['id'] for row in declined), DECLINED))
+    return outcomes
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+USER_KEY = 'auth:user:{}'
+
+
+def forget(user_id):
+    """Drop the cached user now and again once the current transaction commits,
+    so a request that read the old row in between cannot keep it cached."""
+    key = USER_KEY.format(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that keeps the user behind a token in the cache.
+
+    Saving or deleting a user (which includes deactivating one or changing a
+    password) forgets the entry, see accounts/signals.py; anything else shows
+    up after ``AUTH_USER_CACHE_SECONDS``. Other workers only see a forget with a
+    shared cache backend, so settings leave the TTL at 0 (no caching, exactly
+    JWTAuthentication) unless one is configured.
+
+    With ``AUTH_USER_CACHE_PROFILE`` the user's profile is cached alongside, so
+    ``request.user.profile`` is free too. Balances are changed by bulk UPDATEs
+    that send no signals, so a cached profile's totals can lag by the TTL.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        timeout = getattr(settings, 'AUTH_USER_CACHE_SECONDS', 0)
+        if timeout <= 0:
+            return super().get_user(validated_token)
+
+        key = USER_KEY.format(user_id)
+        user = cache.get(key)
+        if user is None:
+            users = self.user_model.objects
+            if getattr(settings, 'AUTH_USER_CACHE_PROFILE', False):
+                # Pickled with the user, including "no profile"
+                users = users.select_related('profile')
+            try:
+                user = users.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            cache.set(key, user, timeout)
+
+        # The same checks as JWTAuthentication, on every request: a cached user
+        # may still face a token issued before its password changed
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
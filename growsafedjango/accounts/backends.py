@@ -1,20 +1,29 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.db.models.functions import Lower
 
 UserModel = get_user_model()
 
 class EmailOrUsernameModelBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
-        try:
-            # Try getting user by username
-            user = UserModel.objects.get(username=username)
-        except UserModel.DoesNotExist:
-            try:
-                # Try getting user by email
-                user = UserModel.objects.get(email=username)
-            except UserModel.DoesNotExist:
-                return None
+        # Login reads these from JSON, so they can be numbers, lists or missing
+        if not isinstance(username, str) or password is None:
+            return None
+        # One query: exact username or case-insensitive email, both served by an index
+        # (auth_user_email_lower_idx, see migration 0013)
+        candidates = list(
+            UserModel.objects.alias(email_lower=Lower('email'))
+            .filter(Q(username=username) | Q(email_lower=username.lower()))[:2]
+        )
+        user = next((c for c in candidates if c.username == username), None)
+        if user is None and len(candidates) == 1:
+            user = candidates[0]
 
-        if user.check_password(password):
+        if user is None:
+            # Hash anyway so unknown accounts take as long as wrong passwords
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
             return user
         return None
@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+from django.db import connections, router
+from django.db.models import F
+
+from .models import UserProfile
+
+CENT = Decimal('0.01')
+
+
+class InsufficientBalance(Exception):
+    pass
+
+
+def _as_decimal(value):
+    # SQLite hands NUMERIC arithmetic back as int/float
+    return value if isinstance(value, Decimal) else Decimal(str(value)).quantize(CENT)
+
+
+def _update_returning(connection):
+    # Django has no feature flag for UPDATE ... RETURNING; can_return_columns_from_insert
+    # is about INSERT and holds on MariaDB, which cannot return from an UPDATE.
+    # On SQLite both arrived in 3.35, so there it is the version check.
+    if connection.vendor == 'postgresql':
+        return True
+    return connection.vendor == 'sqlite' and connection.features.can_return_columns_from_insert
+
+
+def _apply(user_id, delta):
+    """Add ``delta`` to the profile's total in one conditional UPDATE and return the new total.
+
+    A negative delta only applies while ``total >= -delta``, so concurrent debits can
+    never overdraw and no update is lost to a read-modify-write race.
+    """
+    connection = connections[router.db_for_write(UserProfile)]
+    if _update_returning(connection):
+        qn = connection.ops.quote_name
+        where, params = f'{qn("user_id")} = %s', [delta, user_id]
+        if delta < 0:
+            where += f' AND {qn("total")} >= %s'
+            params.append(-delta)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {qn(UserProfile._meta.db_table)} SET {qn("total")} = {qn("total")} + %s '
+                f'WHERE {where} RETURNING {qn("total")}',
+                params,
+            )
+            row = cursor.fetchone()
+        new_total = _as_decimal(row[0]) if row else None
+    else:
+        profiles = UserProfile.objects.filter(user_id=user_id)
+        if delta < 0:
+            profiles = profiles.filter(total__gte=-delta)
+        updated = profiles.update(total=F('total') + delta)
+        new_total = UserProfile.objects.values_list('total', flat=True).get(user_id=user_id) if updated else None
+
+    if new_total is None:
+        # Only the failure path pays for telling the two cases apart
+        if not UserProfile.objects.filter(user_id=user_id).exists():
+            raise UserProfile.DoesNotExist(f'No profile for user {user_id}')
+        raise InsufficientBalance(f'Balance of user {user_id} is below {-delta}')
+    return new_total
+
+
+def credit(user_id, amount):
+    """Add ``amount`` to the user's balance and return the new balance."""
+    return _apply(user_id, Decimal(amount))
+
+
+def debit(user_id, amount):
+    """Take ``amount`` from the user's balance and return the new balance.
+
+    Raises InsufficientBalance, leaving the balance untouched, if it is below ``amount``.
+    """
+    return _apply(user_id, -Decimal(amount))
@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .models import UserProfile
+
+# Benchmarks measure our code, not PBKDF2; pass --real-hasher to include it
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@contextmanager
+def benchmark_database():
+    """Run against a throwaway on-disk database with the current schema, never the real one."""
+    directory = tempfile.mkdtemp(prefix='growsafe-bench-')
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    if connection.vendor == 'sqlite':
+        test_settings['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def seed_users(count, password, prefix='bench'):
+    """Bulk-insert ``count`` users and profiles sharing one precomputed password hash."""
+    hashed = make_password(password)
+    User.objects.bulk_create(
+        [User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password=hashed) for i in range(count)],
+        batch_size=1000,
+    )
+    UserProfile.objects.bulk_create(
+        [UserProfile(user_id=pk) for pk in User.objects.filter(username__startswith=prefix).values_list('id', flat=True)],
+        batch_size=1000,
+    )
+
+
+def count_queries(call):
+    """Run ``call()`` and return how many queries it issued on this thread's connection."""
+    with CaptureQueriesContext(connection) as captured:
+        call()
+    return len(captured.captured_queries)
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def summarize(latencies, elapsed, queries=None):
+    ordered = sorted(latencies)
+    stats = {
+        'requests': len(ordered),
+        'seconds': round(elapsed, 3),
+        'throughput': round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 2),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 2),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 2),
+    }
+    if queries:
+        stats['queries_per_request'] = round(sum(queries) / len(queries), 2)
+    return stats
+
+
+def run_concurrently(task, requests, concurrency):
+    """Call ``task(i)`` for i in range(requests) from ``concurrency`` threads and summarise latency.
+
+    ``task`` may return the number of queries it issued to have it averaged as well.
+    """
+    def timed(i):
+        started = time.perf_counter()
+        queries = task(i)
+        return time.perf_counter() - started, queries
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, range(requests)))
+    elapsed = time.perf_counter() - started
+    queries = [q for _, q in results if q is not None]
+    return summarize([latency for latency, _ in results], elapsed, queries)
+
+
+def run_in_processes(worker, jobs, processes=None):
+    """Call ``worker(job)`` for each job in freshly spawned, Django-initialised processes.
+
+    Each job gets its own process unless ``processes`` caps the pool. ``worker``
+    must be importable at module level; results come back in job order.
+    """
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes or len(jobs), initializer=django.setup) as pool:
+        return pool.map(worker, jobs, chunksize=1)
@@ -0,0 +1,63 @@
+import time
+from functools import lru_cache
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
+
+from .models import Counter, InvestmentOption
+
+# The version lives in a Counter row, so every worker agrees on it whatever the
+# cache backend; the cache only saves the lookup for VERSION_TIMEOUT seconds
+VERSION_NAME = 'catalog_version'
+VERSION_KEY = 'catalog:version'
+VERSION_TIMEOUT = 5
+DATA_KEY = 'catalog:{}'
+# Per-process tier: a handful of recent versions is plenty for a catalog that rarely changes
+LOCAL_VERSIONS = 8
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        counters = Counter.objects.using(DEFAULT_DB_ALIAS)
+        version = counters.filter(name=VERSION_NAME).values_list('value', flat=True).first()
+        if version is None:
+            # Seeded from the clock so a lost row never brings back an older version number
+            version = counters.get_or_create(name=VERSION_NAME, defaults={'value': time.time_ns()})[0].value
+        cache.set(VERSION_KEY, version, VERSION_TIMEOUT)
+    return version
+
+
+def bump_version():
+    if not Counter.objects.filter(name=VERSION_NAME).update(value=F('value') + 1):
+        get_version()
+    # Other workers with a per-process cache pick the bump up within VERSION_TIMEOUT
+    cache.delete(VERSION_KEY)
+
+
+def etag(version):
+    return f'"catalog-{version}"'
+
+
+@lru_cache(maxsize=LOCAL_VERSIONS)
+def get_options(version):
+    """The serialised catalog as of ``version``; shared between callers, so copy before mutating."""
+    options = cache.get(DATA_KEY.format(version))
+    if options is None:
+        # Always from the primary: a lagging replica must not be cached under a new version
+        options = tuple(
+            {
+                'id': option['id'],
+                'name': option['name'],
+                'min_investment': str(option['min_investment']),
+                'expected_return': str(option['expected_return']),
+                'risk_level': option['risk_level'],
+            }
+            for option in InvestmentOption.objects.using(DEFAULT_DB_ALIAS)
+            .order_by('id')
+            .values('id', 'name', 'min_investment', 'expected_return', 'risk_level')
+        )
+        cache.set(DATA_KEY.format(version), options, timeout=None)
+    return options
+
@@ -0,0 +1,127 @@
+import gzip
+import json
+import os
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .exports import EXPORT_CHUNK_SIZE, csv_header, csv_rows, jsonl_lines
+from .models import AccountActivity, Transaction
+from .serialization import isoformat, rows, serialize, text
+
+# Every dataset starts with the primary key: it orders the export and is the resume point
+TRANSACTION_FIELDS = (
+    ('id', 'id', None),
+    ('transaction_id', 'transaction_id', text),
+    ('user_id', 'user_id', None),
+    ('username', 'user__username', None),
+    ('type', 'transaction_type', None),
+    ('amount', 'amount', text),
+    ('status', 'status', None),
+    ('mobile_number', 'mobile_number', None),
+    ('notes', 'notes', None),
+    ('processed_by', 'processed_by__username', None),
+    ('created_at', 'created_at', isoformat),
+    ('updated_at', 'updated_at', isoformat),
+)
+
+ACTIVITY_FIELDS = (
+    ('id', 'id', None),
+    ('user_id', 'user_id', None),
+    ('username', 'user__username', None),
+    ('action', 'action', None),
+    ('ip_address', 'ip_address', None),
+    ('device', 'device', None),
+    ('timestamp', 'timestamp', isoformat),
+)
+
+# name -> (model, field the date range applies to, fields)
+DATASETS = {
+    'transactions': (Transaction, 'created_at', TRANSACTION_FIELDS),
+    'activity': (AccountActivity, 'timestamp', ACTIVITY_FIELDS),
+}
+FILE_FORMATS = ('csv', 'jsonl.gz')
+
+
+class CheckpointMismatch(ValueError):
+    pass
+
+
+def dataset_rows(dataset, start=None, end=None, after_id=0):
+    """values_list() rows of ``dataset`` in id order; ``start``/``end`` are inclusive dates."""
+    model, date_field, fields = DATASETS[dataset]
+    queryset = model.objects.filter(id__gt=after_id)
+    if start:
+        queryset = queryset.filter(**{f'{date_field}__gte': timezone.make_aware(datetime.combine(start, time.min))})
+    if end:
+        queryset = queryset.filter(
+            **{f'{date_field}__lt': timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))}
+        )
+    return rows(queryset.order_by('id'), fields)
+
+
+def _encode(data, fields, output):
+    names = [name for name, _, _ in fields]
+    if output == 'csv':
+        return ''.join(csv_rows(data, names)).encode()
+    # A complete gzip member per chunk: members concatenate into one valid file
+    return gzip.compress(''.join(jsonl_lines(data)).encode())
+
+
+def _save_checkpoint(path, state):
+    # Written beside the export and renamed, so a crash never leaves half a checkpoint
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(state, f)
+    os.replace(temporary, path)
+
+
+def write_export(dataset, output, path, start=None, end=None, resume=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """Write ``dataset`` to ``path`` a chunk at a time, checkpointing after every chunk.
+
+    The checkpoint (``path`` + ``.checkpoint``) records the last id written and
+    the file size at that point. With ``resume`` the file is cut back to that
+    size and the export carries on after that id, so an interrupted run never
+    duplicates or loses rows. Yields the checkpoint state after each chunk.
+    """
+    if output not in FILE_FORMATS:
+        raise ValueError(f'Output must be one of {", ".join(FILE_FORMATS)}')
+    fields = DATASETS[dataset][2]
+    checkpoint_path = f'{path}.checkpoint'
+    settings = {
+        'dataset': dataset, 'output': output,
+        'start': start.isoformat() if start else None, 'end': end.isoformat() if end else None,
+    }
+    state = {**settings, 'last_id': 0, 'offset': 0, 'rows': 0}
+    if resume and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            state = json.load(f)
+        if any(state[key] != value for key, value in settings.items()):
+            raise CheckpointMismatch(f'{checkpoint_path} belongs to a different export')
+
+    with open(path, 'r+b' if state['offset'] else 'wb') as f:
+        f.truncate(state['offset'])
+        f.seek(state['offset'])
+        if not state['offset'] and output == 'csv':
+            f.write(csv_header([name for name, _, _ in fields]).encode())
+
+        chunk = []
+        queryset = dataset_rows(dataset, start, end, after_id=state['last_id'])
+        for row in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) < chunk_size:
+                continue
+            state = _write_chunk(f, chunk, fields, output, state, checkpoint_path)
+            chunk = []
+            yield state
+        if chunk:
+            yield _write_chunk(f, chunk, fields, output, state, checkpoint_path)
+
+
+def _write_chunk(f, chunk, fields, output, state, checkpoint_path):
+    f.write(_encode(serialize(chunk, fields), fields, output))
+    f.flush()
+    os.fsync(f.fileno())
+    state = {**state, 'last_id': chunk[-1][0], 'offset': f.tell(), 'rows': state['rows'] + len(chunk)}
+    _save_checkpoint(checkpoint_path, state)
+    return state
@@ -0,0 +1,51 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import Counter, Investment, InvestmentOption, Transaction
+
+CACHE_KEY = 'accounts:counters'
+# Other processes see a change within this many seconds
+CACHE_TIMEOUT = 5
+
+# Counter name -> the rows it counts, used to seed and reconcile
+COUNTERS = {
+    'total_users': lambda: User.objects.all(),
+    'pending_transactions': lambda: Transaction.objects.filter(status='PENDING'),
+    'total_investments': lambda: Investment.objects.all(),
+    'active_options': lambda: InvestmentOption.objects.all(),
+}
+
+
+def _invalidate():
+    transaction.on_commit(lambda: cache.delete(CACHE_KEY))
+
+
+def increment(name, delta=1):
+    """Adjust a counter in the caller's transaction; use a negative delta to decrement."""
+    if not delta:
+        return
+    updated = Counter.objects.filter(name=name).update(value=F('value') + delta)
+    if not updated:
+        # Missing row (e.g. a flushed database): seed it from the rows as they are now
+        Counter.objects.get_or_create(name=name, defaults={'value': COUNTERS[name]().count()})
+    _invalidate()
+
+
+def get_counters():
+    values = cache.get(CACHE_KEY)
+    if values is None:
+        values = dict.fromkeys(COUNTERS, 0)
+        values.update(Counter.objects.filter(name__in=COUNTERS).values_list('name', 'value'))
+        cache.set(CACHE_KEY, values, CACHE_TIMEOUT)
+    return values
+
+
+def reconcile():
+    """Recount every counter from its table and return the new values."""
+    with transaction.atomic():
+        for name, rows in COUNTERS.items():
+            Counter.objects.update_or_create(name=name, defaults={'value': rows().count()})
+        _invalidate()
+    return get_counters()
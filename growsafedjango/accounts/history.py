@@ -0,0 +1,124 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from . import ledger
+from .models import DailyBalance, LedgerEntry
+
+HISTORY_CHUNK_SIZE = 1000
+BUCKETS = ('day', 'week', 'month')
+# Longest series a history request may return
+MAX_POINTS = 800
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def snapshot_day(day, chunk_size=HISTORY_CHUNK_SIZE):
+    """Write the closing balance on ``day`` of every user with ledger entries that day.
+
+    Each closing is the ledger balance before the day (from the latest ledger
+    snapshot) plus the day's entries, so users whose balance did not change are
+    never read and a skipped night leaves no error in later closings; run the
+    missed day to fill in its row. Safe to re-run. Returns the number of users written.
+    """
+    start, end = _day_start(day), _day_start(day + timedelta(days=1))
+    changes = (
+        LedgerEntry.objects.filter(created_at__gte=start, created_at__lt=end)
+        .values('user_id')
+        .annotate(delta=Sum('amount'))
+        .order_by('user_id')
+    )
+    written = 0
+    for chunk in _chunks(changes.iterator(), chunk_size):
+        openings = ledger.balances_before([row['user_id'] for row in chunk], start)
+        with transaction.atomic():
+            DailyBalance.objects.bulk_create(
+                [
+                    DailyBalance(user_id=row['user_id'], day=day, balance=openings[row['user_id']] + row['delta'])
+                    for row in chunk
+                ],
+                update_conflicts=True,
+                unique_fields=['user', 'day'],
+                update_fields=['balance'],
+            )
+        written += len(chunk)
+    return written
+
+
+def _bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(day, bucket):
+    if bucket == 'week':
+        return day + timedelta(days=7)
+    if bucket == 'month':
+        return (day + timedelta(days=32)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def auto_bucket(start, end):
+    days = (end - start).days
+    if days <= 92:
+        return 'day'
+    return 'week' if days <= 2 * 366 else 'month'
+
+
+def history(user_id, start, end, bucket):
+    """Closing balance at the end of each day/week/month bucket from ``start`` to ``end``.
+
+    The database returns only the last snapshot of each bucket, so a chart
+    reads at most one row per bucket plus the opening balance; buckets
+    without a change carry the previous balance forward.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f'bucket must be one of {", ".join(BUCKETS)}')
+    if start > end:
+        raise ValueError('start must not be after end')
+    first = _bucket_start(start, bucket)
+    buckets = []
+    while first <= end:
+        buckets.append(first)
+        first = _next_bucket(first, bucket)
+    if len(buckets) > MAX_POINTS:
+        raise ValueError(f'At most {MAX_POINTS} points; use a shorter range or a coarser bucket')
+
+    in_range = DailyBalance.objects.filter(user_id=user_id, day__gte=start, day__lte=end)
+    if bucket != 'day':
+        truncate = TruncWeek if bucket == 'week' else TruncMonth
+        last_days = in_range.annotate(bucket=truncate('day')).values('bucket').annotate(last=Max('day')).values('last')
+        in_range = DailyBalance.objects.filter(user_id=user_id, day__in=last_days)
+    closings = {_bucket_start(day, bucket): balance for day, balance in in_range.values_list('day', 'balance')}
+
+    balance = (
+        DailyBalance.objects.filter(user_id=user_id, day__lt=start)
+        .order_by('-day').values_list('balance', flat=True).first()
+    )
+    if balance is None:
+        # Nothing snapshotted before the range (e.g. it predates the job)
+        balance = ledger.balance(user_id, before=_day_start(start))
+    series = []
+    for day in buckets:
+        balance = closings.get(day, balance)
+        series.append({'date': day.isoformat(), 'balance': str(balance)})
+    return series
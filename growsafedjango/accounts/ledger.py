@@ -0,0 +1,171 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import BalanceSnapshot, LedgerEntry
+
+LEDGER_CHUNK_SIZE = 500
+# Rebuilds leave a snapshot every this many entries, bounding any as-of read
+SNAPSHOT_EVERY = 100
+
+
+def record(user_id, entry_type, amount, reference=''):
+    """Append one entry; ``amount`` is signed (credits positive, debits negative)."""
+    return LedgerEntry.objects.create(user_id=user_id, entry_type=entry_type, amount=amount, reference=reference)
+
+
+def record_many(entries, created_at=None):
+    """Append ``(user_id, entry_type, amount, reference)`` tuples with bulk inserts.
+
+    ``created_at`` dates every entry (it defaults to now), for jobs that book
+    a given day's changes whenever they happen to run.
+    """
+    dated = {'created_at': created_at} if created_at else {}
+    LedgerEntry.objects.bulk_create(
+        [LedgerEntry(user_id=user_id, entry_type=entry_type, amount=amount, reference=reference, **dated)
+         for user_id, entry_type, amount, reference in entries],
+        batch_size=LEDGER_CHUNK_SIZE,
+    )
+
+
+def balance(user_id, before=None):
+    """The user's ledger balance, or the balance just before ``before`` if given.
+
+    Reads the latest applicable snapshot plus the entries after it, so the
+    number of rows touched is bounded by how often snapshots are taken.
+    """
+    snapshots = BalanceSnapshot.objects.filter(user_id=user_id)
+    entries = LedgerEntry.objects.filter(user_id=user_id)
+    if before is not None:
+        snapshots = snapshots.filter(as_of__lt=before)
+        entries = entries.filter(created_at__lt=before)
+    snapshot = snapshots.order_by('-as_of', '-last_entry_id').values_list('last_entry_id', 'balance').first()
+    last_entry_id, opening = snapshot or (0, Decimal('0.00'))
+    tail = entries.filter(id__gt=last_entry_id).aggregate(total=Sum('amount'))['total']
+    return opening + (tail or Decimal('0.00'))
+
+
+def balances_before(user_ids, before):
+    """``balance(user_id, before=before)`` for many users in three queries: ``{user_id: balance}``."""
+    latest = (
+        BalanceSnapshot.objects.filter(user_id=OuterRef('user_id'), as_of__lt=before)
+        .order_by('-as_of', '-last_entry_id')
+    )
+    openings = dict(
+        BalanceSnapshot.objects.filter(last_entry_id__in=Subquery(
+            BalanceSnapshot.objects.filter(user_id__in=user_ids, as_of__lt=before)
+            .values('user_id').annotate(last=Subquery(latest.values('last_entry_id')[:1])).values('last')
+        )).values_list('user_id', 'balance')
+    )
+    tails = dict(
+        LedgerEntry.objects.filter(user_id__in=user_ids, created_at__lt=before)
+        .alias(since=Coalesce(Subquery(latest.values('last_entry_id')[:1]), 0))
+        .filter(id__gt=F('since'))
+        .values('user_id')
+        .annotate(total=Sum('amount'))
+        .values_list('user_id', 'total')
+        .order_by()
+    )
+    return {
+        user_id: openings.get(user_id, Decimal('0.00')) + (tails.get(user_id) or Decimal('0.00'))
+        for user_id in user_ids
+    }
+
+
+def _chunks(values, size=LEDGER_CHUNK_SIZE):
+    chunk = []
+    for value in values:
+        chunk.append(value)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _snapshot_chunk(user_ids):
+    latest = BalanceSnapshot.objects.filter(user_id=OuterRef('user_id')).order_by('-as_of', '-last_entry_id')
+    tails = (
+        LedgerEntry.objects.filter(user_id__in=user_ids)
+        .alias(since=Coalesce(Subquery(latest.values('last_entry_id')[:1]), 0))
+        .filter(id__gt=F('since'))
+        .values('user_id')
+        .annotate(delta=Sum('amount'), last_id=Max('id'), last_at=Max('created_at'))
+        .order_by()
+    )
+    tails = {row['user_id']: row for row in tails}
+    if not tails:
+        return 0
+    last_ids = BalanceSnapshot.objects.filter(user_id__in=tails).values('user_id').annotate(last=Max('last_entry_id'))
+    openings = {
+        user_id: (balance, as_of)
+        for user_id, balance, as_of in BalanceSnapshot.objects.filter(last_entry_id__in=[row['last'] for row in last_ids])
+        .values_list('user_id', 'balance', 'as_of')
+    }
+    snapshots = []
+    for user_id, row in tails.items():
+        opening, opened_at = openings.get(user_id, (Decimal('0.00'), None))
+        snapshots.append(BalanceSnapshot(
+            user_id=user_id,
+            last_entry_id=row['last_id'],
+            # Back-dated entries (accruals) can trail the previous snapshot's as_of
+            as_of=max(row['last_at'], opened_at) if opened_at else row['last_at'],
+            balance=opening + row['delta'],
+        ))
+    BalanceSnapshot.objects.bulk_create(snapshots)
+    return len(tails)
+
+
+def take_snapshots(chunk_size=LEDGER_CHUNK_SIZE):
+    """Snapshot every user with entries newer than the last snapshot run; returns how many."""
+    high_water = BalanceSnapshot.objects.aggregate(last=Max('last_entry_id'))['last'] or 0
+    user_ids = (
+        LedgerEntry.objects.filter(id__gt=high_water)
+        .order_by('user_id')
+        .values_list('user_id', flat=True)
+        .distinct()
+    )
+    taken = 0
+    for chunk in _chunks(user_ids.iterator(), chunk_size):
+        with transaction.atomic():
+            taken += _snapshot_chunk(chunk)
+    return taken
+
+
+def rebuild_snapshots(chunk_size=LEDGER_CHUNK_SIZE, every=SNAPSHOT_EVERY):
+    """Drop all snapshots and recompute them from the ledger, one chunk of users at a time.
+
+    Reads stay correct while this runs; they just sum more entries until the
+    user's snapshots are back. Returns the number of snapshots written.
+    """
+    BalanceSnapshot.objects.all().delete()
+    user_ids = LedgerEntry.objects.order_by('user_id').values_list('user_id', flat=True).distinct()
+    written = 0
+    for chunk in _chunks(list(user_ids.iterator()), chunk_size):
+        snapshots = []
+        entries = (
+            LedgerEntry.objects.filter(user_id__in=chunk)
+            .order_by('user_id', 'id')
+            .values_list('user_id', 'id', 'amount', 'created_at')
+        )
+        current, running, count, last = None, Decimal('0.00'), 0, None
+        for user_id, entry_id, amount, created_at in entries.iterator(chunk_size=5000):
+            if user_id != current:
+                if last and count % every:
+                    snapshots.append(BalanceSnapshot(user_id=current, last_entry_id=last[0], as_of=last[1], balance=running))
+                current, running, count, last = user_id, Decimal('0.00'), 0, None
+            running += amount
+            count += 1
+            # as_of is the latest created_at so far, not the last entry's: back-dated
+            # entries (accruals) mean id order is not created_at order
+            last = (entry_id, max(created_at, last[1]) if last else created_at)
+            if count % every == 0:
+                snapshots.append(BalanceSnapshot(user_id=user_id, last_entry_id=entry_id, as_of=last[1], balance=running))
+        if last and count % every:
+            snapshots.append(BalanceSnapshot(user_id=current, last_entry_id=last[0], as_of=last[1], balance=running))
+        with transaction.atomic():
+            BalanceSnapshot.objects.bulk_create(snapshots, batch_size=LEDGER_CHUNK_SIZE)
+        written += len(snapshots)
+    return written
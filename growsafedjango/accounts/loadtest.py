@@ -0,0 +1,308 @@
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import activity, urls
+from .benchmarking import FAST_HASHERS, seed_users, summarize
+from .models import AccountActivity, Investment, InvestmentOption, Transaction, UserProfile
+from .performance import record_queries
+
+PASSWORD = 'benchmark'
+# Transactions per admin_bulk_* request
+BULK_SIZE = 10
+STARTING_BALANCE = Decimal('100000.00')
+
+
+def _user(fx, i):
+    return fx['users'][i % len(fx['users'])]
+
+
+def _get(name, params=None, token=None, **kwargs):
+    return 'get', reverse(f'api-auth:{name}', kwargs=kwargs), params, token
+
+
+def _post(name, data, token=None, method='post', **kwargs):
+    return method, reverse(f'api-auth:{name}', kwargs=kwargs), data, token
+
+
+# URL name -> builder(fixture, request index, pooled items) returning
+# (method, path, data, bearer token). Every route in accounts/urls.py has one.
+ROUTES = {
+    'auth_root': lambda fx, i, items: _get('auth_root'),
+    'signup': lambda fx, i, items: _post('signup', {
+        'username': f'{fx["prefix"]}s{i}', 'email': f'{fx["prefix"]}s{i}@example.com', 'first_name': 'Load',
+        'last_name': 'Test', 'password': PASSWORD, 'confirm_password': PASSWORD,
+    }),
+    'login': lambda fx, i, items: _post('login', {'usernameOrEmail': _user(fx, i)['username'], 'password': PASSWORD}),
+    'logout': lambda fx, i, items: _post('logout', {'refresh': items[0]['refresh']}, items[0]['token']),
+    'token_refresh': lambda fx, i, items: _post('token_refresh', {'refresh': items[0]['refresh']}),
+    'profile': lambda fx, i, items: _get('profile', token=_user(fx, i)['token']),
+    'profile_transactions': lambda fx, i, items: _get('profile_transactions', token=_user(fx, i)['token']),
+    'profile_investments': lambda fx, i, items: _get('profile_investments', token=_user(fx, i)['token']),
+    'profile_balance': lambda fx, i, items: _get('profile_balance', token=_user(fx, i)['token']),
+    'profile_balance_history': lambda fx, i, items: _get('profile_balance_history', token=_user(fx, i)['token']),
+    'profile_projection': lambda fx, i, items: _get('profile_projection', token=_user(fx, i)['token']),
+    'account_activity': lambda fx, i, items: _get('account_activity', token=_user(fx, i)['token']),
+    'available_investments': lambda fx, i, items: _get('available_investments', token=_user(fx, i)['token']),
+    'deposit': lambda fx, i, items: _post('deposit', {'amount': '25.00', 'mobile_number': '0700000000'},
+                                          _user(fx, i)['token']),
+    'withdraw': lambda fx, i, items: _post('withdraw', {'amount': '5.00', 'mobile_number': '0700000000'},
+                                           _user(fx, i)['token']),
+    'invest': lambda fx, i, items: _post('invest', {'option_id': fx['options'][i % len(fx['options'])],
+                                                    'amount': '50.00'}, _user(fx, i)['token']),
+    'sell': lambda fx, i, items: _post('sell', {'investment_id': items[0]['investment']}, items[0]['token']),
+    'change_password': lambda fx, i, items: _post('change_password', {
+        'current_password': PASSWORD, 'new_password': PASSWORD}, _user(fx, i)['token']),
+    'admin_list_transactions': lambda fx, i, items: _get('admin_list_transactions', {'status': 'pending'}, fx['admin']),
+    'admin_export_transactions': lambda fx, i, items: _get('admin_export_transactions', {
+        'created_after': timezone.localdate().isoformat()}, fx['admin']),
+    'admin_compliance_export': lambda fx, i, items: _get('admin_compliance_export', {
+        'start': timezone.localdate().isoformat()}, fx['admin'], dataset='activity'),
+    'admin_bulk_approve_transactions': lambda fx, i, items: _post('admin_bulk_approve_transactions', {
+        'transaction_ids': items}, fx['admin']),
+    'admin_bulk_decline_transactions': lambda fx, i, items: _post('admin_bulk_decline_transactions', {
+        'transaction_ids': items, 'notes': 'load test'}, fx['admin']),
+    'admin_approve_transaction': lambda fx, i, items: _post('admin_approve_transaction', {}, fx['admin'],
+                                                            transaction_id=items[0]),
+    'admin_decline_transaction': lambda fx, i, items: _post('admin_decline_transaction', {'notes': 'load test'},
+                                                            fx['admin'], transaction_id=items[0]),
+    'admin_set_transaction_pending': lambda fx, i, items: _post('admin_set_transaction_pending', {}, fx['admin'],
+                                                                transaction_id=items[0]),
+    'admin_update_mobile': lambda fx, i, items: _post('admin_update_mobile', {'mobile_number': f'07{i:08d}'},
+                                                      fx['admin'], user_id=_user(fx, i)['id']),
+    'admin_metrics': lambda fx, i, items: _get('admin_metrics', token=fx['admin']),
+    'admin_performance': lambda fx, i, items: _get('admin_performance', token=fx['admin']),
+    'admin_projections': lambda fx, i, items: _get('admin_projections', token=fx['admin']),
+    'admin_transaction_report': lambda fx, i, items: _get('admin_transaction_report', {'group': 'month'}, fx['admin']),
+    'admin_create_user': lambda fx, i, items: _post('admin_create_user', {
+        'username': f'{fx["prefix"]}a{i}', 'email': f'{fx["prefix"]}a{i}@example.com', 'password': PASSWORD,
+    }, fx['admin']),
+    'admin_delete_user': lambda fx, i, items: _post('admin_delete_user', None, fx['admin'], method='delete',
+                                                    user_id=items[0]),
+    'admin_create_investment_option': lambda fx, i, items: _post('admin_create_investment_option', {
+        'name': f'Load fund {i}', 'min_investment': '10.00', 'expected_return': '1.20', 'risk_level': 'MEDIUM',
+    }, fx['admin']),
+    'admin_list_users': lambda fx, i, items: _get('admin_list_users', token=fx['admin']),
+    'admin_update_user': lambda fx, i, items: _post('admin_update_user', {'first_name': f'Load{i}'}, fx['admin'],
+                                                    user_id=_user(fx, i)['id']),
+}
+
+# Routes that use up seeded rows or tokens -> how many each request takes
+CONSUMES = {
+    'logout': 1,
+    'token_refresh': 1,
+    'sell': 1,
+    'admin_approve_transaction': 1,
+    'admin_decline_transaction': 1,
+    'admin_set_transaction_pending': 1,
+    'admin_bulk_approve_transactions': BULK_SIZE,
+    'admin_bulk_decline_transactions': BULK_SIZE,
+    'admin_delete_user': 1,
+}
+
+# Weighted request mixes; 'all-routes' hits every route equally
+MIXES = {
+    'mobile-dashboard': {
+        'profile': 20, 'profile_balance': 10, 'profile_transactions': 15, 'profile_investments': 10,
+        'profile_balance_history': 5, 'profile_projection': 5, 'available_investments': 10, 'account_activity': 5,
+        'token_refresh': 5, 'deposit': 5, 'withdraw': 3, 'invest': 4, 'sell': 3,
+    },
+    'admin-review': {
+        'admin_list_transactions': 25, 'admin_approve_transaction': 15, 'admin_decline_transaction': 5,
+        'admin_bulk_approve_transactions': 5, 'admin_bulk_decline_transactions': 2, 'admin_metrics': 15,
+        'admin_list_users': 10, 'admin_transaction_report': 10, 'admin_update_mobile': 5, 'admin_update_user': 3,
+        'admin_set_transaction_pending': 2, 'admin_projections': 2, 'admin_export_transactions': 1,
+    },
+    'login-storm': {'login': 85, 'token_refresh': 10, 'profile': 5},
+    # The async views
+    'async-reads': {
+        'profile': 30, 'available_investments': 20, 'account_activity': 20, 'admin_metrics': 10,
+        'admin_list_transactions': 10, 'admin_list_users': 10,
+    },
+    'all-routes': dict.fromkeys(ROUTES, 1),
+}
+
+
+def uncovered_routes():
+    """Named routes in accounts/urls.py without a builder in ROUTES."""
+    return sorted({pattern.name for pattern in urls.urlpatterns} - set(ROUTES))
+
+
+def build_plan(mix, requests, seed=0):
+    """``[(route, occurrence)]`` for ``requests`` requests drawn from ``mix`` with a fixed seed."""
+    weights = MIXES[mix]
+    routes = random.Random(seed).choices(list(weights), list(weights.values()), k=requests)
+    seen = Counter()
+    plan = []
+    for route in routes:
+        plan.append((route, seen[route]))
+        seen[route] += 1
+    return plan
+
+
+def seed_fixture(users, plan, prefix='load'):
+    """Seed a platform for ``plan`` and return the picklable fixture the requests are built from.
+
+    Besides users with some history, every consuming request in the plan gets
+    rows of its own (pending transactions, investments, refresh tokens, users
+    to delete), so no request finds its target already gone.
+    """
+    seed_users(users, PASSWORD, prefix=prefix)
+    UserProfile.objects.update(total=STARTING_BALANCE)
+    admin = User.objects.create_superuser(f'{prefix}-admin', f'{prefix}-admin@example.com', PASSWORD)
+    options = [
+        InvestmentOption.objects.create(name=name, min_investment=Decimal('10.00'), expected_return=rate, risk_level=risk)
+        for name, rate, risk in (('Money market', Decimal('0.50'), 'LOW'), ('Balanced', Decimal('1.00'), 'MEDIUM'),
+                                 ('Growth', Decimal('2.00'), 'HIGH'))
+    ]
+    seeded = list(User.objects.filter(username__startswith=prefix, is_superuser=False).order_by('id'))
+    Transaction.objects.bulk_create([
+        Transaction(user=user, transaction_type='DEPOSIT' if n % 3 else 'WITHDRAWAL', amount=Decimal(10 * (n + 1)),
+                    status=('APPROVED', 'DECLINED', 'APPROVED')[n % 3])
+        for user in seeded for n in range(5)
+    ], batch_size=1000)
+    Investment.objects.bulk_create([
+        Investment(user=user, option=options[n], name=options[n].name, amount=Decimal('100.00'),
+                   daily_return_rate=options[n].expected_return / 100)
+        for user in seeded for n in range(len(options))
+    ], batch_size=1000)
+    AccountActivity.objects.bulk_create([
+        AccountActivity(user=user, action='Logged in', ip_address='127.0.0.1', device='load test')
+        for user in seeded for _ in range(5)
+    ], batch_size=1000)
+
+    # Tokens for the users the plan can reach; access tokens need no database row
+    active = seeded[:min(len(seeded), len(plan))]
+    fixture = {
+        'prefix': prefix,
+        'admin': str(AccessToken.for_user(admin)),
+        'options': [option.id for option in options],
+        'users': [{'id': user.id, 'username': user.username, 'token': str(AccessToken.for_user(user))}
+                  for user in active],
+        'pools': {},
+    }
+    needed = Counter(route for route, _ in plan)
+    for route, per_request in CONSUMES.items():
+        count = needed[route] * per_request
+        if count:
+            fixture['pools'][route] = _seed_pool(route, count, seeded, options, prefix)
+    return fixture
+
+
+def _seed_pool(route, count, seeded, options, prefix):
+    owners = [seeded[n % len(seeded)] for n in range(count)]
+    if route in ('logout', 'token_refresh'):
+        # RefreshToken.for_user() records an OutstandingToken, which rotation and blacklisting need
+        return [{'refresh': str(RefreshToken.for_user(user)), 'token': str(AccessToken.for_user(user))}
+                for user in owners]
+    if route == 'sell':
+        investments = Investment.objects.bulk_create([
+            Investment(user=user, option=options[0], name=options[0].name, amount=Decimal('20.00'),
+                       daily_return_rate=options[0].expected_return / 100)
+            for user in owners
+        ], batch_size=1000)
+        return [{'investment': investment.id, 'token': str(AccessToken.for_user(user))}
+                for investment, user in zip(investments, owners)]
+    if route == 'admin_delete_user':
+        User.objects.bulk_create([User(username=f'{prefix}-gone{n}', email=f'{prefix}-gone{n}@example.com')
+                                  for n in range(count)], batch_size=1000)
+        return list(User.objects.filter(username__startswith=f'{prefix}-gone').order_by('id').values_list('id', flat=True))
+    status = 'APPROVED' if route == 'admin_set_transaction_pending' else 'PENDING'
+    transactions = Transaction.objects.bulk_create([
+        Transaction(user=user, transaction_type='DEPOSIT', amount=Decimal('15.00'), status=status) for user in owners
+    ], batch_size=1000)
+    return [tx.id for tx in transactions]
+
+
+def _build(fx, plan, i):
+    route, occurrence = plan[i]
+    per_request = CONSUMES.get(route, 0)
+    items = fx['pools'].get(route, [])[occurrence * per_request:(occurrence + 1) * per_request]
+    return route, ROUTES[route](fx, i, items)
+
+
+def _send(client, request):
+    method, path, data, token = request
+    headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+    if method == 'get':
+        response = client.get(path, data, **headers)
+    else:
+        response = getattr(client, method)(path, data, content_type='application/json', **headers)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response.status_code
+
+
+def run_requests(fx, plan, indexes, concurrency):
+    """Send ``plan[i]`` for each i in ``indexes`` from ``concurrency`` threads
+    (in the calling thread when ``concurrency`` is 1).
+
+    Returns ``[(route, seconds, queries, status)]``; building a request (and
+    reversing its URL) is not timed.
+    """
+    local = threading.local()
+
+    def call(i):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        route, request = _build(fx, plan, i)
+        with record_queries() as recorder:
+            started = time.perf_counter()
+            status = _send(local.client, request)
+            elapsed = time.perf_counter() - started
+        return route, elapsed, recorder.count, status
+
+    if concurrency <= 1:
+        return [call(i) for i in indexes]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(call, indexes))
+
+
+def run_settings(fast_hashers):
+    # DEBUG would keep every query in memory, which production never does
+    overrides = {'DEBUG': False}
+    if fast_hashers:
+        overrides['PASSWORD_HASHERS'] = FAST_HASHERS
+    return overrides
+
+
+def process_worker(job):
+    """Runs in a child process: this process's share of the plan against the seeded database."""
+    database, fx, plan, indexes, concurrency, fast_hashers = job
+    connection.close()
+    connection.settings_dict['NAME'] = database
+    with override_settings(**run_settings(fast_hashers)):
+        started = time.time()
+        samples = run_requests(fx, plan, indexes, concurrency)
+        finished = time.time()
+        activity.flush()
+    connections.close_all()
+    return started, finished, samples
+
+
+def report(samples, elapsed):
+    """Overall and per-route throughput, latency percentiles, queries per request and errors."""
+    def stats(group):
+        result = summarize([s[1] for s in group], elapsed, [s[2] for s in group])
+        result['errors'] = sum(s[3] >= 400 for s in group)
+        result['statuses'] = {str(code): n for code, n in sorted(Counter(s[3] for s in group).items())}
+        return result
+
+    by_route = defaultdict(list)
+    for sample in samples:
+        by_route[sample[0]].append(sample)
+    return {
+        'overall': stats(samples),
+        'routes': {route: stats(group) for route, group in sorted(by_route.items())},
+    }
@@ -0,0 +1,32 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.accrual import ACCRUAL_CHUNK_SIZE, AccrualError, accrue_daily_earnings
+
+
+class Command(BaseCommand):
+    help = "Credits each user's daily investment earnings (run once a day, e.g. from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day to accrue as YYYY-MM-DD (defaults to today); days missed since the last run are accrued first')
+        parser.add_argument('--chunk-size', type=int, default=ACCRUAL_CHUNK_SIZE)
+        parser.add_argument('--force', action='store_true',
+                            help='Re-run a completed day; already credited profiles are still skipped')
+
+    def handle(self, *args, **options):
+        day = None
+        if options['date']:
+            try:
+                day = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['date']}")
+
+        try:
+            marker = accrue_daily_earnings(day=day, chunk_size=options['chunk_size'], force=options['force'])
+        except AccrualError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Accrued {marker.day}: {marker.profiles_credited} profiles credited, "
+            f"{marker.total_credited} in total"
+        ))
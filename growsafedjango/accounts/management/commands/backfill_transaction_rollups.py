@@ -0,0 +1,37 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from accounts.models import Transaction
+from accounts.rollups import BACKFILL_CHUNK_DAYS, rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the transaction rollups from the Transaction table, a chunk of days at a time"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day as YYYY-MM-DD (defaults to the oldest transaction)')
+        parser.add_argument('--end', help='Last day as YYYY-MM-DD (defaults to the newest transaction)')
+        parser.add_argument('--chunk-days', type=int, default=BACKFILL_CHUNK_DAYS)
+
+    def _day(self, value):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"Invalid date: {value}")
+
+    def handle(self, *args, **options):
+        bounds = Transaction.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+        if bounds['first'] is None and not (options['start'] and options['end']):
+            self.stdout.write("No transactions")
+            return
+        start = self._day(options['start']) if options['start'] else timezone.localdate(bounds['first'])
+        end = self._day(options['end']) if options['end'] else timezone.localdate(bounds['last'])
+
+        written = 0
+        for first, last, rows in rebuild(start, end, chunk_days=options['chunk_days']):
+            written += rows
+            self.stdout.write(f"{first} to {last}: {rows} rollups")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} rollups from {start} to {end}"))
@@ -0,0 +1,208 @@
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from accounts import loadtest
+from accounts.benchmarking import benchmark_database, summarize
+
+# One worker each, so the numbers are per worker process
+SERVERS = {
+    'asgi': lambda port, threads: [
+        '-m', 'uvicorn', 'growsafedjango.asgi:application', '--host', '127.0.0.1', '--port', str(port),
+        '--workers', '1', '--timeout-keep-alive', '60', '--no-access-log', '--log-level', 'warning',
+    ],
+    'wsgi': lambda port, threads: [
+        '-m', 'gunicorn', 'growsafedjango.wsgi:application', '--bind', f'127.0.0.1:{port}',
+        '--workers', '1', '--worker-class', 'gthread', '--threads', str(threads), '--keep-alive', '60',
+        '--log-level', 'warning',
+    ],
+}
+STARTUP_SECONDS = 30
+# Slow clients send their request in this many pieces
+TRICKLE_PIECES = 5
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _encode(request):
+    method, path, data, token = request
+    if data:
+        path = f'{path}?{urlencode(data)}'
+    lines = [f'{method.upper()} {path} HTTP/1.1', 'Host: 127.0.0.1', 'Connection: keep-alive']
+    if token:
+        lines.append(f'Authorization: Bearer {token}')
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode()
+
+
+async def _read_response(reader):
+    """Read one response off a keep-alive connection; returns ``(status, keep_alive)``."""
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    status = int(head[0].split()[1])
+    headers = {}
+    for line in head[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip().lower()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    return status, headers.get('connection') != 'close'
+
+
+async def _client(port, payloads, offset, slow, deadline, options, samples):
+    """One connection sending requests with think time until ``deadline``.
+
+    Latency runs from the last byte of the request to the end of the response,
+    so a slow client's own trickle is not counted, only the waiting it causes.
+    Think times are jittered so the connections do not fire in lockstep.
+    """
+    rng = random.Random(offset)
+    think = options['think_ms'] / 1000
+    pause = options['trickle_ms'] / 1000 / TRICKLE_PIECES
+    timeout = options['timeout_ms'] / 1000
+    writer = None
+    i = offset
+    try:
+        await asyncio.sleep(rng.uniform(0, think))
+        while time.perf_counter() < deadline:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+            payload = payloads[i % len(payloads)]
+            i += 1
+            if slow:
+                step = -(-len(payload) // TRICKLE_PIECES)
+                for start in range(0, len(payload), step):
+                    writer.write(payload[start:start + step])
+                    await writer.drain()
+                    if start + step < len(payload):
+                        await asyncio.sleep(pause)
+            else:
+                writer.write(payload)
+                await writer.drain()
+            sent = time.perf_counter()
+            status, keep_alive = await asyncio.wait_for(_read_response(reader), timeout)
+            samples.append((time.perf_counter() - sent, status))
+            if not keep_alive:
+                writer.close()
+                writer = None
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * think)
+    except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ValueError):
+        samples.append((None, None))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def _step(port, payloads, connections, options):
+    """Hold ``connections`` connections for the step's duration; a fraction of them are slow clients."""
+    samples = []
+    slow_every = round(1 / options['slow_fraction']) if options['slow_fraction'] else 0
+    started = time.perf_counter()
+    deadline = started + options['duration']
+    await asyncio.gather(*(
+        _client(port, payloads, n * 7, bool(slow_every) and n % slow_every == 0, deadline, options, samples)
+        for n in range(connections)
+    ))
+    elapsed = time.perf_counter() - started
+    latencies = [latency for latency, status in samples if latency is not None]
+    stats = summarize(latencies, elapsed)
+    stats['connections'] = connections
+    stats['errors'] = sum(status is None or status >= 400 for _, status in samples)
+    return stats
+
+
+def _wait_until_listening(process, port, log):
+    started = time.monotonic()
+    while time.monotonic() - started < STARTUP_SECONDS:
+        if process.poll() is not None:
+            log.seek(0)
+            raise CommandError(f'Server exited with {process.returncode}:\n{log.read().decode(errors="replace")}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Server did not listen on port {port} within {STARTUP_SECONDS}s')
+
+
+class Command(BaseCommand):
+    help = ("Serves the async read endpoints from one ASGI (uvicorn) and one WSGI (gunicorn gthread) worker "
+            "and measures how many concurrent keep-alive connections each holds within a latency target")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', default=','.join(SERVERS), help=f'Comma-separated: {", ".join(SERVERS)}')
+        parser.add_argument('--connections', default='16,32,64,128,256', help='Comma-separated concurrent connection counts')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per connection count')
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=8, help='Threads in the WSGI worker')
+        parser.add_argument('--think-ms', type=int, default=2000, help='Pause between requests on a connection')
+        parser.add_argument('--slow-fraction', type=float, default=0.5,
+                            help='Share of connections that trickle their requests in, like mobile clients')
+        parser.add_argument('--trickle-ms', type=int, default=2000, help='How long a slow client takes to send a request')
+        parser.add_argument('--timeout-ms', type=int, default=10000, help='A response slower than this is an error')
+        parser.add_argument('--slo-ms', type=float, default=250, help='p99 latency a connection count must stay within')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        servers = options['servers'].split(',')
+        unknown = [name for name in servers if name not in SERVERS]
+        if unknown:
+            raise CommandError(f"Unknown server: {', '.join(unknown)}")
+        ladder = [int(count) for count in options['connections'].split(',')]
+
+        with benchmark_database():
+            plan = loadtest.build_plan('async-reads', 1000, options['seed'])
+            fx = loadtest.seed_fixture(options['users'], plan, prefix='bench')
+            payloads = [_encode(loadtest._build(fx, plan, i)[1]) for i in range(len(plan))]
+            # The servers read the seeded file instead of the configured database
+            env = dict(os.environ, GROWSAFE_DB=str(connection.settings_dict['NAME']))
+
+            held = {}
+            for name in servers:
+                port = _free_port()
+                with tempfile.TemporaryFile() as log:
+                    process = subprocess.Popen(
+                        [sys.executable, *SERVERS[name](port, options['threads'])],
+                        cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+                    )
+                    try:
+                        _wait_until_listening(process, port, log)
+                        # Import the views and open the connections before anything is timed
+                        asyncio.run(_step(port, payloads, 4, dict(options, duration=2, slow_fraction=0)))
+                        held[name] = 0
+                        within = True
+                        for connections in ladder:
+                            stats = asyncio.run(_step(port, payloads, connections, options))
+                            self.stdout.write(
+                                f"{name}: {connections:>5} connections, {stats['throughput']} req/s, "
+                                f"p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms, {stats['errors']} errors"
+                            )
+                            within = within and not stats['errors'] and stats['p99_ms'] <= options['slo_ms']
+                            if within:
+                                held[name] = connections
+                    finally:
+                        process.terminate()
+                        process.wait()
+
+        for name, connections in held.items():
+            self.stdout.write(f"{name} held {connections} connections per worker within a {options['slo_ms']:g} ms p99")
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+
+from accounts import activity
+from accounts.benchmarking import FAST_HASHERS, benchmark_database, count_queries, run_concurrently, seed_users
+
+
+class Command(BaseCommand):
+    help = "Measures login (by username and by email) and signup latency and queries per request"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--real-hasher', action='store_true',
+                            help='Hash with the configured PASSWORD_HASHERS instead of a fast one')
+
+    def handle(self, *args, **options):
+        users = options['users']
+        hashers = {} if options['real_hasher'] else {'PASSWORD_HASHERS': FAST_HASHERS}
+        with benchmark_database(), override_settings(**hashers):
+            self.stdout.write(f"Seeding {users} users...")
+            seed_users(users, 'benchmark')
+
+            def post(url, data):
+                def call():
+                    response = Client().post(url, data, content_type='application/json')
+                    assert response.status_code in (200, 201), response.content
+                return count_queries(call)
+
+            scenarios = {
+                'login (username)': lambda i: post('/api/auth/login/', {
+                    'usernameOrEmail': f'bench{i * 7919 % users}', 'password': 'benchmark'}),
+                'login (email)': lambda i: post('/api/auth/login/', {
+                    'usernameOrEmail': f'BENCH{i * 7919 % users}@example.com', 'password': 'benchmark'}),
+                'signup': lambda i: post('/api/auth/signup/', {
+                    'username': f'signup{i}', 'email': f'signup{i}@example.com', 'first_name': 'Bench',
+                    'last_name': 'Mark', 'password': 'benchmark', 'confirm_password': 'benchmark'}),
+            }
+            for name, task in scenarios.items():
+                stats = run_concurrently(task, options['requests'], options['concurrency'])
+                self.stdout.write(
+                    f"{name:>17}: {stats['throughput']} req/s, p50 {stats['p50_ms']} ms, "
+                    f"p99 {stats['p99_ms']} ms, {stats['queries_per_request']} queries/request"
+                )
+            activity.flush()
+        self.stdout.write(self.style.SUCCESS("Done"))
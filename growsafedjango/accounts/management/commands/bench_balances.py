@@ -0,0 +1,87 @@
+import random
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import balances
+from accounts.benchmarking import benchmark_database, run_concurrently, seed_users
+from accounts.models import UserProfile
+
+OPENING_BALANCE = Decimal('1000.00')
+
+
+def read_modify_write(user_id, delta):
+    # How balances used to be changed: racy, kept here for comparison
+    profile = UserProfile.objects.get(user_id=user_id)
+    if profile.total + delta < 0:
+        raise balances.InsufficientBalance
+    profile.total += delta
+    profile.save(update_fields=['total'])
+
+
+def conditional_update(user_id, delta):
+    if delta < 0:
+        balances.debit(user_id, -delta)
+    else:
+        balances.credit(user_id, delta)
+
+
+class Command(BaseCommand):
+    help = "Hammers balances from many threads and checks that no update is lost"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--operations', type=int, default=4000)
+        parser.add_argument('--concurrency', default='1,2,4,8',
+                            help='Comma-separated thread counts to run, e.g. 1,4,16')
+        parser.add_argument('--compare', action='store_true',
+                            help='Also run the old read-modify-write approach to show lost updates')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        strategies = {'conditional update': conditional_update}
+        if options['compare']:
+            strategies['read-modify-write'] = read_modify_write
+
+        failed = False
+        with benchmark_database():
+            seed_users(options['users'], 'benchmark')
+            user_ids = list(UserProfile.objects.values_list('user_id', flat=True))
+            rng = random.Random(options['seed'])
+            operations = [
+                (rng.choice(user_ids), Decimal(rng.randint(-5000, 4000)) / 100)
+                for _ in range(options['operations'])
+            ]
+
+            for name, apply in strategies.items():
+                for concurrency in levels:
+                    UserProfile.objects.update(total=OPENING_BALANCE)
+                    applied = []
+
+                    def task(i):
+                        user_id, delta = operations[i]
+                        try:
+                            apply(user_id, delta)
+                        except balances.InsufficientBalance:
+                            return
+                        applied.append((user_id, delta))
+
+                    stats = run_concurrently(task, len(operations), concurrency)
+                    expected = defaultdict(lambda: OPENING_BALANCE)
+                    for user_id, delta in applied:
+                        expected[user_id] += delta
+                    actual = dict(UserProfile.objects.values_list('user_id', 'total'))
+                    lost = sum(1 for user_id in user_ids if actual[user_id] != expected[user_id])
+                    negative = sum(1 for total in actual.values() if total < 0)
+                    self.stdout.write(
+                        f"{name:>18} x{concurrency:<3} {stats['throughput']:>8} ops/s, "
+                        f"p99 {stats['p99_ms']} ms, {len(applied)} applied, "
+                        f"{lost} balances wrong, {negative} overdrawn"
+                    )
+                    if apply is conditional_update and (lost or negative):
+                        failed = True
+        if failed:
+            raise CommandError("Conditional updates lost or overdrew a balance")
+        self.stdout.write(self.style.SUCCESS("No lost updates"))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+
+from accounts import activity
+from accounts.benchmarking import FAST_HASHERS, benchmark_database, run_concurrently, seed_users
+
+
+class Command(BaseCommand):
+    help = "Measures login throughput with synchronous and with buffered activity logging"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--real-hasher', action='store_true',
+                            help='Hash with the configured PASSWORD_HASHERS instead of a fast one')
+
+    def handle(self, *args, **options):
+        hashers = {} if options['real_hasher'] else {'PASSWORD_HASHERS': FAST_HASHERS}
+        with benchmark_database(), override_settings(**hashers):
+            seed_users(options['users'], 'benchmark')
+
+            def login(i):
+                response = Client().post(
+                    '/api/auth/login/',
+                    {'usernameOrEmail': f"bench{i % options['users']}", 'password': 'benchmark'},
+                    content_type='application/json',
+                )
+                assert response.status_code == 200, response.content
+
+            for buffered in (False, True):
+                with override_settings(ACTIVITY_LOG_BUFFERED=buffered):
+                    stats = run_concurrently(login, options['requests'], options['concurrency'])
+                    activity.flush()
+                label = 'buffered' if buffered else 'synchronous'
+                self.stdout.write(
+                    f"{label:>12}: {stats['throughput']} logins/s, "
+                    f"p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms, p99 {stats['p99_ms']} ms"
+                )
+        self.stdout.write(self.style.SUCCESS("Done"))
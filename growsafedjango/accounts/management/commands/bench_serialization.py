@@ -0,0 +1,76 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from accounts.benchmarking import benchmark_database, seed_users
+from accounts.models import Transaction
+from accounts.renderers import FastJSONRenderer
+from accounts.serialization import rows, serialize
+from accounts.views import ADMIN_TRANSACTION_FIELDS
+
+
+def model_rows(queryset):
+    # How admin_list_transactions used to build its rows, kept for comparison
+    return [
+        {
+            'id': tx.id,
+            'user': tx.user.username,
+            'type': tx.transaction_type,
+            'amount': str(tx.amount),
+            'status': tx.status,
+            'mobile_number': tx.mobile_number,
+            'created_at': tx.created_at,
+            'updated_at': tx.updated_at,
+            'processed_by': tx.processed_by.username if tx.processed_by else None,
+            'notes': tx.notes,
+            'transaction': str(tx.transaction_id),
+        }
+        for tx in queryset.select_related('user', 'processed_by')
+    ]
+
+
+def tuple_rows(queryset):
+    return serialize(rows(queryset, ADMIN_TRANSACTION_FIELDS), ADMIN_TRANSACTION_FIELDS)
+
+
+class Command(BaseCommand):
+    help = "Measures rows/s for building and rendering a list response, before and after the fast path"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=5, help='Best of this many runs is reported')
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_users(50, 'benchmark')
+            user_ids = list(User.objects.values_list('id', flat=True))
+            Transaction.objects.bulk_create([
+                Transaction(user_id=user_ids[n % len(user_ids)], transaction_type='DEPOSIT',
+                            amount=Decimal(n % 5000) + Decimal('0.25'), notes='benchmark')
+                for n in range(options['rows'])
+            ], batch_size=1000)
+            queryset = Transaction.objects.order_by('id')
+
+            paths = {
+                'model instances + JSONRenderer': (model_rows, JSONRenderer()),
+                'values_list + FastJSONRenderer': (tuple_rows, FastJSONRenderer()),
+            }
+            for name, (build, renderer) in paths.items():
+                build_time = render_time = float('inf')
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    data = build(queryset)
+                    built = time.perf_counter()
+                    renderer.render(data)
+                    build_time = min(build_time, built - started)
+                    render_time = min(render_time, time.perf_counter() - built)
+                count = len(data)
+                self.stdout.write(
+                    f"{name:>32}: build {count / build_time:>9.0f} rows/s, "
+                    f"render {count / render_time:>9.0f} rows/s, "
+                    f"total {count / (build_time + render_time):>9.0f} rows/s"
+                )
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,104 @@
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from accounts import approvals
+from accounts.benchmarking import benchmark_database, percentile, run_in_processes, seed_users
+from accounts.models import AccountActivity, Transaction
+
+PROFILES = {
+    'default': {},
+    'production': settings.SQLITE_OPTIONS,
+}
+
+
+def write_worker(job):
+    """Runs in a child process: a mix of activity logs, deposit requests and approvals."""
+    database, options, user_ids, pending_ids, admin_id, operations = job
+    connection.close()
+    connection.settings_dict.update(NAME=database, OPTIONS=options)
+    admin = User.objects.get(id=admin_id)
+
+    latencies, locked = [], 0
+    started = time.time()
+    for i in range(operations):
+        user_id = user_ids[i % len(user_ids)]
+        began = time.perf_counter()
+        try:
+            if i % 3 == 0:
+                AccountActivity.objects.create(user_id=user_id, action='Logged in', ip_address='127.0.0.1')
+            elif i % 3 == 1:
+                Transaction.objects.create(user_id=user_id, transaction_type='DEPOSIT', amount=Decimal('10.00'))
+            else:
+                approvals.approve_transactions([pending_ids[i // 3]], admin)
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+            continue
+        latencies.append(time.perf_counter() - began)
+    finished = time.time()
+    connection.close()
+    return started, finished, latencies, locked
+
+
+class Command(BaseCommand):
+    help = "Writes from several processes at once against default and production SQLite settings"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', default='1,2,4,8',
+                            help='Comma-separated process counts to run, e.g. 2,8')
+        parser.add_argument('--operations', type=int, default=600, help='Writes per process')
+        parser.add_argument('--users', type=int, default=100)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write("Only meaningful on SQLite; skipping")
+            return
+        levels = [int(level) for level in options['processes'].split(',')]
+        operations = options['operations']
+        approvals_per_process = (operations + 2) // 3
+        old_options = connection.settings_dict.get('OPTIONS', {})
+
+        try:
+            for profile, profile_options in PROFILES.items():
+                for processes in levels:
+                    # Journal mode sticks to the file, so every run gets a fresh database
+                    connection.close()
+                    connection.settings_dict['OPTIONS'] = profile_options
+                    with benchmark_database():
+                        seed_users(options['users'], 'benchmark')
+                        user_ids = list(User.objects.values_list('id', flat=True))
+                        admin = User.objects.create_user(username='bench-admin', is_staff=True)
+                        Transaction.objects.bulk_create([
+                            Transaction(user_id=user_ids[n % len(user_ids)], transaction_type='DEPOSIT',
+                                        amount=Decimal('25.00'))
+                            for n in range(processes * approvals_per_process)
+                        ], batch_size=1000)
+                        pending = list(Transaction.objects.order_by('id').values_list('id', flat=True))
+                        jobs = [
+                            (connection.settings_dict['NAME'], profile_options, user_ids,
+                             pending[p * approvals_per_process:(p + 1) * approvals_per_process],
+                             admin.id, operations)
+                            for p in range(processes)
+                        ]
+                        connection.close()
+                        results = run_in_processes(write_worker, jobs)
+
+                    elapsed = max(r[1] for r in results) - min(r[0] for r in results)
+                    latencies = sorted(latency for r in results for latency in r[2])
+                    locked = sum(r[3] for r in results)
+                    self.stdout.write(
+                        f"{profile:>10} x{processes:<3} {len(latencies) / elapsed:>8.1f} writes/s, "
+                        f"p50 {percentile(latencies, 50) * 1000:.2f} ms, "
+                        f"p99 {percentile(latencies, 99) * 1000:.2f} ms, "
+                        f"{locked} 'database is locked' errors"
+                    )
+        finally:
+            connection.close()
+            connection.settings_dict['OPTIONS'] = old_options
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts.profiles import PROFILE_CHUNK_SIZE, backfill_profiles
+
+
+class Command(BaseCommand):
+    help = "Creates UserProfile for users without one"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=PROFILE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        created = backfill_profiles(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Created {created} profiles"))
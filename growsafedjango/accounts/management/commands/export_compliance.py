@@ -0,0 +1,42 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.compliance import DATASETS, FILE_FORMATS, CheckpointMismatch, write_export
+from accounts.exports import EXPORT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Dumps transactions or account activity for auditors as CSV or gzip JSON Lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('path', help='File to write; its checkpoint goes next to it as <path>.checkpoint')
+        parser.add_argument('--output', choices=FILE_FORMATS, default='jsonl.gz')
+        parser.add_argument('--start', help='First day as YYYY-MM-DD')
+        parser.add_argument('--end', help='Last day as YYYY-MM-DD')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue an interrupted export from its checkpoint')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def _day(self, value):
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"Invalid date: {value}")
+
+    def handle(self, *args, **options):
+        state = None
+        try:
+            for state in write_export(
+                options['dataset'], options['output'], options['path'],
+                start=self._day(options['start']), end=self._day(options['end']),
+                resume=options['resume'], chunk_size=options['chunk_size'],
+            ):
+                self.stdout.write(f"{state['rows']} rows, up to id {state['last_id']}")
+        except CheckpointMismatch as e:
+            raise CommandError(str(e))
+        rows = state['rows'] if state else 0
+        self.stdout.write(self.style.SUCCESS(f"Exported {rows} {options['dataset']} rows to {options['path']}"))
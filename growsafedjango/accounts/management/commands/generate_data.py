@@ -0,0 +1,108 @@
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts import counters, rollups, synthetic
+from accounts.benchmarking import run_in_processes
+from accounts.models import InvestmentOption
+
+DEFAULT_OPTIONS = (
+    ('Money Market Fund', Decimal('100.00'), Decimal('0.35'), 'LOW'),
+    ('Balanced Fund', Decimal('500.00'), Decimal('0.80'), 'MEDIUM'),
+    ('Equity Growth Fund', Decimal('1000.00'), Decimal('1.50'), 'HIGH'),
+)
+
+
+class Command(BaseCommand):
+    help = "Bulk-generates realistic users, profiles, transactions, investments and activity for benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--transactions-per-user', type=float, default=20,
+                            help='Mean per user; individual counts are heavily skewed')
+        parser.add_argument('--investments-per-user', type=float, default=3)
+        parser.add_argument('--activity-per-user', type=float, default=30)
+        parser.add_argument('--days', type=int, default=730, help='Days of history to spread rows over')
+        parser.add_argument('--until', help='Last day of history as YYYY-MM-DD (defaults to today)')
+        parser.add_argument('--seed', type=int, default=0, help='Same seed, same data')
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--password', default='password', help='Every generated user gets this password')
+        parser.add_argument('--prefix', default='user', help='Usernames are <prefix><id>')
+
+    def handle(self, *args, **options):
+        if options['until']:
+            try:
+                until = date.fromisoformat(options['until'])
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['until']}")
+        else:
+            until = timezone.localdate()
+        # Anchoring to a day rather than now() keeps reruns with the same seed identical
+        anchor = timezone.make_aware(datetime.combine(until, datetime.max.time()))
+
+        started = time.perf_counter()
+        if not InvestmentOption.objects.exists():
+            for name, minimum, rate, risk in DEFAULT_OPTIONS:
+                InvestmentOption.objects.create(name=name, min_investment=minimum, expected_return=rate, risk_level=risk)
+        admin, _ = User.objects.get_or_create(
+            username=f"{options['prefix']}-admin",
+            defaults={'email': f"{options['prefix']}-admin@example.com", 'is_staff': True,
+                      'date_joined': anchor - timedelta(days=options['days'])},
+        )
+
+        first_id = (User.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+        base = {
+            'seed': options['seed'],
+            'anchor': anchor,
+            'days': options['days'],
+            'transactions': options['transactions_per_user'],
+            'investments': options['investments_per_user'],
+            'activity': options['activity_per_user'],
+            # One hash for everyone: PBKDF2 per user would dominate the run
+            'password': make_password(options['password']),
+            'prefix': options['prefix'],
+            'admin_id': admin.id,
+            'options': [(option.id, option.name, option.expected_return / 100)
+                        for option in InvestmentOption.objects.order_by('id')],
+        }
+        jobs = [{**base, 'first_id': start, 'count': count}
+                for start, count in synthetic.blocks(first_id, options['users'])]
+        self.stdout.write(f"Generating {options['users']} users in {len(jobs)} blocks...")
+        if options['processes'] > 1:
+            connection.close()
+            results = run_in_processes(synthetic.generate_block, jobs, options['processes'])
+        else:
+            results = []
+            for job in jobs:
+                results.append(synthetic.generate_block(job))
+                self.stdout.write(f"  users {job['first_id']}..{job['first_id'] + job['count'] - 1}")
+
+        # Explicit ids leave sequence-backed databases behind the new rows
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [User]):
+                cursor.execute(sql)
+
+        generated = time.perf_counter() - started
+        totals = {table: sum(result[table] for result in results) for table in results[0]} if results else {}
+        rows = sum(totals.values())
+        self.stdout.write(
+            f"{rows} rows in {generated:.1f} s ({rows / generated:.0f} rows/s): "
+            + ', '.join(f'{count} {table}' for table, count in totals.items())
+        )
+
+        # bulk_create skips the signals that maintain these
+        counters.reconcile()
+        first_day = until - timedelta(days=options['days'])
+        for _ in rollups.rebuild(first_day, until):
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {options['users']} users; counters reconciled and rollups rebuilt from {first_day} to {until}"
+        ))
@@ -0,0 +1,106 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from accounts import activity, loadtest
+from accounts.benchmarking import benchmark_database, run_in_processes
+
+
+class Command(BaseCommand):
+    help = "Drives every accounts route with weighted request mixes against a seeded throwaway database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mix', default=','.join(loadtest.MIXES),
+                            help=f'Comma-separated mixes to run: {", ".join(loadtest.MIXES)}')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per mix')
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=8, help='Threads (per process with --processes)')
+        parser.add_argument('--processes', type=int, default=0,
+                            help='Spread the requests over this many processes instead of one')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the order of requests in a mix')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+        parser.add_argument('--real-hasher', action='store_true',
+                            help='Hash with the configured PASSWORD_HASHERS instead of a fast one')
+        parser.add_argument('--routes', action='store_true', help='Print per-route results too')
+
+    def handle(self, *args, **options):
+        mixes = options['mix'].split(',')
+        unknown = [mix for mix in mixes if mix not in loadtest.MIXES]
+        if unknown:
+            raise CommandError(f"Unknown mix: {', '.join(unknown)}")
+        uncovered = loadtest.uncovered_routes()
+        if uncovered:
+            raise CommandError(f"No load test request for: {', '.join(uncovered)}")
+        previous = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                previous = json.load(f)
+
+        results = {
+            'created_at': timezone.now().isoformat(),
+            'settings': {key: options[key] for key in ('requests', 'users', 'concurrency', 'processes', 'seed', 'real_hasher')},
+            'mixes': {},
+        }
+        for mix in mixes:
+            self.stdout.write(f"{mix}: seeding {options['users']} users...")
+            result = self.run_mix(mix, options)
+            results['mixes'][mix] = result
+            self.print_result(mix, result, options['routes'])
+            if previous and mix in previous.get('mixes', {}):
+                self.print_comparison(previous['mixes'][mix]['overall'], result['overall'])
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        self.stdout.write(self.style.SUCCESS("Done"))
+
+    def run_mix(self, mix, options):
+        fast_hashers = not options['real_hasher']
+        plan = loadtest.build_plan(mix, options['requests'], options['seed'])
+        processes = options['processes']
+        with benchmark_database(), override_settings(**loadtest.run_settings(fast_hashers)):
+            fixture = loadtest.seed_fixture(options['users'], plan)
+            if processes:
+                jobs = [
+                    (connection.settings_dict['NAME'], fixture, plan, range(p, len(plan), processes),
+                     options['concurrency'], fast_hashers)
+                    for p in range(processes)
+                ]
+                connection.close()
+                finished = run_in_processes(loadtest.process_worker, jobs)
+                elapsed = max(f[1] for f in finished) - min(f[0] for f in finished)
+                samples = [sample for f in finished for sample in f[2]]
+            else:
+                started = time.perf_counter()
+                samples = loadtest.run_requests(fixture, plan, range(len(plan)), options['concurrency'])
+                elapsed = time.perf_counter() - started
+                activity.flush()
+        return loadtest.report(samples, elapsed)
+
+    def print_result(self, mix, result, routes):
+        def line(name, stats):
+            return (
+                f"{name:>32}: {stats['throughput']:>8} req/s, p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms, "
+                f"p99 {stats['p99_ms']} ms, {stats['queries_per_request']} queries/request, {stats['errors']} errors"
+            )
+
+        self.stdout.write(line(mix, result['overall']))
+        if routes:
+            for route, stats in result['routes'].items():
+                self.stdout.write(line(route, stats))
+
+    def print_comparison(self, before, after):
+        def change(key):
+            if not before[key]:
+                return 'n/a'
+            return f"{(after[key] - before[key]) / before[key] * 100:+.1f}%"
+
+        self.stdout.write(
+            f"{'vs previous':>32}: throughput {change('throughput')}, p95 {change('p95_ms')}, p99 {change('p99_ms')}"
+        )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from accounts import counters
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the admin dashboard counters from the underlying tables"
+
+    def handle(self, *args, **options):
+        for name, value in counters.reconcile().items():
+            self.stdout.write(f"{name}: {value}")
+        self.stdout.write(self.style.SUCCESS("Counters reconciled"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from accounts.ledger import LEDGER_CHUNK_SIZE, SNAPSHOT_EVERY, rebuild_snapshots, take_snapshots
+
+
+class Command(BaseCommand):
+    help = "Materialises balance snapshots from the ledger (run periodically, e.g. from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=LEDGER_CHUNK_SIZE)
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Drop all snapshots and recompute them from the full ledger')
+        parser.add_argument('--every', type=int, default=SNAPSHOT_EVERY,
+                            help='With --rebuild, entries between consecutive snapshots of a user')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            written = rebuild_snapshots(chunk_size=options['chunk_size'], every=options['every'])
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} snapshots"))
+        else:
+            taken = take_snapshots(chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f"Snapshotted {taken} balances"))
@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.history import HISTORY_CHUNK_SIZE, snapshot_day
+
+
+class Command(BaseCommand):
+    help = "Records closing balances for users whose balance changed (run nightly, e.g. from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Last day to snapshot as YYYY-MM-DD (defaults to yesterday)')
+        parser.add_argument('--days', type=int, default=1,
+                            help='Snapshot this many days ending at --date, oldest first, e.g. to catch up')
+        parser.add_argument('--chunk-size', type=int, default=HISTORY_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        last = timezone.localdate() - timedelta(days=1)
+        if options['date']:
+            try:
+                last = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['date']}")
+        if options['days'] < 1:
+            raise CommandError("--days must be at least 1")
+
+        # Oldest first: each day's closings build on the previous day's
+        for offset in range(options['days'] - 1, -1, -1):
+            day = last - timedelta(days=offset)
+            written = snapshot_day(day, chunk_size=options['chunk_size'])
+            self.stdout.write(f"{day}: {written} balances")
+        self.stdout.write(self.style.SUCCESS("Daily balances recorded"))
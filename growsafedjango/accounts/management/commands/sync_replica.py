@@ -0,0 +1,39 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from accounts.routing import replica_alias
+
+
+class Command(BaseCommand):
+    help = "Copies the primary SQLite database onto the replica file (local read-replica setup)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep copying every this many seconds; 0 copies once')
+
+    def handle(self, *args, **options):
+        alias = replica_alias()
+        if not alias:
+            raise CommandError("No replica configured; set GROWSAFE_REPLICA_DB")
+        primary, replica = connections[DEFAULT_DB_ALIAS], connections[alias]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError("The copy job only handles SQLite; use the server's replication otherwise")
+
+        while True:
+            started = time.perf_counter()
+            primary.ensure_connection()
+            target = sqlite3.connect(replica.settings_dict['NAME'], timeout=20)
+            try:
+                # Online backup: a consistent copy, and replica readers keep working while it runs
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(
+                f"Replica synced in {(time.perf_counter() - started) * 1000:.0f} ms"
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
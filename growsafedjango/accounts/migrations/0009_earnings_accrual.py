@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0008_investment_option"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EarningsAccrual",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(unique=True)),
+                ("profiles_credited", models.PositiveIntegerField(default=0)),
+                (
+                    "total_credited",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=20),
+                ),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="userprofile",
+            name="earnings_accrued_on",
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0009_earnings_accrual"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="accountactivity",
+            index=models.Index(
+                fields=["user", "-timestamp"], name="activity_user_ts_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="investment",
+            index=models.Index(
+                fields=["user", "created_at", "id"], name="inv_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["status", "created_at"], name="tx_status_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "created_at", "id"], name="tx_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["created_at", "id"], name="tx_created_idx"),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:37
+
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    Counter = apps.get_model("accounts", "Counter")
+    User = apps.get_model("auth", "User")
+    Transaction = apps.get_model("accounts", "Transaction")
+    Investment = apps.get_model("accounts", "Investment")
+    InvestmentOption = apps.get_model("accounts", "InvestmentOption")
+    Counter.objects.bulk_create(
+        [
+            Counter(name="total_users", value=User.objects.count()),
+            Counter(
+                name="pending_transactions",
+                value=Transaction.objects.filter(status="PENDING").count(),
+            ),
+            Counter(name="total_investments", value=Investment.objects.count()),
+            Counter(name="active_options", value=InvestmentOption.objects.count()),
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0010_hot_path_indexes"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Counter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
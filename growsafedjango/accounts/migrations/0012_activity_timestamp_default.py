@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0011_counter"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="accountactivity",
+            name="timestamp",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0012_activity_timestamp_default"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    # auth.User belongs to another app, so these expression indexes are plain SQL.
+    operations = [
+        # Case-insensitive uniqueness; blank emails (e.g. createsuperuser without one) stay allowed
+        migrations.RunSQL(
+            "CREATE UNIQUE INDEX auth_user_email_lower_uniq ON auth_user (LOWER(email)) "
+            "WHERE email <> ''",
+            "DROP INDEX auth_user_email_lower_uniq",
+        ),
+        # Login lookups; SQLite only uses the partial index above when the query
+        # repeats its WHERE clause, which the ORM cannot express
+        migrations.RunSQL(
+            "CREATE INDEX auth_user_email_lower_idx ON auth_user (LOWER(email))",
+            "DROP INDEX auth_user_email_lower_idx",
+        ),
+    ]
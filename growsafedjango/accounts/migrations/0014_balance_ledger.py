@@ -0,0 +1,119 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    # Existing balances predate the ledger: carry each one over as an OPENING entry
+    UserProfile = apps.get_model("accounts", "UserProfile")
+    LedgerEntry = apps.get_model("accounts", "LedgerEntry")
+    balances = (
+        UserProfile.objects.exclude(total=0)
+        .order_by("user_id")
+        .values_list("user_id", "total")
+        .iterator(chunk_size=2000)
+    )
+    batch = []
+    for user_id, total in balances:
+        batch.append(LedgerEntry(user_id=user_id, entry_type="OPENING", amount=total))
+        if len(batch) >= 2000:
+            LedgerEntry.objects.bulk_create(batch)
+            batch = []
+    LedgerEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0013_user_email_lower_uniq"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BalanceSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("last_entry_id", models.BigIntegerField(unique=True)),
+                ("as_of", models.DateTimeField()),
+                ("balance", models.DecimalField(decimal_places=2, max_digits=15)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="balance_snapshots",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["user", "as_of", "last_entry_id"],
+                        name="snapshot_user_asof_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="LedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "entry_type",
+                    models.CharField(
+                        choices=[
+                            ("OPENING", "Opening balance"),
+                            ("DEPOSIT", "Deposit"),
+                            ("WITHDRAWAL", "Withdrawal"),
+                            ("INVESTMENT", "Investment"),
+                            ("SALE", "Sale"),
+                            ("ACCRUAL", "Accrual"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=15)),
+                ("reference", models.CharField(blank=True, max_length=64)),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, editable=False
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ledger_entries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["user", "id"], name="ledger_user_id_idx")
+                ],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
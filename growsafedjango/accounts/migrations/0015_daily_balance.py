@@ -0,0 +1,51 @@
+# Generated by Django 5.1.7 on 2026-10-17 19:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0014_balance_ledger"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyBalance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("balance", models.DecimalField(decimal_places=2, max_digits=15)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="ledgerentry",
+            index=models.Index(fields=["created_at"], name="ledger_created_idx"),
+        ),
+        migrations.AddField(
+            model_name="dailybalance",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="daily_balances",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailybalance",
+            constraint=models.UniqueConstraint(
+                fields=("user", "day"), name="daily_balance_user_day_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.7 on 2026-10-17 19:03
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def seed_rollups(apps, schema_editor):
+    # Incremental updates assume the rollups already cover existing transactions
+    Transaction = apps.get_model("accounts", "Transaction")
+    TransactionRollup = apps.get_model("accounts", "TransactionRollup")
+    groups = (
+        Transaction.objects.annotate(day=TruncDate("created_at"))
+        .values("day", "transaction_type", "status")
+        .annotate(count=Count("id"), total=Sum("amount"))
+        .order_by()
+    )
+    TransactionRollup.objects.bulk_create(
+        [TransactionRollup(**group) for group in groups], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0015_daily_balance"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransactionRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "transaction_type",
+                    models.CharField(
+                        choices=[("DEPOSIT", "Deposit"), ("WITHDRAWAL", "Withdrawal")],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("APPROVED", "Approved"),
+                            ("DECLINED", "Declined"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("count", models.BigIntegerField(default=0)),
+                (
+                    "total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "transaction_type", "status"),
+                        name="tx_rollup_key_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(seed_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-17 19:23
+
+from django.db import migrations
+
+
+def backfill_profiles(apps, schema_editor):
+    # From here on a post_save signal creates profiles; give existing users theirs
+    User = apps.get_model("auth", "User")
+    UserProfile = apps.get_model("accounts", "UserProfile")
+    user_ids = list(
+        User.objects.filter(profile__isnull=True).values_list("id", flat=True)
+    )
+    UserProfile.objects.bulk_create(
+        [UserProfile(user_id=user_id) for user_id in user_ids], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0016_transaction_rollup"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_profiles, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from decimal import Decimal
 import uuid
 from uuid import uuid4
@@ -27,6 +28,12 @@ class Investment(models.Model):
     daily_return_rate = models.DecimalField(max_digits=5, decimal_places=4)  # e.g., 0.05 for 5%
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Profile investment pages: user's rows in (created_at, id) order
+            models.Index(fields=['user', 'created_at', 'id'], name='inv_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.user.username}"
 
@@ -38,14 +45,7 @@ class UserProfile(models.Model):
     total_withdraw = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
     daily_earnings = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
     mobile_number = models.CharField(max_length=15, blank=True, null=True)  # For payment processing
-
-    def calculate_daily_earnings(self):
-        earnings = sum(
-            inv.amount * inv.daily_return_rate for inv in self.user.investments.all()
-        )
-        self.daily_earnings = earnings
-        self.total += earnings
-        self.save()
+    earnings_accrued_on = models.DateField(null=True, blank=True)  # Last day credited by the accrual job
 
     def __str__(self):
         return f"Profile of {self.user.username}"
@@ -75,6 +75,16 @@ class Transaction(models.Model):
     )
     notes = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Pending counts, approval queues and status-filtered admin pages
+            models.Index(fields=['status', 'created_at'], name='tx_status_created_idx'),
+            # Profile transaction pages: user's rows in (created_at, id) order
+            models.Index(fields=['user', 'created_at', 'id'], name='tx_user_created_idx'),
+            # Unfiltered admin pages, newest first
+            models.Index(fields=['created_at', 'id'], name='tx_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.transaction_type} - {self.user.username} - {self.amount} - {self.status}"
 class TransactionStatusHistory(models.Model):
@@ -92,7 +102,115 @@ class AccountActivity(models.Model):
     action = models.CharField(max_length=100)
     ip_address = models.CharField(max_length=45)
     device = models.CharField(max_length=200)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the event happens, not when a buffered batch is written
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            # Recent activity for one user, newest first
+            models.Index(fields=['user', '-timestamp'], name='activity_user_ts_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.action} at {self.timestamp}"
+
+
+class EarningsAccrual(models.Model):
+    """Per-day marker written by the daily earnings accrual job."""
+    day = models.DateField(unique=True)
+    profiles_credited = models.PositiveIntegerField(default=0)
+    total_credited = models.DecimalField(max_digits=20, decimal_places=2, default=0.00)
+    started_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Accrual for {self.day}"
+
+
+class Counter(models.Model):
+    """Maintained row count read by the admin dashboard instead of COUNT(*); also holds the catalog version."""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class LedgerEntry(models.Model):
+    """Append-only record of every balance change; credits are positive, debits negative."""
+    ENTRY_TYPES = (
+        ('OPENING', 'Opening balance'),
+        ('DEPOSIT', 'Deposit'),
+        ('WITHDRAWAL', 'Withdrawal'),
+        ('INVESTMENT', 'Investment'),
+        ('SALE', 'Sale'),
+        ('ACCRUAL', 'Accrual'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ledger_entries')
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPES)
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    reference = models.CharField(max_length=64, blank=True)  # e.g. transaction or investment id
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            # A user's entries after a snapshot's last_entry_id
+            models.Index(fields=['user', 'id'], name='ledger_user_id_idx'),
+            # Entries of one day, for the daily balance job
+            models.Index(fields=['created_at'], name='ledger_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entry_type} {self.amount} for {self.user_id}"
+
+
+class BalanceSnapshot(models.Model):
+    """A user's ledger balance up to and including ``last_entry_id``."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='balance_snapshots')
+    last_entry_id = models.BigIntegerField(unique=True)
+    as_of = models.DateTimeField()  # created_at of the last entry included
+    balance = models.DecimalField(max_digits=15, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            # Latest snapshot for a user, optionally before a point in time
+            models.Index(fields=['user', 'as_of', 'last_entry_id'], name='snapshot_user_asof_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.balance} as of {self.as_of}"
+
+
+class DailyBalance(models.Model):
+    """A user's closing balance on a day; written only for days the balance changed."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_balances')
+    day = models.DateField()
+    balance = models.DecimalField(max_digits=15, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            # Also the index for a user's history in day order
+            models.UniqueConstraint(fields=['user', 'day'], name='daily_balance_user_day_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.balance} on {self.day}"
+
+
+class TransactionRollup(models.Model):
+    """Count and sum of transactions per (creation day, type, status), kept current by accounts/rollups.py."""
+    day = models.DateField()
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=Transaction.STATUS_CHOICES)
+    count = models.BigIntegerField(default=0)
+    total = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            # Also the index for reports over a range of days
+            models.UniqueConstraint(fields=['day', 'transaction_type', 'status'], name='tx_rollup_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.transaction_type} {self.status}: {self.count}"
@@ -0,0 +1,80 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, pk):
+    raw = json.dumps([created_at.isoformat(), pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, TypeError, OverflowError):
+        # OverflowError: a tampered cursor can carry Infinity as the id
+        raise InvalidCursor(f'Invalid cursor: {cursor}')
+
+
+def page_size(request, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    try:
+        limit = int(request.query_params.get('limit', default))
+    except (ValueError, TypeError):
+        return default
+    return max(1, min(limit, maximum))
+
+
+def _key(row):
+    # values_list() rows end with (created_at, id), see serialization.rows(keyset=True)
+    if isinstance(row, tuple):
+        return row[-2], row[-1]
+    if isinstance(row, dict):
+        return row['created_at'], row['id']
+    return row.created_at, row.id
+
+
+def _after(queryset, cursor, descending):
+    if descending:
+        queryset = queryset.order_by('-created_at', '-id')
+    else:
+        queryset = queryset.order_by('created_at', 'id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        if descending:
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        else:
+            queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+    return queryset
+
+
+def _page(rows, limit):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*_key(rows[-1]))
+    return rows, next_cursor
+
+
+def keyset_page(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=False):
+    """Return one page of ``queryset`` ordered by ``(created_at, id)``.
+
+    The cursor encodes the last row of the previous page, so each page is a
+    range scan that costs the same however deep into the history it is.
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is ``None`` on the last page.
+    """
+    return _page(list(_after(queryset, cursor, descending)[:limit + 1]), limit)
+
+
+async def akeyset_page(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=False):
+    """keyset_page() for async views."""
+    return _page([row async for row in _after(queryset, cursor, descending)[:limit + 1]], limit)
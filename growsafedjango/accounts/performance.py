@@ -0,0 +1,213 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Requests kept per route for the rolling aggregates
+WINDOW = 500
+# One statement shape repeated this many times in a request is reported as N+1
+N_PLUS_ONE_THRESHOLD = 10
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+
+
+def sql_shape(sql):
+    """``sql`` with placeholders, literals and IN lists collapsed, so the same
+    statement run with different values has the same shape."""
+    return _LISTS.sub('(...)', _LITERALS.sub('?', sql))
+
+
+# The recorders active in this context. A context variable rather than a
+# per-connection wrapper, so the queries an async view runs through
+# sync_to_async threads are still charged to its request
+_recorders = ContextVar('query_recorders', default=())
+
+
+class QueryRecorder:
+    """Counts and times the statements run while it is recording."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def add(self, sql, duration):
+        self.duration += duration
+        self.count += 1
+        self.shapes[sql_shape(sql)] += 1
+
+    def repeated(self, threshold=None):
+        """``[(shape, times)]`` for shapes run at least ``threshold`` times, most frequent first."""
+        if threshold is None:
+            threshold = getattr(settings, 'PERFORMANCE_N_PLUS_ONE_THRESHOLD', N_PLUS_ONE_THRESHOLD)
+        return [(shape, times) for shape, times in self.shapes.most_common() if times >= threshold]
+
+
+def _execute(execute, sql, params, many, context):
+    recorders = _recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        for recorder in recorders:
+            recorder.add(sql, duration)
+
+
+def install(connection, **kwargs):
+    """Put the recording execute_wrapper on ``connection``; a connection_created receiver."""
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute)
+
+
+@contextmanager
+def record_queries():
+    """Record the statements run on any database connection from this context,
+    including the threads sync_to_async hands it to."""
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+    recorder = QueryRecorder()
+    token = _recorders.set(_recorders.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        _recorders.reset(token)
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class RouteStats:
+    """The last ``window`` request records of each route, kept in this process."""
+
+    def __init__(self, window=WINDOW):
+        self._lock = threading.Lock()
+        self._records = defaultdict(lambda: deque(maxlen=window))
+
+    def add(self, record):
+        with self._lock:
+            self._records[(record['method'], record['route'])].append(record)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def summary(self):
+        """Per-route aggregates, the routes with the most total time first."""
+        with self._lock:
+            snapshot = {key: list(records) for key, records in self._records.items()}
+        routes = []
+        for (method, route), records in snapshot.items():
+            totals = sorted(record['total_ms'] for record in records)
+            db = sorted(record['db_ms'] for record in records)
+            queries = [record['queries'] for record in records]
+            sizes = [record['bytes'] for record in records if record['bytes'] is not None]
+            routes.append({
+                'method': method,
+                'route': route,
+                'requests': len(records),
+                'errors': sum(record['status'] >= 500 for record in records),
+                'n_plus_one': sum(bool(record['n_plus_one']) for record in records),
+                'queries_avg': round(sum(queries) / len(queries), 1),
+                'queries_max': max(queries),
+                'db_ms_avg': round(sum(db) / len(db), 2),
+                'db_ms_p95': _percentile(db, 0.95),
+                'view_ms_avg': round(sum(record['view_ms'] or 0 for record in records) / len(records), 2),
+                'total_ms_p50': _percentile(totals, 0.5),
+                'total_ms_p95': _percentile(totals, 0.95),
+                'total_ms_max': totals[-1],
+                'bytes_avg': round(sum(sizes) / len(sizes)) if sizes else None,
+                '_time': sum(totals),
+            })
+        routes.sort(key=lambda row: row.pop('_time'), reverse=True)
+        return routes
+
+
+stats = RouteStats()
+
+
+class PerformanceMiddleware:
+    """Measure each request's queries, DB time, view time and response size.
+
+    The numbers go out in a ``Server-Timing`` header, as one JSON log line on
+    the ``accounts.performance`` logger (a warning when the request repeats a
+    statement shape often enough to look like N+1) and into the per-route
+    aggregates behind ``admin/performance/``. The body of a streaming response
+    is produced after this returns, so its queries are not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Under ASGI a plain process_view would cost a thread hop per request
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        return self._finish(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with record_queries() as recorder:
+            response = await self.get_response(request)
+        return self._finish(request, response, recorder, start)
+
+    def _finish(self, request, response, recorder, start):
+        finished = time.perf_counter()
+
+        view_started = getattr(request, '_view_started', None)
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'route': match.route if match else None,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'db_ms': round(recorder.duration * 1000, 2),
+            'view_ms': round((finished - view_started) * 1000, 2) if view_started else None,
+            'total_ms': round((finished - start) * 1000, 2),
+            'bytes': None if response.streaming else len(response.content),
+            'n_plus_one': [{'sql': shape, 'times': times} for shape, times in recorder.repeated()],
+        }
+        timings = [f'db;dur={record["db_ms"]};desc="{recorder.count} queries"', f'total;dur={record["total_ms"]}']
+        if record['view_ms'] is not None:
+            timings.insert(1, f'view;dur={record["view_ms"]}')
+        if response.has_header('Server-Timing'):
+            timings.insert(0, response['Server-Timing'])
+        response['Server-Timing'] = ', '.join(timings)
+
+        if match:
+            stats.add(record)
+        if record['n_plus_one']:
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._view_started = time.perf_counter()
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        request._view_started = time.perf_counter()
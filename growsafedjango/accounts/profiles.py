@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+
+from .models import UserProfile
+
+PROFILE_CHUNK_SIZE = 1000
+
+
+def missing_profile_user_ids():
+    """Ids of users without a UserProfile, found with one anti-join."""
+    return User.objects.filter(profile__isnull=True).order_by('id').values_list('id', flat=True)
+
+
+def backfill_profiles(chunk_size=PROFILE_CHUNK_SIZE):
+    """Create the missing profiles with chunked bulk inserts; returns how many users lacked one.
+
+    ignore_conflicts lets it run alongside signups creating their own profiles.
+    """
+    user_ids = list(missing_profile_user_ids())
+    for start in range(0, len(user_ids), chunk_size):
+        UserProfile.objects.bulk_create(
+            [UserProfile(user_id=user_id) for user_id in user_ids[start:start + chunk_size]],
+            ignore_conflicts=True,
+        )
+    return len(user_ids)
@@ -0,0 +1,24 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+# Datetimes go through DRF's encoder so they keep its format (UTC as "Z")
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer producing the same output with orjson.
+
+    Types orjson does not handle natively (Decimal, datetime, lazy strings)
+    are passed to DRF's encoder; indented output still uses DRF's renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.ensure_ascii or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        # Same strict-JavaScript-subset escaping as JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,114 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import Transaction, TransactionRollup
+
+# Days rebuilt per transaction by the backfill
+BACKFILL_CHUNK_DAYS = 31
+CENT = Decimal('0.01')
+GROUPS = ('day', 'week', 'month', 'total')
+
+
+def _day(created_at):
+    return timezone.localdate(created_at)
+
+
+def adjust(changes):
+    """Apply ``{(day, transaction_type, status): (count, amount)}`` deltas to the rollup rows.
+
+    Call inside the transaction that changed the rows so both commit together.
+    """
+    # A fixed order keeps concurrent writers from deadlocking on each other's rows
+    for key in sorted(changes):
+        count, amount = changes[key]
+        if not count and not amount:
+            continue
+        day, transaction_type, status = key
+        rows = TransactionRollup.objects.filter(day=day, transaction_type=transaction_type, status=status)
+        if rows.update(count=F('count') + count, total=F('total') + amount):
+            continue
+        try:
+            with transaction.atomic():
+                TransactionRollup.objects.create(
+                    day=day, transaction_type=transaction_type, status=status, count=count, total=amount
+                )
+        except IntegrityError:
+            # Another writer created it first
+            rows.update(count=F('count') + count, total=F('total') + amount)
+
+
+def key(created_at, transaction_type, status):
+    return _day(created_at), transaction_type, status
+
+
+def move(rows, old_status, new_status):
+    """Rollup deltas for ``rows`` (dicts with created_at, transaction_type, amount) changing status."""
+    changes = defaultdict(lambda: [0, Decimal('0.00')])
+    for row in rows:
+        for status, sign in ((old_status, -1), (new_status, 1)):
+            change = changes[key(row['created_at'], row['transaction_type'], status)]
+            change[0] += sign
+            change[1] += sign * row['amount']
+    adjust(changes)
+
+
+def rebuild(first_day, last_day, chunk_days=BACKFILL_CHUNK_DAYS):
+    """Recompute the rollups of ``first_day``..``last_day`` from Transaction, a chunk of days at a time.
+
+    Yields ``(chunk_first_day, chunk_last_day, rows_written)`` as each chunk commits.
+    """
+    day = first_day
+    while day <= last_day:
+        chunk_last = min(day + timedelta(days=chunk_days - 1), last_day)
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        end = timezone.make_aware(datetime.combine(chunk_last + timedelta(days=1), time.min))
+        groups = (
+            Transaction.objects.filter(created_at__gte=start, created_at__lt=end)
+            .annotate(day=TruncDate('created_at'))
+            .values('day', 'transaction_type', 'status')
+            .annotate(count=Count('id'), total=Sum('amount'))
+            .order_by()
+        )
+        with transaction.atomic():
+            TransactionRollup.objects.filter(day__gte=day, day__lte=chunk_last).delete()
+            written = len(TransactionRollup.objects.bulk_create([TransactionRollup(**group) for group in groups]))
+        yield day, chunk_last, written
+        day = chunk_last + timedelta(days=1)
+
+
+def report(start, end, group='day', transaction_type=None, status=None):
+    """Counts and sums between ``start`` and ``end`` (inclusive dates) per period, type and status."""
+    if group not in GROUPS:
+        raise ValueError(f'group must be one of {", ".join(GROUPS)}')
+    rows = TransactionRollup.objects.filter(day__gte=start, day__lte=end)
+    if transaction_type:
+        rows = rows.filter(transaction_type=transaction_type)
+    if status:
+        rows = rows.filter(status=status)
+    fields = ['transaction_type', 'status']
+    if group == 'day':
+        rows = rows.annotate(period=F('day'))
+    elif group != 'total':
+        rows = rows.annotate(period=(TruncWeek if group == 'week' else TruncMonth)('day'))
+    if group != 'total':
+        fields.insert(0, 'period')
+    grouped = rows.values(*fields).annotate(count=Sum('count'), amount=Sum('total')).order_by(*fields)
+    return [
+        {
+            **({'period': row['period'].isoformat()} if group != 'total' else {}),
+            'type': row['transaction_type'],
+            'status': row['status'],
+            'count': row['count'],
+            # SQLite sums NUMERIC as int/float
+            'total': str(Decimal(row['amount']).quantize(CENT)),
+        }
+        for row in grouped
+        # Rows left at zero by status changes
+        if row['count']
+    ]
@@ -0,0 +1,123 @@
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Set while a view marked @read_only runs; reads it issues may go to the replica
+_read_only = ContextVar('read_only', default=False)
+
+PIN_KEY = 'replica:pin:{}'
+
+
+def replica_alias():
+    return getattr(settings, 'REPLICA_DATABASE_ALIAS', None)
+
+
+def pin_to_primary(user_id):
+    """Send this user's reads to the primary for the read-your-writes window.
+
+    Pins live in the cache, so workers only see each other's pins with a shared backend.
+    """
+    cache.set(PIN_KEY.format(user_id), True, timeout=settings.READ_YOUR_WRITES_SECONDS)
+
+
+def is_pinned(user_id):
+    return cache.get(PIN_KEY.format(user_id), False)
+
+
+async def ais_pinned(user_id):
+    return await cache.aget(PIN_KEY.format(user_id), False)
+
+
+def read_only(view):
+    """Mark a view whose queries may be served from the replica.
+
+    Apply it below ``@api_view`` so the request user is already authenticated.
+    Works on async views too.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapped_async(request, *args, **kwargs):
+            user_id = getattr(request.user, 'id', None)
+            if not replica_alias() or (user_id and await ais_pinned(user_id)):
+                return await view(request, *args, **kwargs)
+            # The async ORM runs queries in threads that inherit this context
+            token = _read_only.set(True)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _read_only.reset(token)
+        return wrapped_async
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        user_id = getattr(request.user, 'id', None)
+        if not replica_alias() or (user_id and is_pinned(user_id)):
+            return view(request, *args, **kwargs)
+        token = _read_only.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_only.reset(token)
+    return wrapped
+
+
+class ReplicaRouter:
+    """Route reads from @read_only views to the replica, everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        if alias and _read_only.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the copy job
+        if db == replica_alias():
+            return False
+        return None
+
+
+class ReadYourWritesMiddleware:
+    """Pin users who just made a successful write to the primary database."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self._is_write(request, response):
+            self._pin(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self._is_write(request, response):
+            # request.user may still be the lazy session user, which queries on first access
+            await sync_to_async(self._pin)(request)
+        return response
+
+    def _is_write(self, request, response):
+        return bool(replica_alias()) and request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400
+
+    def _pin(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(user.id)
@@ -0,0 +1,48 @@
+"""Build response rows from ``values_list()`` tuples instead of model instances.
+
+A field list is a sequence of ``(name, lookup, convert)``: ``lookup`` is read
+with ``values_list`` and ``convert`` (or ``None`` to pass the value through)
+is mapped over the whole column at once.
+"""
+
+# Appended by rows(keyset=True); pagination reads a tuple's last two values as its key
+KEYSET_LOOKUPS = ('created_at', 'id')
+
+
+def text(value):
+    return None if value is None else str(value)
+
+
+def isoformat(value):
+    return None if value is None else value.isoformat()
+
+
+def rows(queryset, fields, keyset=False):
+    lookups = [lookup for _, lookup, _ in fields]
+    if keyset:
+        lookups.extend(KEYSET_LOOKUPS)
+    return queryset.values_list(*lookups)
+
+
+def serialize(rows, fields):
+    """Turn tuples from rows() into a list of dicts; extra trailing columns are dropped."""
+    rows = list(rows)
+    if not rows:
+        return []
+    columns = list(zip(*rows))
+    for i, (_, _, convert) in enumerate(fields):
+        if convert is not None:
+            columns[i] = map(convert, columns[i])
+    names = [name for name, _, _ in fields]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def serialize_iter(rows, fields, chunk_size):
+    """serialize() over an iterator, one chunk at a time, for streaming."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from serialize(chunk, fields)
+            chunk = []
+    yield from serialize(chunk, fields)
@@ -0,0 +1,119 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import authentication, catalog, counters, performance, rollups
+from .models import Investment, InvestmentOption, Transaction, UserProfile
+
+# Models whose rows are counted one-for-one
+COUNTED_MODELS = {
+    User: 'total_users',
+    Investment: 'total_investments',
+    InvestmentOption: 'active_options',
+}
+
+
+def _count_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.increment(COUNTED_MODELS[sender])
+
+
+def _count_deleted(sender, instance, **kwargs):
+    counters.increment(COUNTED_MODELS[sender], -1)
+
+
+# Every connection, including ones opened in sync_to_async threads, can report to PerformanceMiddleware
+connection_created.connect(performance.install, dispatch_uid='performance_install')
+
+for model in COUNTED_MODELS:
+    post_save.connect(_count_created, sender=model, dispatch_uid=f'count_created_{model.__name__}')
+    post_delete.connect(_count_deleted, sender=model, dispatch_uid=f'count_deleted_{model.__name__}')
+
+
+@receiver(post_save, sender=User)
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    # Every user has a profile from the start, so request paths never need get_or_create.
+    # bulk_create skips this; bulk loaders create profiles themselves (see accounts.profiles)
+    if created and not raw:
+        UserProfile.objects.create(user=instance)
+
+
+ROLLUP_FIELDS = ('created_at', 'transaction_type', 'status', 'amount')
+
+
+def _rollup_fields(instance):
+    return tuple(instance.__dict__.get(field) for field in ROLLUP_FIELDS)
+
+
+@receiver(post_init, sender=Transaction)
+def remember_transaction_status(sender, instance, **kwargs):
+    # Status as stored, so post_save can tell whether it entered or left PENDING
+    instance._stored_status = instance.__dict__.get('status')
+    instance._stored_rollup = _rollup_fields(instance)
+
+
+@receiver(post_save, sender=Transaction)
+def count_pending_transactions(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    was_pending = not created and instance._stored_status == 'PENDING'
+    counters.increment('pending_transactions', int(instance.status == 'PENDING') - int(was_pending))
+    instance._stored_status = instance.status
+
+
+@receiver(post_delete, sender=Transaction)
+def count_deleted_transaction(sender, instance, **kwargs):
+    if instance._stored_status == 'PENDING':
+        counters.increment('pending_transactions', -1)
+
+
+def _rollup_change(fields, sign, changes):
+    created_at, transaction_type, status, amount = fields
+    if None in fields:
+        # Loaded with deferred fields; backfill_transaction_rollups reconciles such rows
+        return
+    change = changes.setdefault(rollups.key(created_at, transaction_type, status), [0, 0])
+    change[0] += sign
+    change[1] += sign * amount
+
+
+@receiver(post_save, sender=Transaction)
+def roll_up_saved_transaction(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current, changes = _rollup_fields(instance), {}
+    if created or current != instance._stored_rollup:
+        if not created:
+            _rollup_change(instance._stored_rollup, -1, changes)
+        _rollup_change(current, 1, changes)
+        rollups.adjust(changes)
+    instance._stored_rollup = current
+
+
+@receiver(post_delete, sender=Transaction)
+def roll_up_deleted_transaction(sender, instance, **kwargs):
+    changes = {}
+    _rollup_change(instance._stored_rollup, -1, changes)
+    rollups.adjust(changes)
+
+
+@receiver(post_save, sender=InvestmentOption)
+@receiver(post_delete, sender=InvestmentOption)
+def invalidate_catalog(sender, **kwargs):
+    transaction.on_commit(catalog.bump_version)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    # Covers deactivation and password changes, which are saves too
+    authentication.forget(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def forget_cached_profile(sender, instance, **kwargs):
+    # With AUTH_USER_CACHE_PROFILE the profile is cached inside its user's entry
+    authentication.forget(instance.user_id)
@@ -0,0 +1,168 @@
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.models import User
+
+from .models import AccountActivity, Investment, LedgerEntry, Transaction, UserProfile
+
+# Users generated from one random stream: the output for a given seed does not
+# depend on how many processes share the work
+BLOCK_SIZE = 5000
+BATCH_SIZE = 5000
+
+FIRST_NAMES = ('Amina', 'Brian', 'Chao', 'Daniela', 'Emeka', 'Fatuma', 'Grace', 'Hassan', 'Ivy', 'Juma',
+               'Kevin', 'Lina', 'Moses', 'Njeri', 'Omar', 'Priya', 'Rosa', 'Samuel', 'Tariq', 'Wanjiru')
+LAST_NAMES = ('Achieng', 'Banda', 'Chen', 'Diallo', 'Evans', 'Fernandes', 'Gathoni', 'Hussein', 'Ito', 'Juma',
+              'Kamau', 'Lopez', 'Mensah', 'Nyambura', 'Otieno', 'Patel', 'Rossi', 'Smith', 'Tembo', 'Wekesa')
+ACTIONS = ('Logged in', 'Profile updated', 'Password updated')
+ACTION_WEIGHTS = (0.93, 0.05, 0.02)
+DEVICES = (
+    'Mozilla/5.0 (Linux; Android 13; SM-A145F) Mobile Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/124.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) Safari/605.1.15',
+    'GrowSafe/2.3 (Android)',
+)
+DEVICE_WEIGHTS = (0.45, 0.2, 0.15, 0.05, 0.15)
+
+# Requests from the last two days are mostly still waiting for an admin
+RECENT_SECONDS = 2 * 86400
+DAY = 86400.0
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep drawn created_at/updated_at values instead of stamping now()."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _money(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def _amounts(rng, median, sigma, size):
+    # Log-normal: mostly small amounts with a long tail of large ones, in whole cents
+    return np.clip(np.rint(rng.lognormal(np.log(median), sigma, size) * 100), 100, 10_000_000).astype(np.int64)
+
+
+def _per_user(rng, mean, size):
+    # Gamma-Poisson (negative binomial): most users are light, a few very active
+    if mean <= 0:
+        return np.zeros(size, dtype=np.int64)
+    return rng.poisson(rng.gamma(0.8, mean / 0.8, size))
+
+
+def _during(rng, joined_ago, owners):
+    """Seconds-before-the-anchor for events between each owner's signup and the anchor."""
+    return joined_ago[owners] * rng.random(len(owners))
+
+
+def generate_block(job):
+    """Generate one block of users with their profiles, transactions, investments,
+    activity and opening ledger entries. Returns row counts per table.
+
+    ``job`` is a dict: first_id, count, seed, anchor (aware datetime the data ends
+    at), days of history, per-user means, password hash, prefix, admin_id and
+    options as ``[(id, name, daily_return_rate)]``.
+    """
+    first_id, count, anchor = job['first_id'], job['count'], job['anchor']
+    rng = np.random.default_rng([job['seed'], first_id])
+    ids = np.arange(first_id, first_id + count)
+
+    def when(seconds_ago):
+        return [anchor - timedelta(seconds=float(s)) for s in seconds_ago]
+
+    # Signups grow over time: density rises linearly towards the anchor
+    joined_ago = job['days'] * DAY * (1 - np.sqrt(rng.random(count)))
+    first_names = rng.integers(len(FIRST_NAMES), size=count)
+    last_names = rng.integers(len(LAST_NAMES), size=count)
+    joined = when(joined_ago)
+    prefix = job['prefix']
+    User.objects.bulk_create([
+        User(id=int(user_id), username=f'{prefix}{user_id}', email=f'{prefix}{user_id}@example.com',
+             password=job['password'], first_name=FIRST_NAMES[first], last_name=LAST_NAMES[last], date_joined=date)
+        for user_id, first, last, date in zip(ids, first_names, last_names, joined)
+    ], batch_size=BATCH_SIZE)
+
+    # Transactions: ~30% withdrawals; older ones are mostly approved
+    owners = np.repeat(np.arange(count), _per_user(rng, job['transactions'], count))
+    tx_ago = _during(rng, joined_ago, owners)
+    withdrawal = rng.random(len(owners)) < 0.3
+    tx_cents = np.where(withdrawal, _amounts(rng, 60, 0.9, len(owners)), _amounts(rng, 150, 1.1, len(owners)))
+    pending = rng.random(len(owners)) < np.where(tx_ago < RECENT_SECONDS, 0.6, 0.02)
+    declined = ~pending & (rng.random(len(owners)) < 0.08)
+    approved = ~pending & ~declined
+    # Admins get to a request within hours
+    processed_ago = np.where(pending, tx_ago, np.maximum(tx_ago - rng.exponential(6 * 3600, len(owners)), 0))
+    statuses = np.where(pending, 'PENDING', np.where(declined, 'DECLINED', 'APPROVED'))
+    # Drawn rather than uuid4() so the same seed gives the same references
+    references = [uuid.UUID(bytes=rng.bytes(16), version=4) for _ in range(len(owners))]
+    with explicit_timestamps(Transaction._meta.get_field('created_at'), Transaction._meta.get_field('updated_at')):
+        Transaction.objects.bulk_create([
+            Transaction(user_id=int(ids[owner]), transaction_id=reference,
+                        transaction_type='WITHDRAWAL' if out else 'DEPOSIT', amount=_money(cents), status=state, created_at=created, updated_at=updated,
+                        processed_by_id=None if state == 'PENDING' else job['admin_id'],
+                        mobile_number=f'07{int(ids[owner]) % 100_000_000:08d}')
+            for owner, reference, out, cents, state, created, updated in zip(
+                owners, references, withdrawal, tx_cents, statuses, when(tx_ago), when(processed_ago))
+        ], batch_size=BATCH_SIZE)
+
+    # Investments spread over the options, sized like deposits
+    inv_owners = np.repeat(np.arange(count), _per_user(rng, job['investments'], count))
+    inv_cents = _amounts(rng, 200, 0.8, len(inv_owners))
+    options = job['options']
+    picks = rng.integers(len(options), size=len(inv_owners))
+    with explicit_timestamps(Investment._meta.get_field('created_at')):
+        Investment.objects.bulk_create([
+            Investment(user_id=int(ids[owner]), option_id=options[pick][0], name=options[pick][1],
+                       amount=_money(cents), daily_return_rate=options[pick][2], created_at=created)
+            for owner, pick, cents, created in zip(
+                inv_owners, picks, inv_cents, when(_during(rng, joined_ago, inv_owners)))
+        ], batch_size=BATCH_SIZE)
+
+    act_owners = np.repeat(np.arange(count), _per_user(rng, job['activity'], count))
+    actions = rng.choice(len(ACTIONS), size=len(act_owners), p=ACTION_WEIGHTS)
+    devices = rng.choice(len(DEVICES), size=len(act_owners), p=DEVICE_WEIGHTS)
+    octets = rng.integers(1, 255, size=(len(act_owners), 2))
+    AccountActivity.objects.bulk_create([
+        AccountActivity(user_id=int(ids[owner]), action=ACTIONS[action], ip_address=f'41.90.{a}.{b}',
+                        device=DEVICES[device], timestamp=timestamp)
+        for owner, action, device, (a, b), timestamp in zip(
+            act_owners, actions, devices, octets, when(_during(rng, joined_ago, act_owners)))
+    ], batch_size=BATCH_SIZE)
+
+    # Profiles agree with the approved transactions; spending beyond them is clipped at zero
+    deposits = np.bincount(owners, weights=np.where(approved & ~withdrawal, tx_cents, 0), minlength=count)
+    withdrawals = np.bincount(owners, weights=np.where(approved & withdrawal, tx_cents, 0), minlength=count)
+    invested = np.bincount(inv_owners, weights=inv_cents, minlength=count)
+    totals = np.maximum(deposits - withdrawals - invested, 0)
+    has_mobile = rng.random(count) < 0.8
+    UserProfile.objects.bulk_create([
+        UserProfile(user_id=int(user_id), total=_money(total), total_deposit=_money(deposit),
+                    total_withdraw=_money(withdraw), mobile_number=f'07{int(user_id) % 100_000_000:08d}' if mobile else None)
+        for user_id, total, deposit, withdraw, mobile in zip(ids, totals, deposits, withdrawals, has_mobile)
+    ], batch_size=BATCH_SIZE)
+    # The ledger starts from each generated balance, as migration 0014 did for real ones
+    LedgerEntry.objects.bulk_create([
+        LedgerEntry(user_id=int(ids[n]), entry_type='OPENING', amount=_money(totals[n]), created_at=joined[n])
+        for n in np.flatnonzero(totals)
+    ], batch_size=BATCH_SIZE)
+    return {
+        'users': count, 'transactions': len(owners), 'investments': len(inv_owners),
+        'activity': len(act_owners), 'ledger_entries': int(np.count_nonzero(totals)),
+    }
+
+
+def blocks(first_id, users, block_size=BLOCK_SIZE):
+    """``(first_id, count)`` id ranges covering ``users`` new users."""
+    return [(start, min(block_size, first_id + users - start)) for start in range(first_id, first_id + users, block_size)]
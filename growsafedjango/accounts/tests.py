@@ -1,3 +1,1370 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin as django_admin, messages
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.db.models import F, Sum
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import (
+    accrual, activity, approvals, balances, catalog, compliance, counters, exports, history, ledger, loadtest, pagination,
+    performance, profiles, projections, rollups, routing, synthetic, views,
+)
+from .admin import TransactionAdmin
+from .authentication import CachedJWTAuthentication
+from .renderers import FastJSONRenderer
+from .models import (
+    AccountActivity, BalanceSnapshot, Counter, DailyBalance, EarningsAccrual, Investment, InvestmentOption, LedgerEntry,
+    Transaction, TransactionRollup, UserProfile,
+)
+
+
+def seed_accounts(users=50, transactions_per_user=100, investments_per_user=20, activities_per_user=50):
+    """Bulk-insert a dataset big enough for the planner to prefer indexes over scans."""
+    User.objects.bulk_create([User(username=f'seed{i}', email=f'seed{i}@example.com') for i in range(users)])
+    seeded = list(User.objects.filter(username__startswith='seed'))
+    UserProfile.objects.bulk_create([UserProfile(user=user, total=Decimal('1000.00')) for user in seeded])
+    option = InvestmentOption.objects.create(
+        name='Seed fund', min_investment=Decimal('10.00'), expected_return=Decimal('1.50'), risk_level='LOW'
+    )
+    statuses = ('PENDING', 'APPROVED', 'APPROVED', 'DECLINED')
+    Transaction.objects.bulk_create([
+        Transaction(
+            user=user,
+            transaction_type='DEPOSIT' if n % 3 else 'WITHDRAWAL',
+            amount=Decimal(n + 1),
+            status=statuses[n % len(statuses)],
+        )
+        for user in seeded for n in range(transactions_per_user)
+    ], batch_size=1000)
+    Investment.objects.bulk_create([
+        Investment(user=user, option=option, name=option.name, amount=Decimal('100.00'),
+                   daily_return_rate=Decimal('0.0150'))
+        for user in seeded for _ in range(investments_per_user)
+    ], batch_size=1000)
+    AccountActivity.objects.bulk_create([
+        AccountActivity(user=user, action='Logged in', ip_address='127.0.0.1', device='test')
+        for user in seeded for _ in range(activities_per_user)
+    ], batch_size=1000)
+    return seeded
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN {sql}')
+        return [row[0] for row in cursor.fetchall()]
+
+
+# Tables that grow with usage; small lookup tables (options, counters) may be scanned
+GROWING_TABLES = (
+    'auth_user', 'accounts_userprofile', 'accounts_transaction', 'accounts_investment',
+    'accounts_accountactivity', 'accounts_ledgerentry', 'accounts_balancesnapshot', 'accounts_dailybalance',
+)
+
+# SQLite reports a table scan as a bare "SCAN <table>" and a full sort as a temp b-tree;
+# PostgreSQL reports a "Seq Scan on <table>".
+PLAN_REGRESSIONS = (
+    re.compile(rf'^SCAN ({"|".join(GROWING_TABLES)})$'),
+    re.compile(r'USE TEMP B-TREE FOR ORDER BY'),
+    re.compile(rf'Seq Scan on ({"|".join(GROWING_TABLES)})\b'),
+)
+
+
+class IndexedQueriesMixin:
+    def assertIndexedQueries(self, queries):
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            plan = query_plan(sql)
+            for line in plan:
+                if any(pattern.search(line) for pattern in PLAN_REGRESSIONS):
+                    self.fail(f'Query plan regression ({line}):\n{sql}\n' + '\n'.join(plan))
+
+
+class QueryPlanTests(IndexedQueriesMixin, TestCase):
+    """Fail if a hot endpoint's queries fall back to a full table scan or sort."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_accounts()[0]
+        cls.admin = User.objects.create_user(username='planadmin', password='x', is_staff=True)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_hot_endpoints_use_indexes(self):
+        endpoints = [
+            (self.user, '/api/auth/profile/', {}),
+            (self.user, '/api/auth/profile/transactions/', {'status': 'PENDING'}),
+            (self.user, '/api/auth/profile/investments/', {}),
+            (self.user, '/api/auth/account-activity/', {}),
+            (self.admin, '/api/auth/admin/transactions/', {'status': 'PENDING', 'limit': 20}),
+            (self.admin, '/api/auth/admin/transactions/', {'limit': 20}),
+            (self.admin, '/api/auth/admin/metrics/', {}),
+        ]
+        cache.clear()
+        client = APIClient()
+        for user, url, params in endpoints:
+            with self.subTest(url=url, params=params):
+                client.force_authenticate(user)
+                with CaptureQueriesContext(connection) as captured:
+                    response = client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+                self.assertIndexedQueries(captured.captured_queries)
+
+    def test_pending_transaction_count_uses_index(self):
+        with CaptureQueriesContext(connection) as captured:
+            Transaction.objects.filter(status='PENDING').count()
+        self.assertIndexedQueries(captured.captured_queries)
+
+
+class BalanceServiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='balance')
+        UserProfile.objects.filter(user=cls.user).update(total=Decimal('100.00'))
+
+    def test_credit_and_debit_return_new_total_in_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(balances.credit(self.user.id, Decimal('25.50')), Decimal('125.50'))
+        with self.assertNumQueries(1):
+            self.assertEqual(balances.debit(self.user.id, Decimal('125.50')), Decimal('0.00'))
+        profile = UserProfile.objects.get(user=self.user)
+        # Investing and selling move the balance only, not the deposit/withdrawal totals
+        self.assertEqual((profile.total_deposit, profile.total_withdraw), (Decimal('0.00'), Decimal('0.00')))
+
+    def test_other_databases_update_then_re_read(self):
+        # e.g. MariaDB, which returns columns from an INSERT but not from an UPDATE
+        with mock.patch.object(connection, 'vendor', 'mysql'), self.assertNumQueries(2):
+            self.assertEqual(balances.credit(self.user.id, Decimal('5.00')), Decimal('105.00'))
+        with mock.patch.object(connection, 'vendor', 'mysql'), self.assertRaises(balances.InsufficientBalance):
+            balances.debit(self.user.id, Decimal('105.01'))
+        self.assertEqual(UserProfile.objects.get(user=self.user).total, Decimal('105.00'))
+
+    def test_debit_never_overdraws(self):
+        with self.assertRaises(balances.InsufficientBalance):
+            balances.debit(self.user.id, Decimal('100.01'))
+        self.assertEqual(UserProfile.objects.get(user=self.user).total, Decimal('100.00'))
+
+    def test_missing_profile(self):
+        other = User.objects.create_user(username='no-profile')
+        UserProfile.objects.filter(user=other).delete()
+        with self.assertRaises(UserProfile.DoesNotExist):
+            balances.credit(other.id, Decimal('1.00'))
+
+
+class LedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='ledger')
+        cls.admin = User.objects.create_user(username='ledger-admin', is_staff=True)
+
+    def deposit(self, amount):
+        tx = Transaction.objects.create(user=self.user, transaction_type='DEPOSIT', amount=Decimal(amount))
+        approvals.approve_transactions([tx.id], self.admin)
+
+    def test_balance_matches_profile_across_snapshots(self):
+        for n in range(1, 8):
+            self.deposit(n)
+            if n % 3 == 0:
+                ledger.take_snapshots()
+        self.assertEqual(BalanceSnapshot.objects.filter(user=self.user).count(), 2)
+        total = UserProfile.objects.get(user=self.user).total
+        self.assertEqual(ledger.balance(self.user.id), total)
+        self.assertEqual(total, Decimal('28.00'))
+
+        ledger.rebuild_snapshots(every=2)
+        self.assertEqual(BalanceSnapshot.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(ledger.balance(self.user.id), total)
+
+    def test_balance_as_of(self):
+        self.deposit('10.00')
+        cutoff = timezone.now()
+        self.deposit('5.00')
+        ledger.take_snapshots()
+        self.assertEqual(ledger.balance(self.user.id, before=cutoff), Decimal('10.00'))
+        self.assertEqual(ledger.balance(self.user.id), Decimal('15.00'))
+
+
+class ApprovalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='approvals')
+        UserProfile.objects.filter(user=cls.user).update(total=Decimal('50.00'))
+        cls.admin = User.objects.create_superuser('approvals-admin', 'approvals-admin@example.com', 'secret-pass')
+
+    def setUp(self):
+        cache.clear()
+
+    def tx(self, transaction_type, amount, user=None):
+        return Transaction.objects.create(user=user or self.user, transaction_type=transaction_type, amount=Decimal(amount))
+
+    def concurrently_approved(self, tx):
+        """Patch _lock_pending so ``tx`` is approved elsewhere right after the batch locked it."""
+        lock_pending = approvals._lock_pending
+
+        def lock_then_race(ids):
+            rows = lock_pending(ids)
+            Transaction.objects.filter(id=tx.id).update(status='APPROVED')
+            return rows
+        return mock.patch.object(approvals, '_lock_pending', lock_then_race)
+
+    def test_partial_outcomes(self):
+        orphan = User.objects.create_user(username='approvals-orphan')
+        UserProfile.objects.filter(user=orphan).delete()
+        deposit = self.tx('DEPOSIT', '25.00')
+        withdrawal = self.tx('WITHDRAWAL', '60.00')
+        no_profile = self.tx('DEPOSIT', '5.00', user=orphan)
+        declined = self.tx('DEPOSIT', '5.00')
+        approvals.decline_transactions([declined.id], self.admin)
+
+        outcomes = approvals.approve_transactions([deposit.id, withdrawal.id, no_profile.id, declined.id, 999999], self.admin)
+        self.assertEqual(outcomes, {
+            deposit.id: approvals.APPROVED, withdrawal.id: approvals.APPROVED, no_profile.id: approvals.NO_PROFILE,
+            declined.id: approvals.NOT_PENDING, 999999: approvals.NOT_PENDING,
+        })
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual((profile.total, profile.total_deposit, profile.total_withdraw),
+                         (Decimal('15.00'), Decimal('25.00'), Decimal('60.00')))
+        self.assertEqual(Transaction.objects.get(id=no_profile.id).status, 'PENDING')
+        self.assertEqual(ledger.balance(self.user.id), Decimal('-35.00'))
+
+    def test_withdrawals_cannot_overdraw_within_a_batch(self):
+        first = self.tx('WITHDRAWAL', '30.00')
+        second = self.tx('WITHDRAWAL', '30.00')
+        outcomes = approvals.approve_transactions([first.id, second.id], self.admin)
+        self.assertEqual(outcomes, {first.id: approvals.APPROVED, second.id: approvals.INSUFFICIENT_BALANCE})
+        self.assertEqual(UserProfile.objects.get(user=self.user).total, Decimal('20.00'))
+        self.assertEqual(Transaction.objects.get(id=second.id).status, 'PENDING')
+
+    def test_conflict_rolls_the_whole_batch_back(self):
+        deposit = self.tx('DEPOSIT', '10.00')
+        raced = self.tx('DEPOSIT', '20.00')
+        with self.concurrently_approved(raced), self.assertRaises(approvals.ApprovalConflict):
+            approvals.approve_transactions([deposit.id, raced.id], self.admin)
+        self.assertEqual(Transaction.objects.get(id=deposit.id).status, 'PENDING')
+        self.assertEqual(UserProfile.objects.get(user=self.user).total, Decimal('50.00'))
+        self.assertFalse(LedgerEntry.objects.filter(user=self.user).exists())
+
+    def test_conflict_is_a_409_from_the_single_approve_endpoint(self):
+        raced = self.tx('DEPOSIT', '20.00')
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with self.concurrently_approved(raced):
+            response = client.post(f'/api/auth/admin/transaction/{raced.id}/approve/')
+        self.assertEqual(response.status_code, 409)
+
+    def test_conflict_is_reported_by_the_admin_action(self):
+        raced = self.tx('DEPOSIT', '20.00')
+        model_admin = TransactionAdmin(Transaction, django_admin.site)
+        request = RequestFactory().post('/')
+        request.user = self.admin
+        with self.concurrently_approved(raced), mock.patch.object(model_admin, 'message_user') as message_user:
+            model_admin.approve_transactions(request, Transaction.objects.filter(id=raced.id))
+        message_user.assert_called_once()
+        self.assertEqual(message_user.call_args.kwargs['level'], messages.ERROR)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], ACTIVITY_LOG_BUFFERED=False)
+class CounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        counters.reconcile()
+        self.start = self.counted()
+        self.admin = User.objects.create_superuser('counter-admin', 'counter-admin@example.com', 'secret-pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def counted(self):
+        return dict(Counter.objects.filter(name__in=counters.COUNTERS).values_list('name', 'value'))
+
+    def assertCounters(self, **deltas):
+        """Counters moved by ``deltas`` since setUp and still match a recount of their tables."""
+        expected = {name: self.start[name] + deltas.get(name, 0) for name in counters.COUNTERS}
+        self.assertEqual(self.counted(), expected)
+        self.assertEqual(expected, {name: rows().count() for name, rows in counters.COUNTERS.items()})
+
+    def test_users(self):
+        user = User.objects.create_user(username='counted')
+        self.assertCounters(total_users=2)
+        user.delete()
+        self.assertCounters(total_users=1)
+
+    def test_investments_and_options(self):
+        option = InvestmentOption.objects.create(
+            name='Counted fund', min_investment=Decimal('1.00'), expected_return=Decimal('1.00'), risk_level='LOW'
+        )
+        investments = [
+            Investment.objects.create(user=self.admin, option=option, name='Counted fund', amount=Decimal('5.00'),
+                                      daily_return_rate=Decimal('0.01'))
+            for _ in range(3)
+        ]
+        self.assertCounters(total_users=1, active_options=1, total_investments=3)
+        investments[0].delete()
+        self.assertCounters(total_users=1, active_options=1, total_investments=2)
+        # Cascades to the remaining investments
+        option.delete()
+        self.assertCounters(total_users=1)
+
+    def test_pending_transactions_through_their_lifecycle(self):
+        user = User.objects.create_user(username='counted-client')
+        UserProfile.objects.filter(user=user).update(total=Decimal('100.00'))
+        user.refresh_from_db()  # drops the profile cached by the signal
+        client = APIClient()
+        client.force_authenticate(user)
+        for path in ('/api/auth/deposit/', '/api/auth/deposit/', '/api/auth/withdraw/', '/api/auth/withdraw/'):
+            self.assertEqual(client.post(path, {'amount': '10.00'}).status_code, 201)
+        self.assertCounters(total_users=2, pending_transactions=4)
+        deposit, other_deposit, withdrawal, other_withdrawal = Transaction.objects.filter(user=user).order_by('id')
+
+        response = self.client.post('/api/auth/admin/transactions/approve/',
+                                    {'transaction_ids': [deposit.id, withdrawal.id]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertCounters(total_users=2, pending_transactions=2)
+        response = self.client.post('/api/auth/admin/transactions/decline/',
+                                    {'transaction_ids': [other_deposit.id]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertCounters(total_users=2, pending_transactions=1)
+
+        for tx in (deposit, other_deposit):
+            self.assertEqual(self.client.post(f'/api/auth/admin/transaction/{tx.id}/pending/').status_code, 200)
+        self.assertCounters(total_users=2, pending_transactions=3)
+        # Already pending: nothing changes
+        self.client.post(f'/api/auth/admin/transaction/{other_withdrawal.id}/pending/')
+        self.assertCounters(total_users=2, pending_transactions=3)
+
+        # Deleting the user cascades to its transactions, pending or not
+        Transaction.objects.filter(id=withdrawal.id).update(status='APPROVED')
+        user.delete()
+        self.assertCounters(total_users=1)
+
+    def test_reconcile_repairs_corrupted_counters(self):
+        Counter.objects.filter(name='pending_transactions').update(value=999)
+        Counter.objects.filter(name='total_users').delete()
+        Transaction.objects.create(user=self.admin, transaction_type='DEPOSIT', amount=Decimal('1.00'))
+        out = io.StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Counters reconciled', out.getvalue())
+        self.assertCounters(total_users=1, pending_transactions=1)
+
+
+class AccrualTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        option = InvestmentOption.objects.create(
+            name='Accrual fund', min_investment=Decimal('10.00'), expected_return=Decimal('1.00'), risk_level='LOW'
+        )
+        cls.users = [User.objects.create_user(username=f'accrual{i}') for i in range(5)]
+        for i, user in enumerate(cls.users):
+            Investment.objects.create(
+                user=user, option=option, name='Accrual fund', amount=Decimal('100.00') * (i + 1),
+                daily_return_rate=Decimal('0.01'),
+            )
+        cls.idle = User.objects.create_user(username='accrual-idle')
+        cls.today = timezone.localdate()
+        cls.yesterday = cls.today - timedelta(days=1)
+
+    def totals(self):
+        return dict(UserProfile.objects.filter(user__in=self.users).values_list('user_id', 'total'))
+
+    def test_credits_each_profile_once_across_chunks(self):
+        marker = accrual.accrue_daily_earnings(self.yesterday, chunk_size=2)
+        self.assertEqual((marker.profiles_credited, marker.total_credited), (5, Decimal('15.00')))
+        self.assertEqual(self.totals(), {user.id: Decimal(i + 1) for i, user in enumerate(self.users)})
+        idle = UserProfile.objects.get(user=self.idle)
+        self.assertEqual((idle.total, idle.earnings_accrued_on), (Decimal('0.00'), self.yesterday))
+
+        entries = LedgerEntry.objects.filter(entry_type='ACCRUAL')
+        self.assertEqual(entries.count(), 5)
+        # Dated on the accrued day, not when the job ran
+        self.assertEqual({timezone.localtime(entry.created_at).date() for entry in entries}, {self.yesterday})
+
+    def test_rerunning_a_day_is_a_no_op(self):
+        accrual.accrue_daily_earnings(self.yesterday)
+        before = self.totals()
+        # The last completed day before it (for a catch-up) and its own marker
+        with self.assertNumQueries(2):
+            marker = accrual.accrue_daily_earnings(self.yesterday)
+        self.assertEqual(marker.profiles_credited, 5)
+        self.assertEqual(self.totals(), before)
+
+    def test_force_only_credits_profiles_missed_by_the_first_run(self):
+        accrual.accrue_daily_earnings(self.yesterday)
+        late = User.objects.create_user(username='accrual-late')
+        Investment.objects.create(
+            user=late, option=InvestmentOption.objects.get(), name='Accrual fund', amount=Decimal('50.00'),
+            daily_return_rate=Decimal('0.02'),
+        )
+        marker = accrual.accrue_daily_earnings(self.yesterday, force=True)
+        self.assertEqual((marker.profiles_credited, marker.total_credited), (6, Decimal('16.00')))
+        self.assertEqual(UserProfile.objects.get(user=late).total, Decimal('1.00'))
+        self.assertEqual(LedgerEntry.objects.filter(entry_type='ACCRUAL').count(), 6)
+
+    def test_a_late_accrual_stays_on_its_day_in_snapshots(self):
+        user_id = self.users[0].id
+        today = history._day_start(self.today)
+        for snapshot in (ledger.take_snapshots, ledger.rebuild_snapshots):
+            with self.subTest(snapshot=snapshot.__name__):
+                LedgerEntry.objects.all().delete()
+                BalanceSnapshot.objects.all().delete()
+                EarningsAccrual.objects.all().delete()
+                UserProfile.objects.update(earnings_accrued_on=None)
+                ledger.record(user_id, 'DEPOSIT', Decimal('100.00'))
+                ledger.take_snapshots()
+                # Yesterday's 1.00 is written after today's deposit, so its id is higher
+                accrual.accrue_daily_earnings(self.yesterday)
+                snapshot()
+                self.assertEqual(ledger.balance(user_id, before=today), Decimal('1.00'))
+                self.assertEqual(ledger.balances_before([user_id], today), {user_id: Decimal('1.00')})
+                self.assertEqual(ledger.balance(user_id), Decimal('101.00'))
+                history.snapshot_day(self.yesterday)
+                history.snapshot_day(self.today)
+                self.assertEqual(
+                    dict(DailyBalance.objects.filter(user_id=user_id).values_list('day', 'balance')),
+                    {self.yesterday: Decimal('1.00'), self.today: Decimal('101.00')},
+                )
+
+    def test_missed_days_are_caught_up_in_order(self):
+        first = self.today - timedelta(days=3)
+        accrual.accrue_daily_earnings(first)
+        # No run for the two days after; today's run accrues them before today
+        marker = accrual.accrue_daily_earnings()
+        self.assertEqual(marker.day, self.today)
+        markers = EarningsAccrual.objects.order_by('day')
+        self.assertEqual([m.day for m in markers], [first + timedelta(days=n) for n in range(4)])
+        self.assertTrue(all(m.completed_at and m.total_credited == Decimal('15.00') for m in markers))
+        self.assertEqual(self.totals(), {user.id: Decimal(4 * (i + 1)) for i, user in enumerate(self.users)})
+        accrued_on = LedgerEntry.objects.filter(entry_type='ACCRUAL', user=self.users[0]).order_by('id')
+        self.assertEqual(
+            [timezone.localtime(entry.created_at).date() for entry in accrued_on],
+            [first + timedelta(days=n) for n in range(4)],
+        )
+
+        before = self.totals()
+        accrual.accrue_daily_earnings()
+        self.assertEqual(self.totals(), before)
+
+    def test_future_and_out_of_order_days_fail_loudly(self):
+        with self.assertRaises(accrual.AccrualError):
+            accrual.accrue_daily_earnings(self.today + timedelta(days=1))
+        accrual.accrue_daily_earnings(self.today)
+        before = self.totals()
+        with self.assertRaises(accrual.AccrualError):
+            accrual.accrue_daily_earnings(self.yesterday)
+        self.assertEqual(self.totals(), before)
+        self.assertFalse(EarningsAccrual.objects.filter(day=self.yesterday).exists())
+
+
+@override_settings(REPLICA_DATABASE_ALIAS='replica')
+class ReplicaRouterTests(SimpleTestCase):
+    # Not TestCase: its per-test transaction would keep every read on the primary
+    databases = {'default'}
+
+    def setUp(self):
+        cache.clear()
+        self.router = routing.ReplicaRouter()
+        self.request = RequestFactory().get('/')
+        self.request.user = User(id=42)
+
+    def route(self):
+        return self.router.db_for_read(Transaction)
+
+    def test_only_read_only_views_use_the_replica(self):
+        self.assertIsNone(self.route())
+        self.assertEqual(routing.read_only(lambda request: self.route())(self.request), 'replica')
+        self.assertIsNone(self.route())
+
+    def test_atomic_blocks_stay_on_primary(self):
+        def view(request):
+            with transaction.atomic():
+                return self.route()
+        self.assertIsNone(routing.read_only(view)(self.request))
+
+    def test_recent_writers_read_from_primary(self):
+        routing.pin_to_primary(42)
+        self.assertIsNone(routing.read_only(lambda request: self.route())(self.request))
+        self.request.user = User(id=43)
+        self.assertEqual(routing.read_only(lambda request: self.route())(self.request), 'replica')
+
+
+class CatalogCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='catalog')
+        InvestmentOption.objects.create(
+            name='Bonds', min_investment=Decimal('50.00'), expected_return=Decimal('0.50'), risk_level='LOW'
+        )
+
+    def setUp(self):
+        cache.clear()
+        catalog.get_options.cache_clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, **headers):
+        return self.client.get('/api/auth/available-investments/', headers=headers)
+
+    def test_served_from_cache_and_revalidated_without_queries(self):
+        first = self.get()
+        self.assertEqual([option['name'] for option in first.data], ['Bonds'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get().data, first.data)
+            not_modified = self.get(if_none_match=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], first['ETag'])
+
+    def test_saving_an_option_changes_the_etag(self):
+        first = self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            InvestmentOption.objects.create(
+                name='Stocks', min_investment=Decimal('100.00'), expected_return=Decimal('2.00'), risk_level='HIGH'
+            )
+        response = self.get(if_none_match=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual([option['name'] for option in response.data], ['Bonds', 'Stocks'])
+
+
+    def test_a_bump_from_another_worker_is_seen_once_the_cached_version_expires(self):
+        first = self.get()
+        # Another process bumped the version; only its own cache forgot the old one
+        Counter.objects.filter(name=catalog.VERSION_NAME).update(value=F('value') + 1)
+        self.assertEqual(self.get(if_none_match=first['ETag']).status_code, 304)
+        cache.delete(catalog.VERSION_KEY)  # VERSION_TIMEOUT elapsed
+        self.assertEqual(self.get(if_none_match=first['ETag']).status_code, 200)
+
+class FastJSONRendererTests(SimpleTestCase):
+    def test_matches_drf_output(self):
+        data = {
+            'amount': Decimal('12.50'),
+            'created_at': timezone.now(),
+            'notes': 'line\u2028separator, caf\u00e9',
+            7: [None, True, 1.5],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+
+
+class ProfileFieldSelectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_accounts(users=1, transactions_per_user=5, investments_per_user=5, activities_per_user=0)[0]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, params, queries):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/auth/profile/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(captured.captured_queries), queries, [q['sql'] for q in captured.captured_queries])
+        return response.data, ' '.join(query['sql'] for query in captured.captured_queries)
+
+    def test_query_count_per_selection(self):
+        cases = [
+            ({}, 3),
+            ({'fields': 'username,email'}, 0),
+            ({'fields': 'total,daily_earnings'}, 1),
+            ({'include': 'investments'}, 2),
+            ({'fields': 'total', 'include': 'transactions'}, 2),
+            ({'fields': 'username', 'include': 'investments,transactions'}, 2),
+        ]
+        for params, queries in cases:
+            with self.subTest(params=params):
+                self.get(params, queries)
+
+    def test_balance_header_skips_investments_and_transactions(self):
+        data, sql = self.get({'fields': 'total,daily_earnings'}, 1)
+        self.assertEqual(set(data), {'total', 'daily_earnings', 'message'})
+        self.assertNotIn('accounts_investment', sql)
+        self.assertNotIn('accounts_transaction', sql)
+
+    def test_full_profile_by_default(self):
+        data, _ = self.get({}, 3)
+        self.assertEqual(len(data['investments']), 5)
+        self.assertEqual(len(data['transactions']), 5)
+        self.assertEqual(data['total'], '1000.00')
+
+    def test_unknown_names_are_rejected(self):
+        for params in ({'fields': 'total,password'}, {'include': 'activity'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/auth/profile/', params).status_code, 400)
+
+
+class ProjectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='projector')
+        cls.other = User.objects.create_user(username='projector2')
+        cls.admin = User.objects.create_user(username='projector-admin', is_staff=True)
+        high = InvestmentOption.objects.create(
+            name='Growth', min_investment=Decimal('1.00'), expected_return=Decimal('2.00'), risk_level='HIGH'
+        )
+        cls.positions = [
+            (cls.user, high, Decimal('1000.00'), Decimal('0.0200')),
+            (cls.user, None, Decimal('250.50'), Decimal('0.0050')),
+            (cls.other, high, Decimal('40.00'), Decimal('0.0100')),
+        ]
+        Investment.objects.bulk_create([
+            Investment(user=user, option=option, name='p', amount=amount, daily_return_rate=rate)
+            for user, option, amount, rate in cls.positions
+        ])
+
+    def expected(self, days, user=None):
+        # Plain-Python reference for the vectorised engine
+        totals = {}
+        for owner, option, amount, rate in self.positions:
+            if user is not None and owner != user:
+                continue
+            level = option.risk_level if option else 'MEDIUM'
+            bands = projections.RISK_BANDS[projections.RISK_LEVELS.index(level)]
+            for scenario, band in zip(projections.SCENARIOS, bands):
+                daily = float(rate) * band
+                simple, compound = totals.get(scenario, (0.0, 0.0))
+                totals[scenario] = (
+                    simple + float(amount) * (1 + daily * days),
+                    compound + float(amount) * (1 + daily) ** days,
+                )
+        return {scenario: {'simple': f'{s:.2f}', 'compound': f'{c:.2f}'} for scenario, (s, c) in totals.items()}
+
+    def test_user_projection(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        data = client.get('/api/auth/profile/projection/', {'days': 90}).data
+        self.assertEqual(data['principal'], '1250.50')
+        self.assertEqual(data['scenarios'], self.expected(90, self.user))
+        self.assertEqual([investment['risk_level'] for investment in data['investments']], ['HIGH', 'MEDIUM'])
+        self.assertEqual(client.get('/api/auth/profile/projection/', {'days': 0}).status_code, 400)
+
+    def test_platform_projection(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        data = client.get('/api/auth/admin/projections/', {'days': 30}).data
+        self.assertEqual((data['users'], data['positions']), (2, 3))
+        self.assertEqual(data['scenarios'], self.expected(30))
+        self.assertEqual(data['by_risk_level']['HIGH']['positions'], 2)
+        self.assertEqual(data['by_risk_level']['LOW']['principal'], '0.00')
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='pages')
+        cls.ids = [
+            Transaction.objects.create(user=cls.user, transaction_type='DEPOSIT', amount=Decimal(n)).id
+            for n in range(1, 8)
+        ]
+        # Every row shares one timestamp, so only the id breaks ties
+        Transaction.objects.filter(id__in=cls.ids[:5]).update(created_at=timezone.now() - timedelta(days=1))
+
+    def walk(self, descending=False, limit=2):
+        queryset = Transaction.objects.filter(user=self.user)
+        seen, cursor = [], None
+        while True:
+            page, cursor = pagination.keyset_page(queryset, cursor, limit, descending)
+            seen.extend(tx.id for tx in page)
+            if cursor is None:
+                return seen
+
+    def test_cursor_round_trip(self):
+        created_at = timezone.now()
+        self.assertEqual(pagination.decode_cursor(pagination.encode_cursor(created_at, 42)), (created_at, 42))
+
+    def test_pages_cover_ties_exactly_once(self):
+        self.assertEqual(self.walk(), self.ids)
+        self.assertEqual(self.walk(limit=3), self.ids)
+        self.assertEqual(self.walk(descending=True), self.ids[::-1])
+        self.assertEqual(self.walk(limit=100), self.ids)
+
+    def test_view_follows_next_cursor(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        seen, params = [], {'limit': 3}
+        while True:
+            response = client.get('/api/auth/profile/transactions/', params)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(tx['transaction_id'] for tx in response.data['results'])
+            if response.data['next_cursor'] is None:
+                break
+            params['cursor'] = response.data['next_cursor']
+        expected = Transaction.objects.filter(id__in=self.ids).order_by('created_at', 'id')
+        self.assertEqual(seen, [str(tx.transaction_id) for tx in expected])
+
+    def test_invalid_or_tampered_cursors(self):
+        def b64(raw):
+            return base64.urlsafe_b64encode(raw.encode()).decode()
+
+        cursors = [
+            'not-a-cursor', b64('not json'), b64('{}'), b64('[1, 2]'), b64('["2024-01-01T00:00:00"]'),
+            b64('["yesterday", 1]'), b64('["2024-01-01T00:00:00", "one"]'), b64('["2024-01-01T00:00:00", Infinity]'),
+        ]
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for cursor in cursors:
+            with self.assertRaises(pagination.InvalidCursor):
+                pagination.decode_cursor(cursor)
+            response = client.get('/api/auth/profile/transactions/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+
+
+class DailyBalanceTests(IndexedQueriesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='charted')
+        cls.idle = User.objects.create_user(username='idle')
+        cls.first = date(2024, 1, 1)  # a Monday
+
+        def entry(user, day, amount):
+            return LedgerEntry(user=user, entry_type='DEPOSIT', amount=Decimal(amount),
+                               created_at=history._day_start(cls.first + timedelta(days=day)) + timedelta(hours=12))
+
+        LedgerEntry.objects.bulk_create([
+            entry(cls.idle, -1, '5.00'),
+            entry(cls.user, -1, '100.00'),  # before the job's first day
+            entry(cls.user, 0, '10.00'),
+            entry(cls.user, 0, '-5.00'),
+            entry(cls.user, 2, '20.00'),
+            entry(cls.user, 9, '1.00'),
+        ])
+        for offset in range(10):
+            history.snapshot_day(cls.first + timedelta(days=offset))
+
+    def test_only_changed_users_are_snapshotted(self):
+        self.assertFalse(DailyBalance.objects.filter(user=self.idle).exists())
+        self.assertEqual(
+            list(DailyBalance.objects.filter(user=self.user).order_by('day').values_list('day', 'balance')),
+            [(date(2024, 1, 1), Decimal('105.00')), (date(2024, 1, 3), Decimal('125.00')),
+             (date(2024, 1, 10), Decimal('126.00'))],
+        )
+        # Re-running a day changes nothing
+        history.snapshot_day(self.first + timedelta(days=2))
+        self.assertEqual(DailyBalance.objects.get(user=self.user, day=date(2024, 1, 3)).balance, Decimal('125.00'))
+
+    def test_a_skipped_night_does_not_skew_later_closings(self):
+        user = User.objects.create_user(username='skipped')
+
+        def deposit(day, amount):
+            return LedgerEntry(user=user, entry_type='DEPOSIT', amount=Decimal(amount),
+                               created_at=history._day_start(day) + timedelta(hours=12))
+
+        LedgerEntry.objects.bulk_create([deposit(date(2024, 2, 1), '100.00'), deposit(date(2024, 2, 2), '50.00')])
+        ledger.take_snapshots()
+        LedgerEntry.objects.bulk_create([deposit(date(2024, 2, 3), '10.00')])
+        history.snapshot_day(date(2024, 2, 1))
+        history.snapshot_day(date(2024, 2, 3))  # The job did not run for Feb 2
+        closings = dict(DailyBalance.objects.filter(user=user).values_list('day', 'balance'))
+        self.assertEqual(closings, {date(2024, 2, 1): Decimal('100.00'), date(2024, 2, 3): Decimal('160.00')})
+
+    def test_history_buckets_carry_balances_forward(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/auth/profile/balance/history/',
+                              {'start': '2024-01-02', 'end': '2024-01-04', 'bucket': 'day'})
+        self.assertEqual([point['balance'] for point in response.data['series']], ['105.00', '125.00', '125.00'])
+        response = client.get('/api/auth/profile/balance/history/',
+                              {'start': '2024-01-01', 'end': '2024-01-21', 'bucket': 'week'})
+        self.assertEqual(response.data['series'], [
+            {'date': '2024-01-01', 'balance': '125.00'},
+            {'date': '2024-01-08', 'balance': '126.00'},
+            {'date': '2024-01-15', 'balance': '126.00'},
+        ])
+
+    def test_two_year_chart_reads_one_row_per_bucket(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get('/api/auth/profile/balance/history/', {'start': '2023-01-01', 'end': '2024-12-31'})
+        self.assertEqual(response.data['bucket'], 'week')
+        # 2023-01-01 is a Sunday, so the first week starts on 2022-12-26
+        self.assertEqual(len(response.data['series']), 106)
+        # Bucketed closings, the opening row, and the ledger fallback (snapshot + tail) for
+        # a range that starts before the first snapshot; all of them index range scans
+        self.assertLessEqual(len(captured.captured_queries), 4)
+        self.assertIndexedQueries(captured.captured_queries)
+        self.assertEqual(client.get('/api/auth/profile/balance/history/',
+                                    {'start': '2000-01-01', 'bucket': 'day'}).status_code, 400)
+
+
+class TransactionRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='rolled')
+        cls.admin = User.objects.create_user(username='roll-admin', is_staff=True)
+        UserProfile.objects.filter(user=cls.user).update(total=Decimal('100.00'))
+
+    def rollups(self):
+        return set(TransactionRollup.objects.exclude(count=0).values_list('day', 'transaction_type', 'status', 'count', 'total'))
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        def create(transaction_type, amount):
+            return Transaction.objects.create(user=self.user, transaction_type=transaction_type, amount=Decimal(amount))
+
+        deposits = [create('DEPOSIT', amount) for amount in ('10.00', '20.00', '30.00')]
+        withdrawal = create('WITHDRAWAL', '500.00')
+        approvals.approve_transactions([deposits[0].id, deposits[1].id, withdrawal.id], self.admin)
+        approvals.decline_transactions([withdrawal.id], self.admin)
+        deposits[2].status = 'DECLINED'
+        deposits[2].save()
+        deposits[2].status = 'PENDING'
+        deposits[2].amount = Decimal('35.00')
+        deposits[2].save()
+        create('DEPOSIT', '1.00').delete()
+
+        incremental = self.rollups()
+        today = timezone.localdate()
+        self.assertEqual(incremental, {
+            (today, 'DEPOSIT', 'APPROVED', 2, Decimal('30.00')),
+            (today, 'DEPOSIT', 'PENDING', 1, Decimal('35.00')),
+            (today, 'WITHDRAWAL', 'DECLINED', 1, Decimal('500.00')),
+        })
+        list(rollups.rebuild(today, today))
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_report_reads_only_rollups(self):
+        Transaction.objects.create(user=self.user, transaction_type='DEPOSIT', amount=Decimal('10.00'))
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get('/api/auth/admin/reports/transactions/', {'group': 'month', 'type': 'deposit'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(captured.captured_queries), 1)
+        self.assertIn('accounts_transactionrollup', captured.captured_queries[0]['sql'])
+        self.assertEqual(response.data['results'], [{
+            'period': timezone.localdate().replace(day=1).isoformat(),
+            'type': 'DEPOSIT', 'status': 'PENDING', 'count': 1, 'total': '10.00',
+        }])
+        self.assertEqual(client.get('/api/auth/admin/reports/transactions/', {'group': 'year'}).status_code, 400)
+
+
+class AdminTransactionListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username='list-alice')
+        cls.bob = User.objects.create_user(username='list-bob')
+        cls.admin = User.objects.create_user(username='list-admin', is_staff=True)
+        specs = [
+            (cls.alice, 'DEPOSIT', '10.00', 'APPROVED', datetime(2024, 1, 1, 9)),
+            (cls.alice, 'WITHDRAWAL', '25.50', 'PENDING', datetime(2024, 1, 2, 9)),
+            (cls.bob, 'DEPOSIT', '100.00', 'DECLINED', datetime(2024, 1, 2, 23, 30)),
+            (cls.bob, 'DEPOSIT', '5.00', 'PENDING', datetime(2024, 1, 3, 0, 15)),
+        ]
+        cls.txs = []
+        for user, transaction_type, amount, tx_status, created_at in specs:
+            tx = Transaction.objects.create(user=user, transaction_type=transaction_type, amount=Decimal(amount), status=tx_status)
+            Transaction.objects.filter(id=tx.id).update(created_at=timezone.make_aware(created_at))
+            cls.txs.append(tx.id)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def listed(self, **params):
+        response = self.client.get('/api/auth/admin/transactions/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['id'] for row in response.data]
+
+    def exported(self, output='jsonl', **params):
+        response = self.client.get('/api/auth/admin/transactions/export/', dict(params, output=output))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], exports.CONTENT_TYPES[output])
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="transactions.{output}"')
+        return b''.join(response.streaming_content).decode()
+
+    def test_filters(self):
+        a1, a2, b1, b2 = self.txs
+        self.assertEqual(self.listed(), self.txs)
+        self.assertEqual(self.listed(status='pending'), [a2, b2])
+        self.assertEqual(self.listed(type='deposit'), [a1, b1, b2])
+        self.assertEqual(self.listed(user=str(self.bob.id)), [b1, b2])
+        self.assertEqual(self.listed(min_amount='10', max_amount='25.50'), [a1, a2])
+        # A date bound covers the whole day; a datetime bound is exact
+        self.assertEqual(self.listed(created_after='2024-01-02', created_before='2024-01-02'), [a2, b1])
+        self.assertEqual(self.listed(created_after='2024-01-02T12:00:00'), [b1, b2])
+        self.assertEqual(self.listed(status='pending', type='deposit', user=str(self.bob.id)), [b2])
+
+    def test_invalid_filters(self):
+        for params in (
+            {'user': 'bob'}, {'min_amount': 'ten'}, {'max_amount': '1e'}, {'created_after': '2024-13-01'},
+            {'created_before': 'yesterday'},
+        ):
+            for path in ('/api/auth/admin/transactions/', '/api/auth/admin/transactions/export/'):
+                response = self.client.get(path, params)
+                self.assertEqual(response.status_code, 400, (path, params))
+                self.assertIn('error', response.data)
+        self.assertEqual(self.client.get('/api/auth/admin/transactions/', {'cursor': 'nonsense'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/auth/admin/transactions/export/', {'output': 'xml'}).status_code, 400)
+
+    def test_jsonl_export_matches_the_listing(self):
+        for params in ({}, {'status': 'pending'}, {'user': str(self.alice.id), 'min_amount': '20'}):
+            rows = [json.loads(line) for line in self.exported(**params).splitlines()]
+            self.assertEqual([row['id'] for row in rows], self.listed(**params))
+        row = json.loads(self.exported(type='withdrawal'))
+        self.assertEqual(
+            (row['user'], row['type'], row['amount'], row['status'], row['processed_by']),
+            ('list-alice', 'WITHDRAWAL', '25.50', 'PENDING', None),
+        )
+        self.assertEqual(datetime.fromisoformat(row['created_at']), timezone.make_aware(datetime(2024, 1, 2, 9)))
+
+    def test_csv_export(self):
+        reader = csv.DictReader(io.StringIO(self.exported('csv', status='pending')))
+        self.assertEqual(reader.fieldnames, [name for name, _, _ in views.ADMIN_TRANSACTION_FIELDS])
+        rows = list(reader)
+        self.assertEqual([int(row['id']) for row in rows], [self.txs[1], self.txs[3]])
+        self.assertEqual([row['amount'] for row in rows], ['25.50', '5.00'])
+        self.assertEqual({row['processed_by'] for row in rows}, {''})
+
+    def test_gzip_export(self):
+        response = self.client.get('/api/auth/admin/transactions/export/', {'output': 'jsonl.gz'})
+        self.assertEqual(response.status_code, 200)
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], self.txs)
+
+
+class ComplianceExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='audited')
+        Transaction.objects.bulk_create([
+            Transaction(user=user, transaction_type='DEPOSIT', amount=Decimal(i + 1)) for i in range(25)
+        ])
+
+    def export(self, output, interrupt_after=None):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), f'export.{output}')
+        writer = compliance.write_export('transactions', output, path, chunk_size=10)
+        if interrupt_after is not None:
+            for _ in range(interrupt_after):
+                next(writer)
+            writer.close()
+            # A crash after the checkpoint can leave a partly written chunk behind
+            with open(path, 'ab') as f:
+                f.write(b'half a row')
+            writer = compliance.write_export('transactions', output, path, resume=True, chunk_size=10)
+        states = list(writer)
+        with open(path, 'rb') as f:
+            return f.read(), states[-1]
+
+    def test_resumed_export_matches_an_uninterrupted_one(self):
+        for output in compliance.FILE_FORMATS:
+            with self.subTest(output=output):
+                complete, state = self.export(output)
+                resumed, _ = self.export(output, interrupt_after=1)
+                self.assertEqual(state['rows'], 25)
+                if output == 'jsonl.gz':
+                    complete, resumed = gzip.decompress(complete), gzip.decompress(resumed)
+                self.assertEqual(resumed, complete)
+
+        lines = complete.decode().splitlines()
+        self.assertEqual([json.loads(line)['amount'] for line in lines], [f'{i + 1}.00' for i in range(25)])
+
+    def test_resume_rejects_a_different_export(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'export.csv')
+        list(compliance.write_export('transactions', 'csv', path, chunk_size=10))
+        with self.assertRaises(compliance.CheckpointMismatch):
+            list(compliance.write_export('activity', 'csv', path, resume=True))
+
+    def test_endpoint_streams_gzip_jsonl(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='auditor', is_staff=True))
+        response = client.get('/api/auth/admin/exports/transactions/', {'after_id': Transaction.objects.order_by('id')[19].id})
+        self.assertEqual(response.status_code, 200)
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(client.get('/api/auth/admin/exports/users/').status_code, 404)
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        performance.stats.clear()
+
+    def test_server_timing_and_route_aggregates(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='perf-admin', is_staff=True))
+        response = client.get('/api/auth/admin/metrics/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", view;dur=[\d.]+, total;dur=[\d.]+$')
+
+        routes = client.get('/api/auth/admin/performance/').data['routes']
+        metrics = next(row for row in routes if row['route'] == 'api/auth/admin/metrics/')
+        self.assertEqual((metrics['method'], metrics['requests'], metrics['n_plus_one']), ('GET', 1, 0))
+        self.assertEqual(metrics['bytes_avg'], len(response.content))
+
+    def test_repeated_statement_shapes_are_flagged(self):
+        users = User.objects.bulk_create([User(username=f'n1-{i}') for i in range(12)])
+
+        def view(request):
+            for user in users:
+                list(UserProfile.objects.filter(user_id=user.id))
+            return JsonResponse({})
+
+        middleware = performance.PerformanceMiddleware(view)
+        with self.assertLogs('accounts.performance', 'WARNING') as logs:
+            middleware(RequestFactory().get('/n-plus-one/'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['queries'], 12)
+        self.assertEqual(len(record['n_plus_one']), 1)
+        self.assertEqual(record['n_plus_one'][0]['times'], 12)
+        self.assertIn('"user_id" = ?', record['n_plus_one'][0]['sql'])
+
+    def test_sql_shape_collapses_values(self):
+        self.assertEqual(
+            performance.sql_shape("SELECT 1 FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            performance.sql_shape("SELECT 1 FROM t WHERE id IN (%s) AND name = 'y' LIMIT 1"),
+        )
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], ACTIVITY_LOG_BUFFERED=False)
+class LoadTestTests(TestCase):
+    def setUp(self):
+        # Seeded users are bulk-inserted, so nothing forgets cached users from earlier tests
+        cache.clear()
+
+    def test_every_route_has_a_request(self):
+        self.assertEqual(loadtest.uncovered_routes(), [])
+
+    def test_every_route_succeeds_against_the_seeded_fixture(self):
+        plan = [(route, 0) for route in loadtest.ROUTES]
+        fixture = loadtest.seed_fixture(5, plan)
+        samples = loadtest.run_requests(fixture, plan, range(len(plan)), concurrency=1)
+        self.assertEqual({route: status for route, _, _, status in samples if status >= 400}, {})
+        result = loadtest.report(samples, 1.0)
+        self.assertEqual(set(result['routes']), set(loadtest.ROUTES))
+        self.assertEqual(result['overall']['requests'], len(plan))
+
+
+class SyntheticDataTests(TestCase):
+    def generate(self):
+        option = InvestmentOption.objects.create(
+            name='Fund', min_investment=Decimal('10.00'), expected_return=Decimal('1.00'), risk_level='LOW'
+        )
+        synthetic.generate_block({
+            'first_id': 1000, 'count': 40, 'seed': 3, 'days': 90,
+            'anchor': timezone.make_aware(datetime(2026, 1, 31, 12)),
+            'transactions': 6, 'investments': 2, 'activity': 4, 'password': 'unusable', 'prefix': 'gen',
+            'admin_id': None, 'options': [(option.id, option.name, Decimal('0.0100'))],
+        })
+        return [
+            list(Transaction.objects.order_by('transaction_id').values_list(
+                'transaction_id', 'user_id', 'transaction_type', 'amount', 'status', 'created_at')),
+            list(UserProfile.objects.order_by('user_id').values_list('user_id', 'total', 'total_deposit', 'total_withdraw')),
+            list(AccountActivity.objects.order_by('user_id', 'timestamp').values_list('user_id', 'action', 'timestamp')),
+        ]
+
+    def test_same_seed_same_rows(self):
+        first = self.generate()
+        User.objects.all().delete()
+        InvestmentOption.objects.all().delete()
+        self.assertEqual(self.generate(), first)
+
+    def test_profiles_agree_with_transactions_and_ledger(self):
+        self.generate()
+        self.assertEqual(User.objects.count(), 40)
+        self.assertTrue(Transaction.objects.filter(created_at__lt=timezone.make_aware(datetime(2026, 1, 1))).exists())
+        for profile in UserProfile.objects.all():
+            approved = Transaction.objects.filter(user_id=profile.user_id, status='APPROVED')
+            deposits = approved.filter(transaction_type='DEPOSIT').aggregate(total=Sum('amount'))['total'] or 0
+            self.assertEqual(profile.total_deposit, deposits)
+            self.assertEqual(ledger.balance(profile.user_id), profile.total)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], ACTIVITY_LOG_BUFFERED=False)
+class UserProfileCreationTests(TestCase):
+    def test_new_users_get_a_profile(self):
+        user = User.objects.create_user(username='fresh')
+        self.assertTrue(UserProfile.objects.filter(user=user).exists())
+
+    def test_backfill_is_one_anti_join_plus_chunked_inserts(self):
+        User.objects.bulk_create([User(username=f'bulk{i}') for i in range(5)])
+        with self.assertNumQueries(4):
+            self.assertEqual(profiles.backfill_profiles(chunk_size=2), 5)
+        self.assertFalse(profiles.missing_profile_user_ids().exists())
+        self.assertEqual(profiles.backfill_profiles(), 0)
+
+    def test_admin_add_user_fills_in_the_signal_created_profile(self):
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'secret-pass'))
+        response = self.client.post('/admin/auth/user/add/', {
+            'username': 'added', 'usable_password': 'true', 'password1': 'Str0ng-pass-123', 'password2': 'Str0ng-pass-123',
+            'profile-TOTAL_FORMS': '1', 'profile-INITIAL_FORMS': '0', 'profile-MIN_NUM_FORMS': '0',
+            'profile-MAX_NUM_FORMS': '1', 'profile-0-total': '12.50', 'profile-0-total_deposit': '0',
+            'profile-0-total_withdraw': '0', 'profile-0-mobile_number': '0712345678', 'profile-0-address': '',
+        })
+        self.assertEqual(response.status_code, 302)
+        profile = UserProfile.objects.get(user__username='added')
+        self.assertEqual((profile.total, profile.mobile_number), (Decimal('12.50'), '0712345678'))
+
+    def test_login_does_not_touch_profiles(self):
+        User.objects.create_user(username='signed', password='secret-pass')
+        with CaptureQueriesContext(connection) as captured:
+            response = APIClient().post('/api/auth/login/', {'usernameOrEmail': 'signed', 'password': 'secret-pass'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in captured.captured_queries if 'accounts_userprofile' in q['sql']])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], ACTIVITY_LOG_BUFFERED=False)
+class LoginBackendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username='alice', email='Alice@Example.com', password='alice-pass')
+
+    def login(self, username_or_email, password):
+        return APIClient().post(
+            '/api/auth/login/', {'usernameOrEmail': username_or_email, 'password': password}, format='json'
+        )
+
+    def test_username_or_case_insensitive_email(self):
+        for login in ('alice', 'alice@example.com', 'ALICE@EXAMPLE.COM'):
+            self.assertEqual(self.login(login, 'alice-pass').status_code, 200, login)
+        self.assertEqual(self.login('Alice', 'alice-pass').status_code, 401)
+        self.assertEqual(self.login('alice', 'wrong-pass').status_code, 401)
+        self.assertEqual(self.login('nobody@example.com', 'alice-pass').status_code, 401)
+
+    def test_exact_username_wins_over_another_users_email(self):
+        bob = User.objects.create_user(username='alice@example.com', email='bob@example.com', password='bob-pass')
+        self.assertEqual(authenticate(username='alice@example.com', password='bob-pass'), bob)
+        self.assertIsNone(authenticate(username='alice@example.com', password='alice-pass'))
+
+    def test_inactive_users_cannot_log_in(self):
+        User.objects.filter(pk=self.alice.pk).update(is_active=False)
+        self.assertEqual(self.login('alice', 'alice-pass').status_code, 401)
+        self.assertEqual(self.login('alice@example.com', 'alice-pass').status_code, 401)
+
+    def test_non_string_usernames_are_rejected(self):
+        for login in (None, 123, ['alice'], {'username': 'alice'}):
+            self.assertEqual(self.login(login, 'alice-pass').status_code, 401, login)
+
+    def test_signup_conflicts(self):
+        fields = {'first_name': 'A', 'last_name': 'B', 'password': 'secret-pass', 'confirm_password': 'secret-pass'}
+        response = APIClient().post('/api/auth/signup/', dict(fields, username='alice', email='new@example.com'))
+        self.assertEqual((response.status_code, response.data['error']), (400, 'Username already exists'))
+        response = APIClient().post('/api/auth/signup/', dict(fields, username='alice2', email='ALICE@example.COM'))
+        self.assertEqual((response.status_code, response.data['error']), (400, 'Email already exists'))
+        self.assertEqual(User.objects.count(), 1)
+
+
+class SQLiteSettingsTests(SimpleTestCase):
+    def connect(self):
+        # The test database lives in memory, where journal_mode cannot be WAL, so the
+        # configured options are opened against a file instead
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'pragmas.sqlite3')
+        wrapper = SQLiteDatabaseWrapper(dict(connection.settings_dict, NAME=path), alias='pragmas')
+        connections['pragmas'] = wrapper
+        self.addCleanup(connections.__delitem__, 'pragmas')
+        self.addCleanup(wrapper.close)
+        return wrapper, path
+
+    def test_new_connections_get_the_configured_pragmas(self):
+        wrapper, _ = self.connect()
+        with wrapper.cursor() as cursor:
+            pragmas = {}
+            for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size'):
+                cursor.execute(f'PRAGMA {name}')
+                pragmas[name] = cursor.fetchone()[0]
+        self.assertEqual(pragmas, {
+            'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 20000, 'cache_size': -65536, 'mmap_size': 268435456,
+        })  # synchronous 1 is NORMAL
+
+    def test_transactions_take_the_write_lock_up_front(self):
+        wrapper, path = self.connect()
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE t (x INTEGER)')
+        other = sqlite3.connect(path, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        with transaction.atomic(using='pragmas'):
+            # Nothing written yet, but BEGIN IMMEDIATE already holds the write lock
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT COUNT(*) FROM t')
+            with self.assertRaisesMessage(sqlite3.OperationalError, 'database is locked'):
+                other.execute('BEGIN IMMEDIATE')
+        other.execute('BEGIN IMMEDIATE')
+        other.execute('ROLLBACK')
+
+
+class RecordingBuffer(activity.ActivityBuffer):
+    """An ActivityBuffer that records its batches instead of writing them."""
+
+    def __init__(self, **kwargs):
+        self.batches = []
+        super().__init__(**kwargs)
+
+    def _write(self, batch):
+        if batch:
+            self.batches.append(list(batch))
+            for _ in batch:
+                self._queue.task_done()
+
+    def written(self):
+        return [row for batch in self.batches for row in batch]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('Timed out waiting for the activity buffer')
+        time.sleep(0.01)
+
+
+class ActivityBufferTests(SimpleTestCase):
+    def test_flushes_when_a_batch_is_full(self):
+        buffer = RecordingBuffer(flush_size=3, flush_interval=1.0)
+        self.addCleanup(buffer.stop)
+        for n in range(7):
+            buffer.add(n)
+        # Long before the interval is up
+        wait_for(lambda: len(buffer.written()) >= 6, timeout=0.5)
+        self.assertEqual(buffer.batches, [[0, 1, 2], [3, 4, 5]])
+
+    def test_flushes_a_partial_batch_after_the_interval(self):
+        buffer = RecordingBuffer(flush_size=100, flush_interval=0.1)
+        self.addCleanup(buffer.stop)
+        buffer.add('a')
+        buffer.add('b')
+        wait_for(lambda: len(buffer.written()) == 2)
+        self.assertEqual(buffer.written(), ['a', 'b'])
+
+    def test_stop_writes_everything_still_queued(self):
+        buffer = RecordingBuffer(flush_size=4, flush_interval=0.2)
+        for n in range(10):
+            buffer.add(n)
+        buffer.stop()
+        self.assertFalse(buffer._thread.is_alive())
+        self.assertEqual(buffer.written(), list(range(10)))
+        self.assertTrue(all(len(batch) <= 4 for batch in buffer.batches))
+
+
+@override_settings(ACTIVITY_LOG_BUFFERED=True)
+class BufferedActivityLogTests(TransactionTestCase):
+    # Committed rows: the buffer writes from its own thread and connection
+
+    def test_buffered_rows_reach_the_database(self):
+        user = User.objects.create_user(username='buffered')
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.1', HTTP_USER_AGENT='tests')
+        for n in range(25):
+            activity.log_activity(request, user, f'Action {n}')
+        activity.flush()
+        self.assertEqual(
+            list(AccountActivity.objects.filter(user=user).order_by('id').values_list('action', flat=True)),
+            [f'Action {n}' for n in range(25)],
+        )
+
+    def test_stop_writes_rows_still_queued(self):
+        user = User.objects.create_user(username='stopped')
+        buffer = activity.ActivityBuffer(flush_size=10, flush_interval=0.2)
+        for n in range(25):
+            buffer.add(AccountActivity(user=user, action=f'Action {n}', timestamp=timezone.now()))
+        buffer.stop()
+        self.assertEqual(AccountActivity.objects.filter(user=user).count(), 25)
+
+
+@override_settings(ACTIVITY_LOG_BUFFERED=False)
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='async-reader', email='async@example.com')
+        AccountActivity.objects.create(user=cls.user, action='Logged in')
+        cls.headers = {'Authorization': f'Bearer {AccessToken.for_user(cls.user)}'}
+        admin = User.objects.create_user(username='async-admin', is_staff=True)
+        cls.admin_headers = {'Authorization': f'Bearer {AccessToken.for_user(admin)}'}
+
+    def setUp(self):
+        cache.clear()
+
+    def test_read_heavy_views_are_async(self):
+        for view in (views.profile, views.available_investments, views.account_activity, views.admin_metrics,
+                     views.admin_list_transactions, views.admin_list_users):
+            self.assertTrue(view.cls.view_is_async, view.__name__)
+
+    async def test_reads_over_asgi_are_counted(self):
+        response = await self.async_client.get('/api/auth/profile/?include=transactions', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['username'], response.json()['transactions']), ('async-reader', []))
+        # The async ORM runs its queries in other threads; they still reach the middleware
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+
+        response = await self.async_client.get('/api/auth/account-activity/', headers=self.headers)
+        self.assertEqual([row['action'] for row in response.json()], ['Logged in'])
+
+    async def test_exports_stream_from_an_async_iterator(self):
+        for amount in ('10.00', '20.00', '30.00'):
+            await Transaction.objects.acreate(user=self.user, transaction_type='DEPOSIT', amount=Decimal(amount))
+        for path in ('/api/auth/admin/transactions/export/', '/api/auth/admin/exports/transactions/?output=jsonl'):
+            response = await self.async_client.get(path, headers=self.admin_headers)
+            self.assertEqual(response.status_code, 200)
+            # A sync iterator would be read into a list by the ASGI handler before the first byte
+            self.assertTrue(response.is_async)
+            lines = b''.join([chunk async for chunk in response.streaming_content]).splitlines()
+            self.assertEqual([json.loads(line)['amount'] for line in lines], ['10.00', '20.00', '30.00'])
+
+    async def test_profile_update_from_the_async_view(self):
+        response = await self.async_client.put(
+            '/api/auth/profile/', {'email': 'moved@example.com'}, content_type='application/json', headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((await User.objects.aget(pk=self.user.pk)).email, 'moved@example.com')
+
+
+@override_settings(AUTH_USER_CACHE_SECONDS=30)
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cached', email='cached@example.com')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_repeat_requests_resolve_the_user_without_queries(self):
+        self.assertEqual(self.client.get('/api/auth/profile/?fields=username').status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/profile/?fields=username')
+        self.assertEqual(response.data, {'username': 'cached', 'message': 'Profile retrieved'})
+
+    def test_deactivating_or_deleting_the_user_is_seen_at_once(self):
+        self.client.get('/api/auth/profile/?fields=username')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/profile/?fields=username').status_code, 401)
+        self.user.delete()
+        self.assertEqual(self.client.get('/api/auth/profile/?fields=username').status_code, 401)
+
+    @override_settings(AUTH_USER_CACHE_PROFILE=True)
+    def test_profile_is_cached_with_the_user(self):
+        token = AccessToken.for_user(self.user)
+        CachedJWTAuthentication().get_user(token)
+        with self.assertNumQueries(0):
+            self.assertEqual(CachedJWTAuthentication().get_user(token).profile.total, 0)
+
+        UserProfile.objects.get(user=self.user).save()
+        with self.assertNumQueries(1):
+            CachedJWTAuthentication().get_user(token).profile
+
+    @override_settings(AUTH_USER_CACHE_SECONDS=0)
+    def test_without_a_shared_cache_every_request_reads_the_user(self):
+        self.client.get('/api/auth/profile/?fields=username')
+        with self.assertNumQueries(1):
+            self.client.get('/api/auth/profile/?fields=username')
@@ -11,6 +11,11 @@ urlpatterns = [
     path('login/', views.login, name='login'),
     path('logout/', views.logout, name='logout'),
     path('profile/', views.profile, name='profile'),
+    path('profile/transactions/', views.profile_transactions, name='profile_transactions'),
+    path('profile/investments/', views.profile_investments, name='profile_investments'),
+    path('profile/balance/', views.profile_balance, name='profile_balance'),
+    path('profile/balance/history/', views.profile_balance_history, name='profile_balance_history'),
+    path('profile/projection/', views.profile_projection, name='profile_projection'),
     path('deposit/', views.deposit, name='deposit'),
     path('withdraw/', views.withdraw, name='withdraw'),
     path('sell/', views.sell, name='sell'),
@@ -21,10 +26,17 @@ urlpatterns = [
     path('available-investments/', views.available_investments, name='available_investments'),
     # Admin endpoints
     path('admin/transactions/', views.admin_list_transactions, name='admin_list_transactions'),
+    path('admin/transactions/export/', views.admin_export_transactions, name='admin_export_transactions'),
+    path('admin/exports/<str:dataset>/', views.admin_compliance_export, name='admin_compliance_export'),
+    path('admin/transactions/approve/', views.admin_bulk_approve_transactions, name='admin_bulk_approve_transactions'),
+    path('admin/transactions/decline/', views.admin_bulk_decline_transactions, name='admin_bulk_decline_transactions'),
     path('admin/transaction/<int:transaction_id>/approve/', views.admin_approve_transaction, name='admin_approve_transaction'),
     path('admin/transaction/<int:transaction_id>/decline/', views.admin_decline_transaction, name='admin_decline_transaction'),
     path('admin/user/<int:user_id>/mobile/', views.admin_update_mobile, name='admin_update_mobile'),
     path('admin/metrics/', views.admin_metrics, name='admin_metrics'),
+    path('admin/performance/', views.admin_performance, name='admin_performance'),
+    path('admin/projections/', views.admin_projections, name='admin_projections'),
+    path('admin/reports/transactions/', views.admin_transaction_report, name='admin_transaction_report'),
     path('admin/users/create/', views.admin_create_user, name='admin_create_user'),
     path('admin/user/<int:user_id>/delete/', views.admin_delete_user, name='admin_delete_user'),
     path('admin/transaction/<int:transaction_id>/pending/', views.admin_set_transaction_pending, name='admin_set_transaction_pending'),
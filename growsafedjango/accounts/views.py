@@ -1,3 +1,5 @@
+from adrf.decorators import api_view as async_api_view
+from asgiref.sync import sync_to_async
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from rest_framework import status
@@ -7,18 +9,44 @@ from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.http import JsonResponse
 from .models import UserProfile, Investment, Transaction
-from decimal import Decimal
-from django.db import transaction
+from decimal import Decimal, InvalidOperation
+from datetime import datetime, time, timedelta
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import parse_etags
 import traceback
 from .models import UserProfile, AccountActivity, InvestmentOption, Transaction, Investment
 from django.contrib.auth import update_session_auth_hash
 from django.shortcuts import render
+from .pagination import InvalidCursor, akeyset_page, keyset_page, page_size
+from .exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, is_asgi, streaming_export
+from . import approvals, balances, catalog, compliance, counters, history, ledger, performance, projections, rollups
+from .activity import log_activity
+from .routing import read_only
+from .serialization import isoformat, rows, serialize, serialize_iter, text
 
 
 # Root endpoint
 def auth_root(request):
     return JsonResponse({"message": "Auth root endpoint"})
 
+def _create_user(**fields):
+    # A single insert: the unique username and case-insensitive email indexes reject
+    # duplicates, so there is no separate exists() check to race against.
+    # The post_save signal creates the profile in the same transaction
+    with transaction.atomic():
+        return User.objects.create_user(**fields)
+
+
+def _duplicate_user_error(username):
+    # Only reached after an IntegrityError, so this lookup is off the hot path
+    if User.objects.filter(username=username).exists():
+        return 'Username already exists'
+    return 'Email already exists'
+
+
 # Signup with profile creation
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -36,28 +64,23 @@ def signup(request):
     if password != confirm_password:
         return Response({'error': 'Passwords do not match'}, status=status.HTTP_400_BAD_REQUEST)
 
-    if User.objects.filter(username=username).exists():
-        return Response({'error': 'Username already exists'}, status=status.HTTP_400_BAD_REQUEST)
-
-    if User.objects.filter(email=email).exists():
-        return Response({'error': 'Email already exists'}, status=status.HTTP_400_BAD_REQUEST)
-
     try:
         # Creating user with first_name and last_name
-        user = User.objects.create_user(
+        user = _create_user(
             username=username,
             first_name=first_name,
             last_name=last_name,
             email=email,
             password=password
         )
-        UserProfile.objects.get_or_create(user=user)
         refresh = RefreshToken.for_user(user)
         return Response({
             'access': str(refresh.access_token),
             'refresh': str(refresh),
             'message': 'User created successfully'
         }, status=status.HTTP_201_CREATED)
+    except IntegrityError:
+        return Response({'error': _duplicate_user_error(username)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'error': f'Failed to create user: {str(e)}',
@@ -69,30 +92,14 @@ def signup(request):
 def login(request):
     username_or_email = request.data.get('usernameOrEmail')
     password = request.data.get('password')
+    # Matches either the username or the email in one query (see accounts.backends)
     user = authenticate(request, username=username_or_email, password=password)
 
-    if user == '@' in username_or_email:
-        try:
-            # Find user with the email
-            user_obj = User.objects.get(email=username_or_email)
-            # Then authenticate with they username
-            user = authenticate(request, username=user_obj.username, password=password)
-        except User.DoesNotExist:
-            # No user with the email exists
-            pass
-
     if user is not None:
-        # Ensure user profile exists
-        UserProfile.objects.get_or_create(user=user)
         refresh = RefreshToken.for_user(user)
 
         # Log in the login activity
-        AccountActivity.objects.create(
-            user=user,
-            action='Logged in',
-            ip_address=request.META.get('REMOTE_ADDR', 'Unknown'),
-            device=request.META.get('HTTP_USER_AGENT', 'Unknown')
-        )
+        log_activity(request, user, 'Logged in')
         return Response({
             'access': str(refresh.access_token),
             'refresh': str(refresh),
@@ -114,72 +121,137 @@ def logout(request):
         return Response({'error': 'Invalid token'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-@api_view(['GET', 'PUT'])
+INVESTMENT_FIELDS = (
+    ('id', 'id', None),
+    ('name', 'name', None),
+    ('amount', 'amount', text),
+    ('daily_return_rate', 'daily_return_rate', text),
+    ('created_at', 'created_at', isoformat),
+)
+
+TRANSACTION_FIELDS = (
+    ('type', 'transaction_type', None),
+    ('amount', 'amount', text),
+    ('status', 'status', None),
+    ('mobile_number', 'mobile_number', None),
+    ('created_at', 'created_at', isoformat),
+    ('updated_at', 'updated_at', isoformat),
+    ('notes', 'notes', None),
+    ('transaction_id', 'transaction_id', text),
+)
+
+
+# Profile GET fields in response order; the balance ones need the UserProfile row
+PROFILE_FIELDS = (
+    'username', 'email', 'first_name', 'last_name', 'total', 'total_deposit', 'total_withdraw',
+    'daily_earnings', 'mobile_number', 'address', 'joined_date',
+)
+PROFILE_BALANCE_FIELDS = frozenset(('total', 'total_deposit', 'total_withdraw', 'daily_earnings', 'mobile_number', 'address'))
+PROFILE_INCLUDES = ('investments', 'transactions')
+
+
+def _split_names(value, allowed, kind):
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = names.difference(allowed)
+    if unknown:
+        raise ValueError(f'Unknown {kind}: {", ".join(sorted(unknown))}; choose from {", ".join(allowed)}')
+    return names
+
+
+def _profile_selection(params):
+    """Parse ?fields= and ?include=; without either the whole profile is returned.
+
+    ?fields= alone returns just those fields, ?include= alone returns every field
+    plus the listed sub-resources. Raises ValueError on unknown names.
+    """
+    fields = set(PROFILE_FIELDS)
+    includes = set(PROFILE_INCLUDES)
+    if 'fields' in params:
+        fields = _split_names(params['fields'], PROFILE_FIELDS, 'field')
+        includes = set()
+    if 'include' in params:
+        includes = _split_names(params['include'], PROFILE_INCLUDES, 'include')
+    return fields, includes
+
+
+def _update_profile(request, user):
+    profile = UserProfile.objects.get(user=user)
+    data = request.data
+    # Update User fields
+    user.first_name = data.get('first_name', user.first_name)
+    user.last_name = data.get('last_name', user.last_name)
+    user.email = data.get('email', user.email)
+    # Update UserProfile fields
+    profile.mobile_number = data.get('mobile_number', profile.mobile_number)
+    profile.address = data.get('address', profile.address)
+    # Save changes
+    try:
+        with transaction.atomic():
+            # Only the edited fields: request.user may come from the authentication cache
+            user.save(update_fields=['first_name', 'last_name', 'email'])
+            profile.save()
+    except IntegrityError:
+        return Response({'error': 'Email already exists'}, status=status.HTTP_400_BAD_REQUEST)
+    # Log the activity
+    log_activity(request, user, "Profile updated")
+    return Response({
+        'message': 'Profile updated successfully'
+    }, status=status.HTTP_200_OK)
+
+
+# Profile: ?fields=total,daily_earnings selects fields, ?include=investments,transactions sub-resources
+# Async, like the other read-heavy views: under ASGI a request waiting on the
+# database does not hold a worker thread
+@async_api_view(['GET', 'PUT'])
 @permission_classes([IsAuthenticated])
-def profile(request):
+async def profile(request):
     try:
         user = request.user
-        profile, _ = UserProfile.objects.get_or_create(user=user)
 
         if request.method == 'GET':
-            profile.calculate_daily_earnings()
-            investments = [
-                {'name': inv.name, 'amount': str(inv.amount), 'daily_return_rate': str(inv.daily_return_rate)}
-                for inv in user.investments.all()
-            ]
-            transactions = [
-                {
-                    'type': tx.transaction_type,
-                    'amount': str(tx.amount),
-                    'status': tx.status,
-                    'mobile_number': tx.mobile_number,
-                    'created_at': tx.created_at.isoformat(),
-                    'updated_at': tx.updated_at.isoformat(),
-                    'notes': tx.notes,
-                    'transaction_id': str(tx.transaction_id)
-                }
-                for tx in user.transactions.all()
-            ]
-            return Response({
+            try:
+                fields, includes = _profile_selection(request.query_params)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            # Only the tables behind the requested fields are queried
+            data = {}
+            if not fields.isdisjoint(PROFILE_BALANCE_FIELDS):
+                profile = await UserProfile.objects.aget(user=user)
+                data.update({
+                    'total': str(profile.total),
+                    'total_deposit': str(profile.total_deposit),
+                    'total_withdraw': str(profile.total_withdraw),
+                    'daily_earnings': str(profile.daily_earnings),
+                    'mobile_number': profile.mobile_number,
+                    'address': profile.address or '',
+                })
+            data.update({
                 'username': user.username,
                 'email': user.email,
                 'first_name': user.first_name,
                 'last_name': user.last_name,
-                'total': str(profile.total),
-                'total_deposit': str(profile.total_deposit),
-                'total_withdraw': str(profile.total_withdraw),
-                'daily_earnings': str(profile.daily_earnings),
-                'mobile_number': profile.mobile_number,
-                'address': profile.address or '',
                 'joined_date': user.date_joined.isoformat(),
-                'investments': investments,
-                'transactions': transactions,
-                'message': 'Profile retrieved'
-            }, status=status.HTTP_200_OK)
+            })
+            response_data = {field: data[field] for field in PROFILE_FIELDS if field in fields}
+            # Earnings are credited by the accrue_daily_earnings job, never on read.
+            # First page only; the rest is served by profile/investments/ and profile/transactions/
+            if 'investments' in includes:
+                investments, next_cursor = await akeyset_page(rows(user.investments.all(), INVESTMENT_FIELDS, keyset=True))
+                response_data['investments'] = serialize(investments, INVESTMENT_FIELDS)
+                response_data['investments_next_cursor'] = next_cursor
+            if 'transactions' in includes:
+                transactions, next_cursor = await akeyset_page(rows(user.transactions.all(), TRANSACTION_FIELDS, keyset=True))
+                response_data['transactions'] = serialize(transactions, TRANSACTION_FIELDS)
+                response_data['transactions_next_cursor'] = next_cursor
+            response_data['message'] = 'Profile retrieved'
+            return Response(response_data, status=status.HTTP_200_OK)
 
         elif request.method == 'PUT':
-            data = request.data
-            # Update User fields
-            user.first_name = data.get('first_name', user.first_name)
-            user.last_name = data.get('last_name', user.last_name)
-            user.email = data.get('email', user.email)
-            # Update UserProfile fields
-            profile.mobile_number = data.get('mobile_number', profile.mobile_number)
-            profile.address = data.get('address', profile.address)
-            # Save changes
-            user.save()
-            profile.save()
-            # Log the activity
-            AccountActivity.objects.create(
-                user=user,
-                action="Profile updated",
-                ip_address=request.META.get('REMOTE_ADDR', 'Unknown'),
-                device=request.META.get('HTTP_USER_AGENT', 'Unknown'),
-            )
-            return Response({
-                'message': 'Profile updated successfully'
-            }, status=status.HTTP_200_OK)
+            # Writes stay synchronous: the transaction must run on one thread
+            return await sync_to_async(_update_profile)(request, user)
 
+    except UserProfile.DoesNotExist:
+        return Response({'error': 'User profile not found'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         print("Error in profile view:", str(e))
         traceback.print_exc()
@@ -188,6 +260,52 @@ def profile(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+# Profile: cursor-paginated transactions, optionally filtered by ?type= and ?status=
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def profile_transactions(request):
+    queryset = Transaction.objects.filter(user=request.user)
+    transaction_type = request.query_params.get('type')
+    if transaction_type:
+        queryset = queryset.filter(transaction_type=transaction_type.upper())
+    status_filter = request.query_params.get('status')
+    if status_filter:
+        queryset = queryset.filter(status=status_filter.upper())
+    try:
+        transactions, next_cursor = keyset_page(
+            rows(queryset, TRANSACTION_FIELDS, keyset=True), request.query_params.get('cursor'), page_size(request)
+        )
+    except InvalidCursor:
+        return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'results': serialize(transactions, TRANSACTION_FIELDS),
+        'next_cursor': next_cursor,
+    }, status=status.HTTP_200_OK)
+
+# Profile: cursor-paginated investments, optionally filtered by ?option= and ?risk_level=
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def profile_investments(request):
+    queryset = Investment.objects.filter(user=request.user)
+    option_id = request.query_params.get('option')
+    if option_id:
+        if not option_id.isdigit():
+            return Response({'error': 'Invalid option'}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = queryset.filter(option_id=option_id)
+    risk_level = request.query_params.get('risk_level')
+    if risk_level:
+        queryset = queryset.filter(option__risk_level=risk_level.upper())
+    try:
+        investments, next_cursor = keyset_page(
+            rows(queryset, INVESTMENT_FIELDS, keyset=True), request.query_params.get('cursor'), page_size(request)
+        )
+    except InvalidCursor:
+        return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'results': serialize(investments, INVESTMENT_FIELDS),
+        'next_cursor': next_cursor,
+    }, status=status.HTTP_200_OK)
+
 # Deposit (creates pending transaction)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -276,22 +394,21 @@ def admin_create_investment_option(request):
         return Response({'error': f'Failed to create investment option: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
 # Invest (unchanged, but wrapped in transaction)
-@api_view(['GET'])
+@async_api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def available_investments(request):
+@read_only
+async def available_investments(request):
     try:
-        options = InvestmentOption.objects.all()
-        response_data = [
-            {
-                'id': option.id,
-                'name': option.name,
-                'min_investment': str(option.min_investment),
-                'expected_return': str(option.expected_return),
-                'risk_level': option.risk_level
-            }
-            for option in options
-        ]
-        return Response(response_data, status=status.HTTP_200_OK)
+        # The ETag is the catalog version, so a revalidation needs neither the query nor the body
+        version = await sync_to_async(catalog.get_version)()
+        tag = catalog.etag(version)
+        if tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(list(await sync_to_async(catalog.get_options)(version)), status=status.HTTP_200_OK)
+        response['ETag'] = tag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
     except Exception as e:
         print(f"Error in available_investments: {str(e)}")
         return Response(
@@ -310,11 +427,9 @@ def invest(request):
         option = InvestmentOption.objects.get(id=option_id)
         if amount < option.min_investment:
             return Response({'error': f'Amount must be at least {option.min_investment}'}, status=status.HTTP_400_BAD_REQUEST)
-        profile = request.user.profile
-        if profile.total < amount:
-            return Response({'error': 'Insufficient balance'}, status=status.HTTP_400_BAD_REQUEST)
         with transaction.atomic():
-            profile.total -= amount
+            # Conditional debit: fails instead of overdrawing if the balance is too low
+            total = balances.debit(request.user.id, amount)
             investment = Investment.objects.create(
                 user=request.user,
                 option=option,
@@ -322,7 +437,7 @@ def invest(request):
                 amount=amount,
                 daily_return_rate=option.expected_return / 100  # Convert percentage to decimal
             )
-            profile.save()
+            ledger.record(request.user.id, 'INVESTMENT', -amount, f'investment:{investment.id}')
         return Response({
             'message': 'Investment successful',
             'investment': {
@@ -330,8 +445,12 @@ def invest(request):
                 'amount': str(investment.amount),
                 'daily_return_rate': str(investment.daily_return_rate)
             },
-            'total': str(profile.total)
+            'total': str(total)
         }, status=status.HTTP_201_CREATED)
+    except balances.InsufficientBalance:
+        return Response({'error': 'Insufficient balance'}, status=status.HTTP_400_BAD_REQUEST)
+    except UserProfile.DoesNotExist:
+        return Response({'error': 'User profile not found'}, status=status.HTTP_404_NOT_FOUND)
     except InvestmentOption.DoesNotExist:
         return Response({'error': 'Investment option not found'}, status=status.HTTP_404_NOT_FOUND)
     except (ValueError, TypeError):
@@ -351,55 +470,202 @@ def refresh_token(request):
         return Response({'error': 'Invalid refresh token'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-# Admin: List all transactions
-@api_view(['GET'])
+ADMIN_TRANSACTION_FIELDS = (
+    ('id', 'id', None),
+    ('user', 'user__username', None),
+    ('type', 'transaction_type', None),
+    ('amount', 'amount', text),
+    ('status', 'status', None),
+    ('mobile_number', 'mobile_number', None),
+    ('created_at', 'created_at', None),
+    ('updated_at', 'updated_at', None),
+    ('processed_by', 'processed_by__username', None),
+    ('notes', 'notes', None),
+    ('transaction', 'transaction_id', text),
+)
+
+
+def _parse_bound(value, end=False):
+    # Dates are whole days: an end date includes the entire day
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is not None:
+        parsed = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    else:
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValueError(f'Invalid date: {value}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _parse_day(value):
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f'Invalid date: {value}')
+    return day
+
+
+def _filter_transactions(queryset, params):
+    """Apply the admin listing filters; raises ValueError on malformed input."""
+    if params.get('status'):
+        queryset = queryset.filter(status=params['status'].upper())
+    if params.get('type'):
+        queryset = queryset.filter(transaction_type=params['type'].upper())
+    if params.get('user'):
+        if not params['user'].isdigit():
+            raise ValueError(f"Invalid user: {params['user']}")
+        queryset = queryset.filter(user_id=params['user'])
+    if params.get('created_after'):
+        queryset = queryset.filter(created_at__gte=_parse_bound(params['created_after']))
+    if params.get('created_before'):
+        queryset = queryset.filter(created_at__lt=_parse_bound(params['created_before'], end=True))
+    try:
+        if params.get('min_amount'):
+            queryset = queryset.filter(amount__gte=Decimal(params['min_amount']))
+        if params.get('max_amount'):
+            queryset = queryset.filter(amount__lte=Decimal(params['max_amount']))
+    except InvalidOperation:
+        raise ValueError('Invalid amount range')
+    return queryset
+
+
+# Admin: List transactions
+# Without ?limit or ?cursor this returns the full (filtered) list as before; with
+# either it returns one keyset page, newest first, plus the cursor for the next one.
+@async_api_view(['GET'])
 @permission_classes([AllowAny])
-def admin_list_transactions(request):
-    transactions = Transaction.objects.all().select_related('user', 'processed_by')
-    data = [
-        {
-            'id': tx.id,
-            'user': tx.user.username,
-            'type': tx.transaction_type,
-            'amount': str(tx.amount),
-            'status': tx.status,
-            'mobile_number': tx.mobile_number,
-            'created_at': tx.created_at,
-            'updated_at': tx.updated_at,
-            'processed_by': tx.processed_by.username if tx.processed_by else None,
-            'notes': tx.notes,
-            'transaction': str(tx.transaction_id)
-        }
-        for tx in transactions
-    ]
-    return Response(data, status=status.HTTP_200_OK)
+@read_only
+async def admin_list_transactions(request):
+    params = request.query_params
+    try:
+        queryset = _filter_transactions(Transaction.objects.all(), params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if 'limit' not in params and 'cursor' not in params:
+        data = serialize([row async for row in rows(queryset.order_by('id'), ADMIN_TRANSACTION_FIELDS)], ADMIN_TRANSACTION_FIELDS)
+        return Response(data, status=status.HTTP_200_OK)
+
+    try:
+        page, next_cursor = await akeyset_page(
+            rows(queryset, ADMIN_TRANSACTION_FIELDS, keyset=True), params.get('cursor'), page_size(request),
+            descending=True,
+        )
+    except InvalidCursor:
+        return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'results': serialize(page, ADMIN_TRANSACTION_FIELDS),
+        'next_cursor': next_cursor,
+    }, status=status.HTTP_200_OK)
+
+# Admin: Stream every matching transaction as JSON Lines (?output=jsonl) or CSV (?output=csv)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_export_transactions(request):
+    output = request.query_params.get('output', 'jsonl')
+    if output not in EXPORT_FORMATS:
+        return Response({'error': f'Output must be one of {", ".join(EXPORT_FORMATS)}'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        queryset = _filter_transactions(Transaction.objects.all(), request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serialize_iter(
+        rows(queryset.order_by('id'), ADMIN_TRANSACTION_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE),
+        ADMIN_TRANSACTION_FIELDS, EXPORT_CHUNK_SIZE,
+    )
+    return streaming_export(
+        data, [name for name, _, _ in ADMIN_TRANSACTION_FIELDS], output, 'transactions', asynchronous=is_asgi(request),
+    )
+
+# Admin: Full compliance dump of transactions or activity. ?output=jsonl|csv|jsonl.gz,
+# ?start=&end= (dates) and ?after_id= to continue an interrupted download
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_compliance_export(request, dataset):
+    if dataset not in compliance.DATASETS:
+        return Response({'error': f'Unknown dataset: {dataset}'}, status=status.HTTP_404_NOT_FOUND)
+    params = request.query_params
+    output = params.get('output', 'jsonl.gz')
+    if output not in EXPORT_FORMATS:
+        return Response({'error': f'Output must be one of {", ".join(EXPORT_FORMATS)}'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        start = _parse_day(params['start']) if params.get('start') else None
+        end = _parse_day(params['end']) if params.get('end') else None
+        after_id = int(params.get('after_id', 0))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    fields = compliance.DATASETS[dataset][2]
+    data = serialize_iter(
+        compliance.dataset_rows(dataset, start, end, after_id).iterator(chunk_size=EXPORT_CHUNK_SIZE),
+        fields, EXPORT_CHUNK_SIZE,
+    )
+    return streaming_export(data, [name for name, _, _ in fields], output, dataset, asynchronous=is_asgi(request))
 
 # Admin: Approve transaction
 @api_view(['POST'])
 @permission_classes([IsAdminUser])
 def admin_approve_transaction(request, transaction_id):
     try:
-        with transaction.atomic():
-            tx = Transaction.objects.select_related('user').get(id=transaction_id, status='PENDING')
-            profile = tx.user.profile
-            if tx.transaction_type == 'DEPOSIT':
-                profile.total += tx.amount
-                profile.total_deposit += tx.amount
-            elif tx.transaction_type == 'WITHDRAWAL':
-                if profile.total < tx.amount:
-                    return Response({'error': 'Insufficient balance'}, status=status.HTTP_400_BAD_REQUEST)
-                profile.total -= tx.amount
-                profile.total_withdraw += tx.amount
-            tx.status = 'APPROVED'
-            tx.processed_by = request.user
-            tx.save()
-            profile.save()
-        return Response({
-            'message': f'{tx.transaction_type.lower()} approved',
-            'user_total': str(profile.total)
-        }, status=status.HTTP_200_OK)
-    except Transaction.DoesNotExist:
+        outcome = approvals.approve_transactions([transaction_id], request.user)[transaction_id]
+    except approvals.ApprovalConflict as e:
+        return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+    if outcome == approvals.NOT_PENDING:
         return Response({'error': 'Transaction not found or already processed'}, status=status.HTTP_404_NOT_FOUND)
+    if outcome == approvals.INSUFFICIENT_BALANCE:
+        return Response({'error': 'Insufficient balance'}, status=status.HTTP_400_BAD_REQUEST)
+    if outcome == approvals.NO_PROFILE:
+        return Response({'error': 'User profile not found'}, status=status.HTTP_400_BAD_REQUEST)
+    tx = Transaction.objects.select_related('user__profile').get(id=transaction_id)
+    return Response({
+        'message': f'{tx.transaction_type.lower()} approved',
+        'user_total': str(tx.user.profile.total)
+    }, status=status.HTTP_200_OK)
+
+def _transaction_ids(request):
+    ids = request.data.get('transaction_ids')
+    if not isinstance(ids, list) or not ids:
+        raise ValueError('transaction_ids must be a non-empty list')
+    return [int(pk) for pk in ids]
+
+# Admin: Approve many transactions at once; responds with the outcome for each id
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def admin_bulk_approve_transactions(request):
+    try:
+        ids = _transaction_ids(request)
+    except (ValueError, TypeError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        outcomes = approvals.approve_transactions(ids, request.user)
+    except approvals.ApprovalConflict as e:
+        return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+    return Response({'results': outcomes}, status=status.HTTP_200_OK)
+
+# Admin: Decline many transactions at once; responds with the outcome for each id
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def admin_bulk_decline_transactions(request):
+    try:
+        ids = _transaction_ids(request)
+    except (ValueError, TypeError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        outcomes = approvals.decline_transactions(ids, request.user, request.data.get('notes'))
+    except approvals.ApprovalConflict as e:
+        return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+    return Response({'results': outcomes}, status=status.HTTP_200_OK)
 
 # Admin: Set transaction to Pending
 @api_view(['POST'])
@@ -475,9 +741,68 @@ def check_transaction_status(request, transaction_id):
         }, status=404)
 
 
+# Balance chart from the nightly daily snapshots: ?start=&end= (dates, default the last year)
+# and ?bucket=day|week|month (default chosen from the range length)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def profile_balance_history(request):
+    params = request.query_params
+    end = timezone.localdate()
+    start = end - timedelta(days=365)
+    try:
+        if params.get('end'):
+            end = _parse_day(params['end'])
+        if params.get('start'):
+            start = _parse_day(params['start'])
+        bucket = params.get('bucket') or history.auto_bucket(start, end)
+        series = history.history(request.user.id, start, end, bucket)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'bucket': bucket, 'series': series}, status=status.HTTP_200_OK)
+
+
+def _horizon_days(request):
+    value = request.query_params.get('days', projections.DEFAULT_HORIZON_DAYS)
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        days = 0
+    if not 1 <= days <= projections.MAX_HORIZON_DAYS:
+        raise ValueError(f'days must be between 1 and {projections.MAX_HORIZON_DAYS}')
+    return days
+
+
+# Projected portfolio value after ?days= (default a year), simple and compounding, per risk scenario
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def profile_projection(request):
+    try:
+        days = _horizon_days(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(projections.project_user(request.user, days), status=status.HTTP_200_OK)
+
+
+# Ledger balance, optionally as it stood just before ?as_of=
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def account_activity(request):
+def profile_balance(request):
+    as_of = None
+    if request.query_params.get('as_of'):
+        try:
+            as_of = _parse_bound(request.query_params['as_of'], end=True)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'balance': str(ledger.balance(request.user.id, before=as_of)),
+        'as_of': as_of,
+    })
+
+
+@async_api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@read_only
+async def account_activity(request):
     try:
         activities = AccountActivity.objects.filter(user=request.user).order_by('-timestamp')[:10]
         response_data = [
@@ -488,7 +813,7 @@ def account_activity(request):
                 'ip': activity.ip_address or 'Unknown',
                 'device': activity.device or 'Unknown',
             }
-            for activity in activities
+            async for activity in activities
         ]
         return Response(response_data, status=status.HTTP_200_OK)
     except AccountActivity.DoesNotExist:
@@ -528,16 +853,11 @@ def change_password(request):
             )
 
         user.set_password(new_password)
-        user.save()
+        user.save(update_fields=['password'])
         update_session_auth_hash(request, user)  # Keep user logged in
 
         # Log the activity
-        AccountActivity.objects.create(
-            user=user,
-            action="Password updated",
-            ip_address=request.META.get('REMOTE_ADDR', 'Unknown'),
-            device=request.META.get('HTTP_USER_AGENT', 'Unknown'),
-        )
+        log_activity(request, user, "Password updated")
 
         return Response(
             {'message': 'Password changed successfully'},
@@ -558,20 +878,24 @@ def sell(request):
     investment_id = request.data.get('investment_id')
     try:
         investment = Investment.objects.get(id=investment_id, user=request.user)
-        profile = request.user.profile
         with transaction.atomic():
-            profile.total += investment.amount
-            investment.delete()
-            profile.save()
+            # Only the request that actually deletes the row gets credited
+            deleted, _ = Investment.objects.filter(id=investment.id).delete()
+            if not deleted:
+                raise Investment.DoesNotExist
+            total = balances.credit(request.user.id, investment.amount)
+            ledger.record(request.user.id, 'SALE', investment.amount, f'investment:{investment.id}')
         return Response(
             {
                 'message': 'Investment sold',
-                'total': str(profile.total),
+                'total': str(total),
             },
             status=status.HTTP_200_OK
         )
     except Investment.DoesNotExist:
         return Response({'error': 'Investment not found'}, status=status.HTTP_404_NOT_FOUND)
+    except UserProfile.DoesNotExist:
+        return Response({'error': 'User profile not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
 
@@ -579,17 +903,24 @@ def homepage(request):
     return render(request, 'homepage.html', {'site_name': 'GrowSafe Investments'})
 
 
-@api_view(['GET'])
+@async_api_view(['GET'])
 @permission_classes([AllowAny])
-def admin_metrics(request):
+@read_only
+async def admin_metrics(request):
     #if not request.user.is_superuser:
         #return Response({'error': 'Only superusers can access metrics'}, status=status.HTTP_403_FORBIDDEN)
-    return Response({
-        'total_users': User.objects.count(),
-        'pending_transactions': Transaction.objects.filter(status='PENDING').count(),
-        'total_investments': Investment.objects.count(),
-        'active_options': InvestmentOption.objects.count(),
-    })
+    return Response(await sync_to_async(counters.get_counters)())
+
+
+# Admin: Rolling per-route request costs recorded by PerformanceMiddleware in this
+# process; DELETE starts a fresh window
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def admin_performance(request):
+    if request.method == 'DELETE':
+        performance.stats.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response({'window': performance.WINDOW, 'routes': performance.stats.summary()})
 
 
 @api_view(['POST'])
@@ -608,14 +939,8 @@ def admin_create_user(request):
     if not all([username, email, password]):
         return Response({'error': 'Username, email, and password are required'}, status=status.HTTP_400_BAD_REQUEST)
 
-    if User.objects.filter(username=username).exists():
-        return Response({'error': 'Username already exists'}, status=status.HTTP_400_BAD_REQUEST)
-
-    if User.objects.filter(email=email).exists():
-        return Response({'error': 'Email already exists'}, status=status.HTTP_400_BAD_REQUEST)
-
     try:
-        user = User.objects.create_user(
+        user = _create_user(
             username=username,
             email=email,
             password=password,
@@ -623,8 +948,9 @@ def admin_create_user(request):
             last_name=last_name,
             is_staff=is_staff
         )
-        UserProfile.objects.get_or_create(user=user)
         return Response({'message': 'User created successfully', 'user_id': user.id}, status=status.HTTP_201_CREATED)
+    except IntegrityError:
+        return Response({'error': _duplicate_user_error(username)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({'error': f'Failed to create user: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -646,25 +972,63 @@ def admin_delete_user(request, user_id):
         return Response({'error': f'Failed to delete user: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-# Admin: List all users
+def _balance_or_zero(total):
+    # Users without a profile row
+    return '0.00' if total is None else str(total)
+
+
+ADMIN_USER_FIELDS = (
+    ('id', 'id', None),
+    ('username', 'username', None),
+    ('email', 'email', None),
+    ('first_name', 'first_name', None),
+    ('last_name', 'last_name', None),
+    ('is_staff', 'is_staff', None),
+    ('is_superuser', 'is_superuser', None),
+    ('total_balance', 'profile__total', _balance_or_zero),
+)
+
+# Admin: Money flow from the transaction rollups. ?start=&end= (dates, default this month),
+# ?group=day|week|month|total, optional ?type= and ?status=
 @api_view(['GET'])
+@permission_classes([IsAdminUser])
+@read_only
+def admin_transaction_report(request):
+    params = request.query_params
+    end = timezone.localdate()
+    start = end.replace(day=1)
+    try:
+        if params.get('start'):
+            start = _parse_day(params['start'])
+        if params.get('end'):
+            end = _parse_day(params['end'])
+        report_rows = rollups.report(
+            start, end, params.get('group', 'day'),
+            transaction_type=params.get('type', '').upper() or None,
+            status=params.get('status', '').upper() or None,
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'start': start, 'end': end, 'results': report_rows}, status=status.HTTP_200_OK)
+
+# Admin: Every user's portfolio projected in one pass, for the dashboard
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@read_only
+def admin_projections(request):
+    try:
+        days = _horizon_days(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(projections.project_platform(days), status=status.HTTP_200_OK)
+
+# Admin: List all users
+@async_api_view(['GET'])
 @permission_classes([AllowAny])
-def admin_list_users(request):
+@read_only
+async def admin_list_users(request):
     try:
-        users = User.objects.select_related('profile').all()
-        data = [
-            {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'is_staff': user.is_staff,
-                'is_superuser': user.is_superuser,
-                'total_balance': str(user.profile.total) if hasattr(user, 'profile') else '0.00',
-            }
-            for user in users
-        ]
+        data = serialize([row async for row in rows(User.objects.all(), ADMIN_USER_FIELDS)], ADMIN_USER_FIELDS)
         return Response(data, status=status.HTTP_200_OK)
     except Exception as e:
         print(f"Error in admin_list_users: {str(e)}")
@@ -684,11 +1048,12 @@ def admin_update_user(request, user_id):
         user.last_name = data.get('last_name', user.last_name)
         user.email = data.get('email', user.email)
 
-        # Validate email uniqueness
-        if 'email' in data and User.objects.filter(email=data['email']).exclude(id=user_id).exists():
+        # Email uniqueness is enforced by the auth_user_email_lower_uniq index
+        try:
+            with transaction.atomic():
+                user.save()
+        except IntegrityError:
             return Response({'error': 'Email already exists'}, status=status.HTTP_400_BAD_REQUEST)
-
-        user.save()
         return Response({
             'message': 'User updated successfully',
             'user_id': user.id
@@ -46,12 +46,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover every other middleware
+    'accounts.performance.PerformanceMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.routing.ReadYourWritesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -79,13 +82,85 @@ WSGI_APPLICATION = 'growsafedjango.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# SQLite tuned for several worker processes writing at once (compare with
+# `manage.py bench_sqlite_writes`). WAL lets readers run alongside the writer,
+# `timeout` is SQLite's busy timeout in seconds, and IMMEDIATE transactions take
+# the write lock up front instead of failing on a read-to-write upgrade.
+SQLITE_OPTIONS = {
+    'init_command': ';'.join([
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',  # Durable across app crashes; only an OS crash can lose the last commits
+        'PRAGMA cache_size=-65536',  # 64 MiB page cache per connection
+        'PRAGMA mmap_size=268435456',  # 256 MiB
+    ]),
+    'timeout': 20,
+    'transaction_mode': 'IMMEDIATE',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # GROWSAFE_DB points a server at another file, e.g. the one `manage.py bench_asgi` seeds
+        'NAME': os.environ.get('GROWSAFE_DB', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': SQLITE_OPTIONS,
+        # Keep connections (and the PRAGMAs above) across requests
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Per-process unless GROWSAFE_REDIS_URL is set. Replica pins and cached users need the
+# shared one once there is more than one worker process
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+if os.environ.get('GROWSAFE_REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['GROWSAFE_REDIS_URL'],
+    }
+
+# Optional read replica for the @read_only views (accounts/routing.py). Locally it is a
+# second SQLite file refreshed from the primary by `manage.py sync_replica`.
+REPLICA_DATABASE_ALIAS = None
+if os.environ.get('GROWSAFE_REPLICA_DB'):
+    REPLICA_DATABASE_ALIAS = 'replica'
+    DATABASES[REPLICA_DATABASE_ALIAS] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['GROWSAFE_REPLICA_DB'],
+        'OPTIONS': {
+            'init_command': 'PRAGMA query_only=ON;PRAGMA cache_size=-65536;PRAGMA mmap_size=268435456',
+            'timeout': 20,
+        },
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['accounts.routing.ReplicaRouter']
+
+# How long after a write a user's reads stay on the primary
+READ_YOUR_WRITES_SECONDS = 5
+
+# A request running one statement shape this many times is logged as a likely N+1
+PERFORMANCE_N_PLUS_ONE_THRESHOLD = 10
+
+# accounts.performance logs one JSON line per request at INFO and N+1 suspects at WARNING
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'accounts.performance': {
+            'handlers': ['console'],
+            'level': os.environ.get('GROWSAFE_PERFORMANCE_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -139,8 +214,13 @@ CORS_ALLOWED_ORIGINS = [
 
 # REST Framework settings
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'accounts.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication with the user looked up from the cache (accounts/authentication.py)
+        'accounts.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -167,7 +247,17 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# How long CachedJWTAuthentication keeps a user; saves and deletes forget it sooner. Only
+# with the shared cache: a per-process one would keep a deactivated user in other workers
+AUTH_USER_CACHE_SECONDS = 30 if os.environ.get('GROWSAFE_REDIS_URL') else 0
+# Also cache the profile, making request.user.profile free; its balances can then lag by the TTL
+AUTH_USER_CACHE_PROFILE = False
+
+# Buffer AccountActivity rows in-process and write them in batches (accounts/activity.py).
+# Turn off to write each row synchronously, e.g. in tests.
+ACTIVITY_LOG_BUFFERED = True
+
 AUTHENTICATION_BACKENDS = [
+    # Subclasses ModelBackend and covers username logins, so no fallback backend is needed
     'accounts.backends.EmailOrUsernameModelBackend',
-    'django.contrib.auth.backends.ModelBackend',
 ]